@@ -0,0 +1,7 @@
+"""
+Benchmarks for the elbacsv package.
+
+This package contains a generator for synthetic ELBA CSV exports and a
+harness that measures the throughput and memory usage of the parser and
+of the full conversion.
+"""
@@ -0,0 +1,210 @@
+"""
+Deterministic generator for synthetic ELBA CSV exports.
+
+The generated files follow the layout of real ELBA exports: six columns
+(Durchführungsdatum, structured text, Valutadatum, Betrag, Währung,
+Zeitstempel), German number and date formats and a structured text column
+made of the keys in KEYS. The same seed always produces the same file.
+
+Usage:
+    python -m benchmarks.generator output.csv --rows 100000
+"""
+
+import argparse
+import csv
+import datetime as dt
+import random
+
+# Relative frequency of the transaction kinds in a generated export
+DEFAULT_MIX = {
+    "card": 6,
+    "transfer_out": 2,
+    "transfer_in": 1,
+    "direct_debit": 1,
+}
+
+MERCHANTS = [
+    "BILLA DANKT 0003750 STOCKERAU 2000",
+    "SPAR DANKT 5521 WIEN 1070",
+    "HOFER DANKT 0412 KORNEUBURG 2100",
+    "OMV 2534 TULLN 3430",
+    "AMAZON EU SARL LUXEMBOURG",
+]
+
+NAMES = [
+    "Mag. Christine Rappaport",
+    "Wiener Stadtwerke GmbH",
+    "Max Mustermann",
+    "Österreichische Gesundheitskasse",
+    "A1 Telekom Austria AG",
+]
+
+PURPOSES = [
+    "Miete 10/2024",
+    "Rechnung 2024-0815: Danke",
+    "Mitgliedsbeitrag",
+    "Ref: 12:30 Termin",
+    "Gehalt",
+]
+
+
+def _iban(rnd):
+    return "AT" + "".join(str(rnd.randint(0, 9)) for _ in range(18))
+
+
+def _bic(rnd):
+    return rnd.choice(["RLNWATWW", "BKAUATWW", "GIBAATWW", "OPSKATWW"]) + "XXX"
+
+
+def _amount(rnd, sign):
+    return f"{sign}{rnd.randint(1, 250000) / 100:.2f}".replace(".", ",")
+
+
+def _card(rnd, when):
+    amount = f"{rnd.randint(1, 30000) / 100:.2f}".replace(".", ",")
+    return (
+        f"Verwendungszweck: {rnd.choice(MERCHANTS)} "
+        f"Zahlungsreferenz: POS          {amount} AT  D5   {when:%d.%m. %H:%M} "
+        f"Kartenzahlung mit Kartenfolge-Nr.: {rnd.randint(1, 9)}"
+    )
+
+
+def _transfer_out(rnd, _when):
+    return (
+        f"Empfänger: {rnd.choice(NAMES)} "
+        f"IBAN Empfänger: {_iban(rnd)} BIC Empfänger: {_bic(rnd)} "
+        f"Verwendungszweck: {rnd.choice(PURPOSES)} "
+        f"Zahlungsreferenz: {rnd.randint(100000, 999999)}"
+    )
+
+
+def _transfer_in(rnd, _when):
+    return (
+        f"Auftraggeber: {rnd.choice(NAMES)} "
+        f"IBAN Auftraggeber: {_iban(rnd)} BIC Auftraggeber: {_bic(rnd)} "
+        f"Verwendungszweck: {rnd.choice(PURPOSES)} "
+        f"Auftraggeberreferenz: {rnd.randint(100000, 999999)}"
+    )
+
+
+def _direct_debit(rnd, _when):
+    return (
+        f"Empfänger: {rnd.choice(NAMES)} "
+        f"Empfänger-Kennung: AT{rnd.randint(10, 99)}ZZZ{rnd.randint(10**8, 10**9)} "
+        f"Mandat: M-{rnd.randint(1000, 9999)} "
+        f"Zahlungspflichtigenkennung: {rnd.randint(10**6, 10**7)} "
+        f"Verwendungszweck: {rnd.choice(PURPOSES)}"
+    )
+
+
+KINDS = {
+    "card": _card,
+    "transfer_out": _transfer_out,
+    "transfer_in": _transfer_in,
+    "direct_debit": _direct_debit,
+}
+
+
+def generate_rows(count, *, seed=0, mix=None, colon_rate=0.1):
+    """
+    Generate rows of a synthetic ELBA export.
+
+    Args:
+        count: Number of rows to generate.
+        seed: Seed of the random number generator.
+        mix: Dictionary mapping transaction kinds to relative frequencies.
+            Defaults to DEFAULT_MIX.
+        colon_rate: Share of rows whose text ends with a value containing
+            colons that are not preceded by a known key.
+
+    Yields:
+        list[str]: The six columns of a row.
+
+    """
+    rnd = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    when = dt.datetime(2020, 1, 1, 8, 0, tzinfo=dt.timezone.utc)
+
+    for _ in range(count):
+        when += dt.timedelta(minutes=rnd.randint(1, 720))
+        kind = rnd.choices(kinds, weights)[0]
+        text = KINDS[kind](rnd, when)
+        if rnd.random() < colon_rate:
+            text += f" Info: Termin {rnd.randint(0, 23)}:{rnd.randint(0, 59):02d}"
+
+        yield [
+            f"{when:%d.%m.%Y}",
+            text,
+            f"{when:%d.%m.%Y}",
+            _amount(rnd, "+" if kind == "transfer_in" else "-"),
+            "EUR",
+            f"{when:%d.%m.%Y %H:%M:%S}:{rnd.randint(0, 999):03d}",
+        ]
+
+
+def write_export(path, count, *, bom=True, quote_all=False, **options):
+    """
+    Write a synthetic ELBA export to a file.
+
+    Args:
+        path: Path of the file to write.
+        count: Number of rows to generate.
+        bom: If True, start the file with a byte order mark like ELBA does.
+        quote_all: If True, quote every field instead of only where needed.
+        **options: Keyword arguments passed on to generate_rows.
+
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if bom:
+            f.write("\ufeff")
+        writer = csv.writer(
+            f,
+            delimiter=";",
+            quoting=csv.QUOTE_ALL if quote_all else csv.QUOTE_MINIMAL,
+        )
+        writer.writerows(generate_rows(count, **options))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic ELBA CSV export.",
+    )
+    parser.add_argument("output_csv", help="Path to the output CSV file.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of rows.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--mix",
+        help="Transaction mix, e.g. 'card=6,transfer_out=2,transfer_in=1,direct_debit=1'",
+    )
+    parser.add_argument(
+        "--colon-rate",
+        type=float,
+        default=0.1,
+        help="Share of rows with additional colons in the text.",
+    )
+    parser.add_argument("--no-bom", action="store_true", help="Omit the BOM.")
+    parser.add_argument("--quote-all", action="store_true", help="Quote all fields.")
+    args = parser.parse_args()
+
+    mix = None
+    if args.mix:
+        mix = {
+            kind: float(weight)
+            for kind, weight in (item.split("=") for item in args.mix.split(","))
+        }
+
+    write_export(
+        args.output_csv,
+        args.rows,
+        seed=args.seed,
+        mix=mix,
+        colon_rate=args.colon_rate,
+        bom=not args.no_bom,
+        quote_all=args.quote_all,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Throughput and memory benchmarks for the elbacsv package.
+
+For each input size, a synthetic ELBA export is generated and two
+measurements are taken: parsing the structured text column alone with
+parse_key_value_string, and the full conversion with process_csv_file.
+The harness reports rows/sec, MB/sec and peak memory and saves the results
+as JSON, so results of different versions can be compared.
+
+Usage:
+    python -m benchmarks.harness --sizes 1000 10000 100000
+    python -m benchmarks.harness --compare benchmarks/results/0.1.1.json
+"""
+
+import argparse
+import csv
+import datetime as dt
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import elbacsv
+from elbacsv import parse_key_value_string, process_csv_file
+
+from .generator import write_export
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _measure(func, repeat):
+    """
+    Measure the best wall time and the peak traced memory of a function.
+
+    The function is timed without tracemalloc, because tracing slows down
+    the code considerably. Peak memory is measured in a separate run.
+
+    Args:
+        func: Function without arguments to measure.
+        repeat: Number of timed runs; the fastest one is reported.
+
+    Returns:
+        tuple[float, int]: Best wall time in seconds and peak memory in bytes.
+
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def _result(name, rows, size_bytes, seconds, peak):
+    return {
+        "benchmark": name,
+        "rows": rows,
+        "bytes": size_bytes,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds,
+        "mb_per_sec": size_bytes / seconds / 1e6,
+        "peak_memory_mb": peak / 1e6,
+    }
+
+
+def run_benchmarks(sizes, *, repeat=3, seed=0):
+    """
+    Run the parse and conversion benchmarks for several input sizes.
+
+    Args:
+        sizes: Numbers of rows of the generated inputs.
+        repeat: Number of timed runs per benchmark.
+        seed: Seed for the synthetic export generator.
+
+    Returns:
+        list[dict]: One result per benchmark and size.
+
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            input_csv = os.path.join(tmp, f"input-{rows}.csv")
+            output_csv = os.path.join(tmp, f"output-{rows}.csv")
+            write_export(input_csv, rows, seed=seed)
+            size_bytes = os.path.getsize(input_csv)
+
+            with open(input_csv, newline="", encoding="utf-8") as f:
+                texts = [row[1] for row in csv.reader(f, delimiter=";")]
+            text_bytes = sum(len(text.encode()) for text in texts)
+
+            def parse(texts=texts):
+                for text in texts:
+                    parse_key_value_string(text)
+
+            def convert(input_csv=input_csv, output_csv=output_csv):
+                process_csv_file(input_csv, output_csv, False)
+
+            seconds, peak = _measure(parse, repeat)
+            results.append(_result("parse", rows, text_bytes, seconds, peak))
+
+            seconds, peak = _measure(convert, repeat)
+            results.append(_result("convert", rows, size_bytes, seconds, peak))
+
+    return results
+
+
+def _print_results(results, baseline=None):
+    """
+    Print benchmark results as a table.
+
+    Args:
+        results: Results returned by run_benchmarks.
+        baseline: Optional earlier results; the change in rows/sec is shown.
+
+    """
+    previous = {}
+    if baseline:
+        previous = {(r["benchmark"], r["rows"]): r for r in baseline["results"]}
+
+    print(
+        f"{'benchmark':<10}{'rows':>10}{'rows/sec':>14}{'MB/sec':>10}{'peak MB':>10}"
+        + ("   change" if previous else "")
+    )
+    for r in results:
+        line = (
+            f"{r['benchmark']:<10}{r['rows']:>10}{r['rows_per_sec']:>14,.0f}"
+            f"{r['mb_per_sec']:>10.2f}{r['peak_memory_mb']:>10.2f}"
+        )
+        old = previous.get((r["benchmark"], r["rows"]))
+        if old:
+            change = r["rows_per_sec"] / old["rows_per_sec"] - 1
+            line += f"   {change:+.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput of the elbacsv parser and conversion.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Numbers of rows of the generated inputs.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size.")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed.")
+    parser.add_argument(
+        "--output",
+        help="Path of the JSON result file (default: benchmarks/results/<version>.json).",
+    )
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, repeat=args.repeat, seed=args.seed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_results(results, baseline)
+
+    output = Path(args.output or RESULTS_DIR / f"{elbacsv.__version__}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": elbacsv.__version__,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory and speed benchmark of records compared to dicts.
+
+Parses the structured text column of a synthetic ELBA export once into
+dicts with parse_key_value_string and once into records with parse_record.
+For both, the best wall time and the memory needed to keep all results
+are reported.
+
+Usage:
+    python -m benchmarks.records
+    python -m benchmarks.records --rows 200000 --repeat 5
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from elbacsv import parse_key_value_string, parse_record
+
+from .generator import generate_rows
+
+
+def _measure(parse, texts, repeat):
+    """
+    Measure the best time to parse all texts and the memory of the results.
+
+    Args:
+        parse: Function parsing one text.
+        texts: Structured texts to parse.
+        repeat: Number of timed runs; the fastest one is reported.
+
+    Returns:
+        tuple[float, int]: Best wall time in seconds and the bytes held by
+            the list of results.
+
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [parse(text) for text in texts]
+        best = min(best, time.perf_counter() - start)
+        del results
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        results = [parse(text) for text in texts]
+        held, _ = tracemalloc.get_traced_memory()
+        del results
+    finally:
+        tracemalloc.stop()
+
+    return best, held
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the speed and memory of records and dicts.",
+    )
+    parser.add_argument("--rows", type=int, default=100000, help="Number of texts.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs.")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed.")
+    args = parser.parse_args()
+
+    texts = [row[1] for row in generate_rows(args.rows, seed=args.seed)]
+
+    results = {
+        "dict": _measure(parse_key_value_string, texts, args.repeat),
+        "record": _measure(parse_record, texts, args.repeat),
+    }
+
+    print(f"{'result':<8}{'rows/sec':>14}{'held MB':>10}{'bytes/row':>11}")
+    for name, (seconds, held) in results.items():
+        print(
+            f"{name:<8}{args.rows / seconds:>14,.0f}{held / 1e6:>10.1f}"
+            f"{held / args.rows:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup-time benchmark for the elbacsv command-line tool.
+
+Measures how long it takes to import the package and to run the
+command-line tool with --help, compared to starting a bare interpreter.
+The command exits with status 1 if the overhead of the tool exceeds the
+budget, so it can be used as a check in scripts and CI jobs.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 30 --runs 50
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Maximum time in milliseconds that 'elbacsv --help' may add on top of the
+# startup time of a bare Python interpreter
+STARTUP_BUDGET_MS = 50.0
+
+COMMANDS = {
+    "python": "pass",
+    "import": "import elbacsv",
+    "help": (
+        "import sys; from elbacsv.cli import main; "
+        "sys.argv = ['elbacsv', '--help']; main()"
+    ),
+}
+
+
+def measure(code, runs):
+    """
+    Measure the median wall time of running Python code in a new interpreter.
+
+    Args:
+        code: Python code passed to the interpreter with -c.
+        runs: Number of runs.
+
+    Returns:
+        float: Median wall time in milliseconds.
+
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        times.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the startup time of the elbacsv command-line tool.",
+    )
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command.")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=STARTUP_BUDGET_MS,
+        help=f"Allowed overhead of 'elbacsv --help' in ms (default: {STARTUP_BUDGET_MS}).",
+    )
+    args = parser.parse_args()
+
+    results = {name: measure(code, args.runs) for name, code in COMMANDS.items()}
+    overhead = results["help"] - results["python"]
+
+    for name, ms in results.items():
+        print(f"{name:<8}{ms:8.1f} ms")
+    print(f"overhead{overhead:8.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    if overhead > args.budget_ms:
+        print("Startup budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
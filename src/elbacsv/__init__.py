@@ -8,9 +8,33 @@ and write the parsed data to a new CSV file with expanded columns.
 Author: Dominik Rappaport, dominik@rappaport.at
 """
 
-from .cli import main, parse_command_line_args
-from .constants import KEYS
-from .core import parse_key_value_string, process_csv_file, strip_zwnbsp
+import importlib
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .batch import BatchResult, convert_many
+    from .cache import ResultCache
+    from .checkpoint import CheckpointFile
+    from .cli import main, parse_command_line_args
+    from .consolidate import ConsolidationResult, consolidate
+    from .constants import KEYS
+    from .core import (
+        RecordReader,
+        parse_key_value_string,
+        parse_record,
+        process_csv_file,
+        read_records,
+        strip_zwnbsp,
+        write_records,
+    )
+    from .filters import RowFilter
+    from .incremental import FingerprintIndex, transaction_fingerprint
+    from .parser import CachingParser, KeyValueParser, default_parser
+    from .partition import Partitioning, PartitionSink
+    from .plan import Merge, TransformPlan
+    from .records import Record, record_type
+    from .sinks import CsvSink, JsonLinesSink, Sink, SqliteSink, make_sink
+    from .stats import ConversionStats
 
 __version__ = "0.1.1"
 __author__ = "Dominik Rappaport"
@@ -24,9 +48,105 @@ __readme_name__ = "README.md"
 
 __all__ = [
     "KEYS",
+    "BatchResult",
+    "CachingParser",
+    "CheckpointFile",
+    "ConsolidationResult",
+    "ConversionStats",
+    "CsvSink",
+    "FingerprintIndex",
+    "JsonLinesSink",
+    "KeyValueParser",
+    "Merge",
+    "PartitionSink",
+    "Partitioning",
+    "Record",
+    "RecordReader",
+    "ResultCache",
+    "RowFilter",
+    "Sink",
+    "SqliteSink",
+    "TransformPlan",
+    "consolidate",
+    "convert_many",
+    "default_parser",
     "main",
+    "make_sink",
     "parse_command_line_args",
     "parse_key_value_string",
+    "parse_record",
     "process_csv_file",
+    "read_records",
+    "record_type",
     "strip_zwnbsp",
+    "transaction_fingerprint",
+    "write_records",
 ]
+
+# Public names and the submodules defining them. The submodules are only
+# imported when one of their names is first accessed, which keeps importing
+# the package (and starting the command-line tool) fast.
+_LAZY_ATTRIBUTES = {
+    "KEYS": "constants",
+    "BatchResult": "batch",
+    "CachingParser": "parser",
+    "CheckpointFile": "checkpoint",
+    "ConsolidationResult": "consolidate",
+    "ConversionStats": "stats",
+    "CsvSink": "sinks",
+    "FingerprintIndex": "incremental",
+    "JsonLinesSink": "sinks",
+    "KeyValueParser": "parser",
+    "Merge": "plan",
+    "PartitionSink": "partition",
+    "Partitioning": "partition",
+    "Record": "records",
+    "RecordReader": "core",
+    "ResultCache": "cache",
+    "RowFilter": "filters",
+    "Sink": "sinks",
+    "SqliteSink": "sinks",
+    "TransformPlan": "plan",
+    "consolidate": "consolidate",
+    "convert_many": "batch",
+    "default_parser": "parser",
+    "main": "cli",
+    "make_sink": "sinks",
+    "parse_command_line_args": "cli",
+    "parse_key_value_string": "core",
+    "parse_record": "core",
+    "process_csv_file": "core",
+    "read_records": "core",
+    "record_type": "records",
+    "strip_zwnbsp": "core",
+    "transaction_fingerprint": "incremental",
+    "write_records": "core",
+}
+
+
+def __getattr__(name):
+    """
+    Import public attributes on first access.
+
+    Args:
+        name: Name of the attribute.
+
+    Returns:
+        The requested attribute.
+
+    Raises:
+        AttributeError: If the package has no attribute with this name.
+
+    """
+    if name not in _LAZY_ATTRIBUTES:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+
+    module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,313 @@
+"""
+Totals of converted transactions per month, counterparty or currency.
+
+The aggregation runs on the typed columns of the columns module, so the
+amounts are parsed once while converting and summed as integers in cents.
+With NumPy, every row gets an integer group code and the sums are computed
+with a few vectorized operations; without it, one loop over the columns
+does the same. Amounts in different currencies are never added up: totals
+per month and per counterparty are grouped by currency as well.
+"""
+
+import datetime as dt
+from typing import NamedTuple
+
+from .columns import (
+    EPOCH_ORDINAL,
+    MISSING,
+    SOURCE_COLUMNS,
+    ColumnSink,
+    format_amount,
+    load_numpy,
+)
+from .core import process_csv_file
+from .plan import TransformPlan
+
+# Supported groupings and the header of their group columns
+AGGREGATIONS = {
+    "month": ("Monat",),
+    "counterparty": ("Gegenpartei", "IBAN"),
+    "currency": (),
+}
+
+# Columns written after the group columns
+TOTAL_COLUMNS = ("Währung", "Anzahl", "Summe", "Soll", "Haben")
+
+
+class Total(NamedTuple):
+    """
+    Sum of the amounts of a group of transactions, in cents.
+
+    Attributes:
+        group: Labels of the group, as named by AGGREGATIONS.
+        currency: Currency code.
+        count: Number of transactions.
+        total: Sum of all amounts.
+        debit: Sum of the negative amounts.
+        credit: Sum of the positive amounts.
+
+    """
+
+    group: tuple
+    currency: str
+    count: int
+    total: int
+    debit: int
+    credit: int
+
+    def row(self):
+        """
+        Return the total as an output row.
+
+        Returns:
+            list[str]: The group labels, the currency, the count and the
+                sums formatted with a decimal comma.
+
+        """
+        return [
+            *self.group,
+            self.currency,
+            str(self.count),
+            format_amount(self.total),
+            format_amount(self.debit),
+            format_amount(self.credit),
+        ]
+
+
+def _month_number(days):
+    """
+    Return the month of a day as months since 1970-01.
+
+    Args:
+        days: Days since 1970-01-01, or MISSING.
+
+    Returns:
+        int: The month number, or MISSING.
+
+    """
+    if days == MISSING:
+        return MISSING
+    date = dt.date.fromordinal(days + EPOCH_ORDINAL)
+    return (date.year - 1970) * 12 + date.month - 1
+
+
+def _month_label(month):
+    """
+    Return the label of a month number.
+
+    Args:
+        month: Months since 1970-01.
+
+    Returns:
+        tuple[str]: The month in 'YYYY-MM' format.
+
+    """
+    year, month = divmod(month, 12)
+    return (f"{year + 1970:04d}-{month + 1:02d}",)
+
+
+def _groups(columns, by, numpy):
+    """
+    Return the group of every row and a function naming the groups.
+
+    Args:
+        columns: TypedColumns instance.
+        by: One of the keys of AGGREGATIONS.
+        numpy: The numpy module if the columns are NumPy arrays, or None.
+
+    Returns:
+        tuple[Sequence[int], Callable[[int], tuple]]: One integer per row,
+            equal for rows of the same group and MISSING for rows without a
+            group, and the function returning the labels of a group.
+
+    """
+    if by == "counterparty":
+        labels = columns.gegenpartei.labels
+        return columns.gegenpartei.codes, labels.__getitem__
+
+    if by == "currency":
+        zeros = numpy.zeros(len(columns), numpy.int64) if numpy else [0] * len(columns)
+        return zeros, lambda _: ()
+
+    if numpy:
+        # NaT stays NaT when the days are truncated to months
+        months = columns.durchfuehrungsdatum.astype("datetime64[M]").view("int64")
+        return months, _month_label
+
+    # Most rows share their day with other rows
+    month_of_day = {}
+    months = []
+    for day in columns.integers("durchfuehrungsdatum"):
+        month = month_of_day.get(day)
+        if month is None:
+            month = month_of_day[day] = _month_number(day)
+        months.append(month)
+    return months, _month_label
+
+
+def _sums_numpy(numpy, keys, amounts):
+    """
+    Sum the amounts per key with NumPy.
+
+    Returns:
+        dict[int, list[int]]: Count, total, debit and credit per key.
+
+    """
+    unique, inverse = numpy.unique(keys, return_inverse=True)
+
+    valid = amounts != MISSING
+    values = numpy.where(valid, amounts, 0)
+    counts = numpy.bincount(inverse, minlength=len(unique))
+
+    # The sums of integers are exact in float64 below 2**53 cents
+    def sums(weights):
+        totals = numpy.bincount(inverse, weights=weights, minlength=len(unique))
+        return numpy.rint(totals).astype(numpy.int64)
+
+    total = sums(values)
+    debit = sums(numpy.minimum(values, 0))
+    credit = sums(numpy.maximum(values, 0))
+
+    return {
+        int(key): [int(c), int(t), int(d), int(h)]
+        for key, c, t, d, h in zip(
+            unique.tolist(), counts, total, debit, credit, strict=True
+        )
+    }
+
+
+def _sums_python(keys, amounts):
+    """
+    Sum the amounts per key in one loop.
+
+    Returns:
+        dict[int, list[int]]: Count, total, debit and credit per key.
+
+    """
+    sums = {}
+
+    for key, amount in zip(keys, amounts, strict=True):
+        entry = sums.get(key)
+        if entry is None:
+            entry = sums[key] = [0, 0, 0, 0]
+
+        entry[0] += 1
+        if amount == MISSING:
+            continue
+
+        entry[1] += amount
+        if amount < 0:
+            entry[2] += amount
+        else:
+            entry[3] += amount
+
+    return sums
+
+
+def aggregate(columns, by):
+    """
+    Compute the totals of typed columns per group and currency.
+
+    Args:
+        columns: TypedColumns instance, e.g. returned by load_columns.
+        by: 'month', 'counterparty' or 'currency'.
+
+    Returns:
+        list[Total]: One total per group and currency, sorted by group and
+            currency.
+
+    Raises:
+        ValueError: If by is not one of the keys of AGGREGATIONS.
+
+    """
+    if by not in AGGREGATIONS:
+        msg = f"Unknown aggregation: {by!r}"
+        raise ValueError(msg)
+
+    numpy = load_numpy(True) if columns.numpy else None
+    groups, labels = _groups(columns, by, numpy)
+    currencies = columns.waehrung
+    amounts = columns.integers("betrag")
+    width = max(len(currencies.labels), 1)
+
+    # Every pair of group and currency gets its own key; rows without a
+    # group get a negative key per currency
+    if numpy:
+        groups = numpy.asarray(groups, dtype=numpy.int64)
+        codes = currencies.codes.astype(numpy.int64)
+        keys = numpy.where(groups == MISSING, -1 - codes, groups * width + codes)
+        sums = _sums_numpy(numpy, keys, amounts)
+    else:
+        keys = [
+            -1 - code if group == MISSING else group * width + code
+            for group, code in zip(groups, currencies.codes, strict=True)
+        ]
+        sums = _sums_python(keys, amounts)
+
+    totals = []
+    for key, (count, total, debit, credit) in sums.items():
+        if key < 0:
+            group, currency = ("",) * len(AGGREGATIONS[by]), -1 - key
+        else:
+            code, currency_code = divmod(key, width)
+            group, currency = labels(code), currency_code
+        totals.append(
+            Total(
+                tuple(group),
+                currencies.labels[currency],
+                count,
+                total,
+                debit,
+                credit,
+            )
+        )
+
+    return sorted(totals)
+
+
+def summary_header(by):
+    """
+    Return the header of the rows written for an aggregation.
+
+    Args:
+        by: 'month', 'counterparty' or 'currency'.
+
+    Returns:
+        list[str]: The names of the group and total columns.
+
+    """
+    return [*AGGREGATIONS[by], *TOTAL_COLUMNS]
+
+
+def write_summary(input_csv, sink, by, *, use_numpy=None, **options):
+    """
+    Convert an export and write its totals per group to a sink.
+
+    Args:
+        input_csv: Path of the input file, or '-' for standard input.
+        sink: Sink instance for the totals, e.g. returned by make_sink.
+        by: 'month', 'counterparty' or 'currency'.
+        use_numpy: True to require NumPy, False to use the array module,
+            None to use NumPy if it is installed.
+        **options: Keyword arguments of process_csv_file, e.g. jobs, stats
+            or filters.
+
+    Returns:
+        list[Total]: The written totals.
+
+    """
+    columns_sink = ColumnSink(use_numpy=use_numpy)
+    process_csv_file(
+        input_csv,
+        columns_sink,
+        False,
+        plan=TransformPlan(columns=SOURCE_COLUMNS),
+        **options,
+    )
+    totals = aggregate(columns_sink.columns, by)
+
+    with sink:
+        sink.open(summary_header(by), dialect=columns_sink.dialect)
+        sink.write_rows(total.row() for total in totals)
+
+    return totals
@@ -0,0 +1,215 @@
+"""
+Batch conversion of many ELBA CSV exports.
+
+This module expands files, glob patterns and directories into a list of
+input files and converts them concurrently in a process pool. Every file is
+converted independently, so a failure in one file does not affect the
+others.
+"""
+
+import glob
+import os
+from itertools import starmap
+from typing import NamedTuple
+
+from .compression import COMPRESSION_EXTENSIONS, split_compression
+from .core import process_csv_file
+from .incremental import INDEX_SUFFIX
+from .registry import register_keys, registered_keys
+from .sinks import SINK_EXTENSIONS, make_sink
+
+# Suffix appended to the file name of an input file to get its output file
+OUTPUT_SUFFIX = "_converted"
+
+
+class BatchResult(NamedTuple):
+    """Outcome of the conversion of one file in a batch."""
+
+    input_csv: str
+    output_csv: str
+    error: BaseException | None = None
+
+    @property
+    def ok(self):
+        """True if the file was converted successfully."""
+        return self.error is None
+
+
+def expand_inputs(paths):
+    """
+    Expand files, glob patterns and directories into a list of input files.
+
+    Directories are expanded to the CSV files they contain, including
+    compressed ones such as 'export.csv.gz'. Files that look
+    like the output of an earlier batch run are skipped in directories and
+    glob patterns. Every file is returned only once.
+
+    Args:
+        paths: Iterable of file paths, glob patterns or directory paths.
+
+    Returns:
+        list[str]: The input files in the given order, sorted per pattern.
+
+    """
+    inputs = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            directory = glob.escape(path)
+            matches = sorted(
+                match
+                for ext in ("", *COMPRESSION_EXTENSIONS)
+                for match in glob.glob(os.path.join(directory, f"*.csv{ext}"))
+            )
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+        else:
+            inputs.append(path)
+            continue
+
+        inputs.extend(
+            match
+            for match in matches
+            if not os.path.splitext(split_compression(match)[0])[0].endswith(
+                OUTPUT_SUFFIX
+            )
+        )
+
+    return list(dict.fromkeys(inputs))
+
+
+def output_path(input_csv, output_dir=None, extension=None):
+    """
+    Return the output file of an input file in a batch.
+
+    Args:
+        input_csv: Path to the input CSV file.
+        output_dir: Directory for the output files. If None, the output file
+            is written next to the input file.
+        extension: Extension of the output file. Defaults to the extension
+            of the input file. The compression extension of the input file
+            is kept, except for SQLite databases.
+
+    Returns:
+        str: Path of the output file, e.g. 'export_converted.csv' or
+            'export_converted.csv.gz'.
+
+    """
+    directory, name = os.path.split(input_csv)
+    name, compression = split_compression(name)
+    stem, ext = os.path.splitext(name)
+    if extension == SINK_EXTENSIONS["sqlite"]:
+        compression = ""
+    return os.path.join(
+        output_dir or directory,
+        f"{stem}{OUTPUT_SUFFIX}{extension or ext or '.csv'}{compression}",
+    )
+
+
+def _convert_file(input_csv, sink, merge, options):
+    """
+    Convert one file of a batch and capture any error.
+
+    Args:
+        input_csv: Path to the input CSV file.
+        sink: Sink writing the output file.
+        merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+        options: Keyword arguments passed on to process_csv_file.
+
+    Returns:
+        BatchResult: The outcome of the conversion.
+
+    """
+    try:
+        process_csv_file(input_csv, sink, merge, **options)
+    except Exception as e:
+        return BatchResult(input_csv, sink.path, e)
+
+    return BatchResult(input_csv, sink.path)
+
+
+def _future_result(future, input_csv, output_csv):
+    """
+    Return the result of a conversion that ran in a worker process.
+
+    A crashed worker process must not abort the remaining files, so errors
+    raised by the future are reported like conversion errors.
+
+    Args:
+        future: Future of a _convert_file call.
+        input_csv: Path to the input CSV file.
+        output_csv: Path to the output CSV file.
+
+    Returns:
+        BatchResult: The outcome of the conversion.
+
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        return BatchResult(input_csv, output_csv, e)
+
+
+def convert_many(
+    paths,
+    *,
+    output_dir=None,
+    merge=False,
+    jobs=1,
+    incremental=False,
+    output_format=None,
+    sink_options=None,
+    **options,
+):
+    """
+    Convert several ELBA CSV exports concurrently.
+
+    Args:
+        paths: Iterable of file paths, glob patterns or directory paths.
+        output_dir: Directory for the output files. If None, every output
+            file is written next to its input file.
+        merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+        jobs: Number of files converted at the same time.
+        incremental: If True, every output file keeps its own fingerprint
+            index and only new transactions are appended to it.
+        output_format: 'csv', 'jsonl' or 'sqlite'. If given, the output
+            files get the extension of the format; otherwise the format is
+            inferred from the extension of each input file.
+        sink_options: Optional keyword arguments for the SQLite sink.
+        **options: Further keyword arguments passed on to process_csv_file.
+
+    Returns:
+        list[BatchResult]: One result per input file, in input order.
+
+    """
+    inputs = expand_inputs(paths)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    extension = SINK_EXTENSIONS[output_format] if output_format else None
+
+    tasks = []
+    for input_csv in inputs:
+        output_csv = output_path(input_csv, output_dir, extension)
+        sink = make_sink(output_csv, output_format, **(sink_options or {}))
+        file_options = dict(options)
+        if incremental:
+            file_options["index_file"] = output_csv + INDEX_SUFFIX
+        tasks.append((input_csv, sink, merge, file_options))
+
+    if jobs <= 1 or len(tasks) <= 1:
+        return list(starmap(_convert_file, tasks))
+
+    # Imported here because it is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(tasks)),
+        initializer=register_keys,
+        initargs=(registered_keys(),),
+    ) as pool:
+        futures = [pool.submit(_convert_file, *task) for task in tasks]
+        return [
+            _future_result(future, input_csv, sink.path)
+            for future, (input_csv, sink, *_) in zip(futures, tasks, strict=True)
+        ]
@@ -0,0 +1,234 @@
+"""
+Content-addressed cache of conversion results.
+
+Reporting jobs often convert the same unchanged exports many times. The
+ResultCache stores every output file under a key derived from the content
+of the input file, the recognized keys, the package version and the options
+that change the output. When the same input is converted again with the
+same options, the stored output is copied instead of parsing the export.
+
+The cache lives in a directory on disk. Its size is limited; when the limit
+is exceeded, the least recently used results are removed.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from . import __version__
+from .constants import KEYS
+
+# Changed whenever the way results are stored or keyed changes
+CACHE_FORMAT = 1
+
+# Default size limit of the cache
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Suffix of the files holding cached results
+ENTRY_SUFFIX = ".result"
+
+# Suffix of the temporary files results are copied to before renaming
+TEMP_SUFFIX = ".tmp"
+
+# Size of the blocks in which input files are hashed
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    """
+    Return the default cache directory.
+
+    Returns:
+        str: $ELBACSV_CACHE_DIR if set, otherwise 'elbacsv' in
+            $XDG_CACHE_HOME or ~/.cache.
+
+    """
+    directory = os.environ.get("ELBACSV_CACHE_DIR")
+    if directory:
+        return directory
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "elbacsv")
+
+
+class ResultCache:
+    """
+    On-disk cache of converted output files, keyed by input content.
+
+    Args:
+        directory: Cache directory; created when the first result is stored.
+            Defaults to default_cache_dir().
+        max_bytes: Size limit of all cached results. After storing a result,
+            the least recently used results are removed until the cache
+            fits.
+
+    """
+
+    def __init__(self, directory=None, *, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return f"ResultCache({self.directory!r})"
+
+    def key(self, input_csv, **options):
+        """
+        Compute the cache key of a conversion.
+
+        Args:
+            input_csv: Path to the input file, whose content is hashed.
+            **options: Options that change the output. Values must be
+                serializable as JSON.
+
+        Returns:
+            str: Hexadecimal key of the result.
+
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        settings = {
+            "format": CACHE_FORMAT,
+            "version": __version__,
+            "keys": sorted(KEYS.items()),
+            "options": options,
+        }
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+
+        with open(input_csv, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def fetch(self, key, output_path):
+        """
+        Copy a cached result to an output file.
+
+        A hit marks the result as recently used.
+
+        Args:
+            key: Key returned by key().
+            output_path: Path of the output file.
+
+        Returns:
+            bool: True if the result was cached and has been copied.
+
+        Raises:
+            FileNotFoundError: If the result is cached, but the directory of
+                the output file does not exist.
+
+        """
+        entry = self._entry(key)
+
+        try:
+            shutil.copyfile(entry, output_path)
+        except FileNotFoundError:
+            if os.path.exists(entry):
+                raise
+            return False
+
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(entry)
+
+        return True
+
+    def store(self, key, output_path):
+        """
+        Store an output file as the result for a key.
+
+        The file is copied to a temporary file first and then renamed, so
+        other processes never see a partially written result.
+
+        Args:
+            key: Key returned by key().
+            output_path: Path of the output file.
+
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=TEMP_SUFFIX)
+        os.close(fd)
+        try:
+            shutil.copyfile(output_path, temp_path)
+            os.replace(temp_path, self._entry(key))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+        self.evict()
+
+    def _entries(self, suffix=ENTRY_SUFFIX):
+        """
+        Return the files of the cache directory, least recently used first.
+
+        Args:
+            suffix: Suffix of the files, ENTRY_SUFFIX for cached results.
+
+        Returns:
+            list[os.DirEntry]: The entries of the cache directory.
+
+        """
+        try:
+            with os.scandir(self.directory) as it:
+                entries = [e for e in it if e.name.endswith(suffix)]
+        except FileNotFoundError:
+            return []
+
+        return sorted(entries, key=lambda e: e.stat().st_mtime)
+
+    def size(self):
+        """
+        Return the total size of the cached results.
+
+        Returns:
+            int: Size in bytes.
+
+        """
+        return sum(e.stat().st_size for e in self._entries())
+
+    def evict(self):
+        """
+        Remove the least recently used results until the cache fits.
+
+        Returns:
+            int: Number of removed results.
+
+        """
+        entries = self._entries()
+        total = sum(e.stat().st_size for e in entries)
+        removed = 0
+
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(entry.path)
+            removed += 1
+
+        return removed
+
+    def clear(self):
+        """
+        Remove all cached results.
+
+        Temporary files left behind by interrupted stores are removed as
+        well.
+
+        Returns:
+            int: Number of removed results.
+
+        """
+        entries = self._entries()
+        for entry in [*entries, *self._entries(TEMP_SUFFIX)]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(entry.path)
+        return len(entries)
@@ -0,0 +1,481 @@
+"""
+Fault-tolerant and resumable conversion.
+
+A single malformed row, e.g. a row cut short by a truncated export, makes
+the conversion fail. In tolerant mode, such rows are written to a reject
+file together with their line number and the reason, and the conversion
+goes on with the next row.
+
+Long conversions can record checkpoints: every few rows, the number of
+input lines and bytes read and the sizes of the output and reject files are
+saved to a small JSON file. When a conversion that was interrupted is run
+again with resume, the output and reject files are cut back to their size
+at the last checkpoint and reading continues at the saved input offset, so
+the rows before the checkpoint are not converted again.
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import NamedTuple
+
+from .compression import open_output
+from .plan import NATIVE_COLUMNS
+
+# Changed whenever the content of checkpoint files changes
+CHECKPOINT_FORMAT = 1
+
+# Suffix appended to the output file name to get the default checkpoint path
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+# Default number of written rows between two checkpoints
+DEFAULT_CHECKPOINT_ROWS = 100_000
+
+# Number of fields an input row needs to be converted
+INPUT_FIELDS = max(NATIVE_COLUMNS.values()) + 1
+
+# Columns written before the fields of a rejected row
+REJECT_HEADER = ("Zeile", "Fehler")
+
+# Number of bytes at the start of the input that identify it
+_IDENTITY_SIZE = 64 * 1024
+
+# Encodings used to continue in the middle of a file, where there is no
+# byte order mark; UTF-16 exports are written little-endian
+_CONTINUATION_ENCODINGS = {"utf-8-sig": "utf-8", "utf-16": "utf-16-le"}
+
+# Encodings in which a line feed is a single byte that is never part of
+# another character
+_LINE_FEED_ENCODINGS = frozenset({"utf-8", "utf-8-sig", "cp1252"})
+
+
+class Checkpoint(NamedTuple):
+    """
+    Progress of a conversion at a checkpoint.
+
+    Attributes:
+        line: Number of input lines read.
+        offset: Number of bytes of decompressed input read.
+        output: Size of the output file in bytes.
+        rejects: Size of the reject file in bytes, or 0 without one.
+        rows: Number of rows written to the output.
+        rejected: Number of rows written to the reject file.
+
+    """
+
+    line: int
+    offset: int
+    output: int
+    rejects: int
+    rows: int
+    rejected: int
+
+
+# Progress of a conversion that starts at the beginning of the input
+NO_PROGRESS = Checkpoint(0, 0, 0, 0, 0, 0)
+
+
+def input_identity(path):
+    """
+    Return the identity of an input file.
+
+    The size and the hash of the first bytes tell a different export apart
+    from the one a checkpoint was recorded for without reading all of it.
+
+    Args:
+        path: Path of the input file.
+
+    Returns:
+        dict: The size and the hash of the input file.
+
+    """
+    with open(path, "rb") as f:
+        head = f.read(_IDENTITY_SIZE)
+
+    return {
+        "size": os.path.getsize(path),
+        "head": hashlib.blake2b(head, digest_size=16).hexdigest(),
+    }
+
+
+def truncate_file(path, size):
+    """
+    Cut a file back to its size at a checkpoint.
+
+    Args:
+        path: Path of the output or reject file.
+        size: Size of the file at the checkpoint.
+
+    Raises:
+        ValueError: If the file is missing or shorter than at the
+            checkpoint, so it was changed after the conversion stopped.
+
+    """
+    current = os.path.getsize(path) if os.path.exists(path) else -1
+    if current < size:
+        msg = f"{path} was changed after the checkpoint; convert it again without resuming"
+        raise ValueError(msg)
+
+    os.truncate(path, size)
+
+
+class InputPosition:
+    """
+    Count the lines and bytes of the input that were read.
+
+    In encodings where a line feed is a single byte, the input is split into
+    lines on the raw bytes, which are counted before they are decoded, also
+    where the legacy fallback decodes a byte that is not valid UTF-8. In
+    UTF-16, the decoded lines are encoded again to count their bytes.
+
+    Args:
+        encoding: Encoding of the input file.
+        errors: Error handler of the decoder, as used by open_input.
+        line: Number of lines read before the first counted line.
+        offset: Number of bytes read before the first counted line.
+
+    Attributes:
+        encoding: Encoding used to read the input from offset on.
+        line: Number of lines read.
+        offset: Number of bytes of decompressed input read.
+
+    """
+
+    def __init__(self, encoding, errors="strict", *, line=0, offset=0):
+        if offset:
+            encoding = _CONTINUATION_ENCODINGS.get(encoding, encoding)
+        self.encoding = encoding
+        self.errors = errors
+        self.line = line
+        self.offset = offset
+
+    def lines(self, binary):
+        """
+        Decode the lines of the input and count them.
+
+        Args:
+            binary: The decompressed input, at offset.
+
+        Yields:
+            str: The lines with their line endings.
+
+        """
+        if self.encoding not in _LINE_FEED_ENCODINGS:
+            text = io.TextIOWrapper(
+                binary, encoding=self.encoding, errors=self.errors, newline=""
+            )
+            yield from self._encoded_lines(text)
+            return
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(self.errors)
+        for raw in binary:
+            self.offset += len(raw)
+            self.line += 1
+            yield decoder.decode(raw)
+
+        # A character cut off at the end of the input
+        rest = decoder.decode(b"", final=True)
+        if rest:
+            yield rest
+
+    def _encoded_lines(self, lines):
+        """
+        Yield decoded lines and count them by encoding them again.
+
+        Args:
+            lines: Iterable of input lines with their line endings.
+
+        Yields:
+            str: The lines.
+
+        """
+        encode = codecs.getincrementalencoder(self.encoding)().encode
+
+        for text in lines:
+            self.offset += len(encode(text))
+            self.line += 1
+            yield text
+
+
+def _missing_fields(row):
+    """
+    Return why a row has too few fields to be converted.
+
+    Args:
+        row: Input row as a list of strings.
+
+    Returns:
+        str: The reason the row cannot be converted.
+
+    """
+    return f"expected at least {INPUT_FIELDS} fields, found {len(row)}"
+
+
+def checked_rows(rows, line_of=None, *, line=0):
+    """
+    Yield input rows, stopping at the first row that cannot be converted.
+
+    Without a reject file, a row with fewer than INPUT_FIELDS fields ends
+    the conversion with an error naming its line.
+
+    Args:
+        rows: csv.reader for the input file, or another iterable of rows.
+        line_of: Function returning the line where the record with a given
+            number ends, for rows that are not read by a csv.reader.
+        line: Number of input lines before the first line of rows.
+
+    Yields:
+        list[str]: The rows with all input fields.
+
+    Raises:
+        ValueError: If a row has fewer than INPUT_FIELDS fields.
+
+    """
+    for number, row in enumerate(rows, 1):
+        if len(row) < INPUT_FIELDS:
+            end = rows.line_num if line_of is None else line_of(number)
+            msg = f"Line {line + end}: {_missing_fields(row)}"
+            raise ValueError(msg)
+        yield row
+
+
+def _next_row(reader):
+    """
+    Read the next row of a CSV reader.
+
+    Args:
+        reader: csv.reader for the input file.
+
+    Returns:
+        tuple[list[str] | None, str | None]: The row, or None at the end of
+            the input, and the reason why it cannot be read, or None.
+
+    """
+    try:
+        return next(reader, None), None
+    except csv.Error as e:
+        return [], str(e)
+
+
+class RejectFile:
+    """
+    CSV file of the input rows that cannot be converted.
+
+    Every rejected row is written with its line number in the input and
+    the reason, followed by its fields in the dialect of the input file.
+    The reject file can be used as a context manager.
+
+    Args:
+        path: Path of the reject file.
+        dialect: CSV dialect of the input file.
+        append: If True, add the rows to an existing reject file.
+        count: Number of rows rejected before, when appending.
+
+    Attributes:
+        count: Number of rejected rows.
+
+    """
+
+    def __init__(self, path, dialect, *, append=False, count=0):
+        self.path = path
+        self.count = count
+        self._file = open_output(path, "a" if append else "w", newline="")
+        self._writer = csv.writer(self._file, dialect)
+        if not append:
+            self._writer.writerow(REJECT_HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def reject(self, line, reason, row):
+        """
+        Write a row that cannot be converted.
+
+        Args:
+            line: Number of the line in the input file where the row starts.
+            reason: Why the row is rejected.
+            row: Fields of the row that could be read.
+
+        """
+        self._writer.writerow([line, reason, *row])
+        self.count += 1
+
+    def rows(self, reader, *, line=0):
+        """
+        Yield the rows of a CSV reader that can be converted.
+
+        Rows that cannot be parsed as CSV or have fewer than INPUT_FIELDS
+        fields are rejected.
+
+        Args:
+            reader: csv.reader for the input file.
+            line: Number of input lines before the first line of the reader.
+
+        Yields:
+            list[str]: The rows with all input fields.
+
+        """
+        while True:
+            start = line + reader.line_num + 1
+            row, error = _next_row(reader)
+
+            if row is None:
+                return
+
+            if error is None and len(row) < INPUT_FIELDS:
+                error = _missing_fields(row)
+
+            if error is None:
+                yield row
+            else:
+                self.reject(start, error, row)
+
+    def flush(self):
+        """
+        Write the buffered rows to the file.
+
+        Returns:
+            int: The size of the reject file in bytes.
+
+        """
+        self._file.flush()
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        """Close the reject file."""
+        self._file.close()
+
+
+class CheckpointFile:
+    """
+    JSON file recording the progress of a conversion.
+
+    The file is replaced atomically at every checkpoint, so it always holds
+    a complete checkpoint, and removed once the conversion has finished.
+
+    Args:
+        path: Path of the checkpoint file.
+        every: Number of written rows between two checkpoints.
+        resume: If True, continue from the checkpoint in the file, if any.
+
+    Raises:
+        ValueError: If every is smaller than 1.
+
+    """
+
+    def __init__(self, path, *, every=DEFAULT_CHECKPOINT_ROWS, resume=False):
+        if every < 1:
+            msg = f"Invalid checkpoint interval: {every}"
+            raise ValueError(msg)
+
+        self.path = path
+        self.every = every
+        self.resume = resume
+        self._identity = None
+
+    def begin(self, identity):
+        """
+        Return the checkpoint a conversion continues from.
+
+        Without resume, an old checkpoint is removed, so it cannot be
+        resumed from after the output has been written again.
+
+        Args:
+            identity: JSON-compatible description of the input file and the
+                options of the conversion.
+
+        Returns:
+            Checkpoint | None: The checkpoint, or None if the conversion
+                starts at the beginning of the input.
+
+        Raises:
+            ValueError: If the checkpoint was recorded for another input
+                file or other options.
+
+        """
+        self._identity = json.loads(json.dumps(identity))
+
+        if not self.resume:
+            self.finish()
+            return None
+
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        if (
+            data.get("format") != CHECKPOINT_FORMAT
+            or data.get("identity") != self._identity
+        ):
+            msg = (
+                f"The checkpoint {self.path} was recorded for another input "
+                "file or other options"
+            )
+            raise ValueError(msg)
+
+        return Checkpoint(**data["checkpoint"])
+
+    def save(self, checkpoint):
+        """
+        Replace the checkpoint in the file.
+
+        Args:
+            checkpoint: Checkpoint to record.
+
+        """
+        data = {
+            "format": CHECKPOINT_FORMAT,
+            "identity": self._identity,
+            "checkpoint": checkpoint._asdict(),
+        }
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def write_rows(self, sink, rows, position, rejects, start):
+        """
+        Write rows and save a checkpoint every self.every rows.
+
+        Args:
+            sink: Opened CsvSink or JsonLinesSink writing to a file.
+            rows: Iterable of converted rows, read lazily from the input.
+            position: InputPosition counting the input lines.
+            rejects: RejectFile, or None.
+            start: Checkpoint the conversion continues from.
+
+        """
+        every = self.every
+        written = start.rows
+        write = sink.write
+
+        for row in rows:
+            write(row)
+            written += 1
+
+            if written % every == 0:
+                sink.flush()
+                self.save(
+                    Checkpoint(
+                        position.line,
+                        position.offset,
+                        os.path.getsize(sink.path),
+                        0 if rejects is None else rejects.flush(),
+                        written,
+                        0 if rejects is None else rejects.count,
+                    )
+                )
+
+    def finish(self):
+        """Remove the checkpoint file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -6,9 +6,407 @@ the main entry point for the CLI tool.
 """
 
 import argparse
+import itertools
+import os
 import sys
 
-from .core import process_csv_file
+from .constants import DEFAULT_CACHE_SIZE, KEYS, STDIO_PATH
+
+
+def positive_int(value):
+    """
+    Convert a command-line value to a positive integer.
+
+    Args:
+        value: String value given on the command line.
+
+    Returns:
+        int: The parsed value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive integer.
+
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+
+    if number < 1:
+        msg = f"invalid positive integer: {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+
+    return number
+
+
+def non_negative_int(value):
+    """
+    Convert a command-line value to a non-negative integer.
+
+    Args:
+        value: String value given on the command line.
+
+    Returns:
+        int: The parsed value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a non-negative integer.
+
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+
+    if number < 0:
+        msg = f"invalid non-negative integer: {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+
+    return number
+
+
+def column_list(value):
+    """
+    Split a comma-separated list of column names.
+
+    Args:
+        value: String value given on the command line.
+
+    Returns:
+        list[str]: The column names without surrounding whitespace.
+
+    Raises:
+        argparse.ArgumentTypeError: If the list contains no column name.
+
+    """
+    columns = [column.strip() for column in value.split(",") if column.strip()]
+
+    if not columns:
+        msg = f"invalid column list: {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+
+    return columns
+
+
+def date_value(value):
+    """
+    Convert a command-line value to a date.
+
+    Args:
+        value: Date in ELBA ('DD.MM.YYYY') or ISO ('YYYY-MM-DD') format.
+
+    Returns:
+        datetime.date: The parsed date.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid date.
+
+    """
+    from .values import parse_date
+
+    try:
+        return parse_date(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def amount_value(value):
+    """
+    Convert a command-line value to an amount.
+
+    Args:
+        value: Amount with a decimal comma or a decimal point.
+
+    Returns:
+        Decimal: The parsed amount.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid amount.
+
+    """
+    from .values import parse_amount
+
+    try:
+        return parse_amount(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def key_name(value):
+    """
+    Check that a command-line value is one of the keys in KEYS.
+
+    Args:
+        value: String value given on the command line.
+
+    Returns:
+        str: The key.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a known key.
+
+    """
+    if value not in KEYS:
+        msg = f"unknown key: {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+
+    return value
+
+
+def key_text(value):
+    """
+    Split a command-line value of the form KEY=TEXT.
+
+    Args:
+        value: String value given on the command line.
+
+    Returns:
+        tuple[str, str]: The key and the text.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value contains no '=' or the key is
+            not known.
+
+    """
+    key, sep, text = value.partition("=")
+
+    if not sep:
+        msg = f"expected KEY=TEXT: {value!r}"
+        raise argparse.ArgumentTypeError(msg)
+
+    return key_name(key.strip()), text
+
+
+def partitioning(value):
+    """
+    Convert a command-line value to a partitioning.
+
+    Args:
+        value: 'month', 'column=NAME', 'rows=N' or 'bytes=N'.
+
+    Returns:
+        Partitioning: The parsed partitioning.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid partitioning.
+
+    """
+    from .partition import Partitioning
+
+    try:
+        return Partitioning.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def load_key_files(parser):
+    """
+    Register the keys of the files given with --keys.
+
+    The files are loaded before the other arguments are parsed, so options
+    such as --has-key accept the registered keys.
+
+    Args:
+        parser: The argument parser, used to report errors.
+
+    """
+    # The registry imports the parser, which the startup of plain conversions
+    # and --help should not pay for; argparse accepts --k and --ke for --keys
+    if not any(arg.startswith("--k") for arg in sys.argv[1:]):
+        return
+
+    from .registry import load_keys, register_keys
+
+    pre_parser = argparse.ArgumentParser(add_help=False)
+    pre_parser.add_argument("--keys", action="append", default=[])
+    known, _ = pre_parser.parse_known_args()
+
+    try:
+        for path in known.keys:
+            register_keys(load_keys(path))
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot load keys: {e}")
+
+
+def check_discovery_arguments(parser, args):
+    """
+    Check the arguments of --discover-keys.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    if args.save_keys and not args.discover_keys:
+        parser.error("--save-keys requires --discover-keys")
+
+    if args.discover_keys and (
+        args.input_csv or args.output_csv or args.batch or args.clear_cache
+    ):
+        parser.error("--discover-keys cannot be combined with files to convert")
+
+
+def check_aggregate_arguments(parser, args):
+    """
+    Check the arguments of --aggregate.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    if not args.aggregate:
+        return
+
+    conflicts = [
+        option
+        for option, value in (
+            ("--batch", args.batch),
+            ("--incremental", args.incremental),
+            ("--merge", args.merge),
+            ("--columns", args.columns),
+            ("--cache", args.cache or args.cache_dir),
+        )
+        if value
+    ]
+    if conflicts:
+        parser.error(f"--aggregate cannot be combined with {', '.join(conflicts)}")
+
+
+def check_consolidate_arguments(parser, args):
+    """
+    Check the arguments of --consolidate.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    if not args.consolidate:
+        if args.output or args.dedupe:
+            parser.error("--output and --dedupe require --consolidate")
+        return
+
+    if not args.output:
+        parser.error("--consolidate requires --output")
+
+    conflicts = [
+        option
+        for option, value in (
+            ("input_csv", args.input_csv or args.output_csv),
+            ("--batch", args.batch),
+            ("--incremental", args.incremental or args.index_file),
+            ("--aggregate", args.aggregate),
+            ("--stats", args.stats),
+            ("--cache", args.cache or args.cache_dir or args.clear_cache),
+        )
+        if value
+    ]
+    if conflicts:
+        parser.error(f"--consolidate cannot be combined with {', '.join(conflicts)}")
+
+
+def check_partition_arguments(parser, args):
+    """
+    Check the arguments of --partition.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    if not args.partition:
+        return
+
+    conflicts = [
+        option
+        for option, value in (
+            ("--batch", args.batch),
+            ("--incremental", args.incremental or args.index_file),
+            ("--aggregate", args.aggregate),
+            ("--cache", args.cache or args.cache_dir),
+            ("output to stdout", STDIO_PATH in {args.output_csv, args.output}),
+        )
+        if value
+    ]
+    if conflicts:
+        parser.error(f"--partition cannot be combined with {', '.join(conflicts)}")
+
+
+def check_checkpoint_arguments(parser, args):
+    """
+    Check the arguments of --reject-file, --checkpoint and --resume.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    checkpoint = args.checkpoint or args.resume
+    if args.checkpoint_rows and not checkpoint:
+        parser.error("--checkpoint-rows requires --checkpoint or --resume")
+
+    for option, selected, conflicts in (
+        (
+            "--reject-file",
+            args.reject_file,
+            (
+                ("--batch", args.batch),
+                ("--consolidate", args.consolidate),
+                ("--aggregate", args.aggregate),
+            ),
+        ),
+        (
+            "--checkpoint",
+            checkpoint,
+            (
+                ("--batch", args.batch),
+                ("--consolidate", args.consolidate),
+                ("--aggregate", args.aggregate),
+                ("--partition", args.partition),
+                ("--incremental", args.incremental or args.index_file),
+                ("--cache", args.cache or args.cache_dir),
+                ("stdin or stdout", STDIO_PATH in {args.input_csv, args.output_csv}),
+            ),
+        ),
+    ):
+        names = [name for name, value in conflicts if value]
+        if selected and names:
+            parser.error(f"{option} cannot be combined with {', '.join(names)}")
+
+
+def check_arguments(parser, args):
+    """
+    Check combinations of arguments that argparse cannot express.
+
+    Args:
+        parser: The argument parser, used to report errors.
+        args: Parsed command-line arguments.
+
+    """
+    check_discovery_arguments(parser, args)
+    check_aggregate_arguments(parser, args)
+    check_consolidate_arguments(parser, args)
+    check_partition_arguments(parser, args)
+    check_checkpoint_arguments(parser, args)
+
+    if args.discover_keys or args.consolidate:
+        return
+
+    if args.clear_cache:
+        if args.input_csv or args.output_csv or args.batch:
+            parser.error("--clear-cache cannot be combined with files to convert")
+    elif args.batch:
+        if args.input_csv or args.output_csv:
+            parser.error("input_csv and output_csv cannot be combined with --batch")
+        if args.stats or args.index_file:
+            parser.error("--stats and --index-file cannot be combined with --batch")
+    elif not args.input_csv or not args.output_csv:
+        parser.error("the following arguments are required: input_csv, output_csv")
+    elif args.output_dir:
+        parser.error("--output-dir requires --batch")
+    elif args.incremental and args.output_csv == STDIO_PATH and not args.index_file:
+        parser.error("--incremental with output to stdout requires --index-file")
 
 
 def parse_command_line_args():
@@ -16,16 +414,112 @@ def parse_command_line_args():
     Parse command-line arguments for CSV processing.
 
     Returns:
-        Parsed arguments containing input_csv and output_csv paths.
+        Parsed arguments containing input_csv and output_csv paths, or the
+        paths given with --batch or --discover-keys.
 
     """
     parser = argparse.ArgumentParser(
         description="Process an ELBA-generated CSV file and write results to an output CSV file.",
     )
 
-    parser.add_argument("input_csv", help="Path to the input CSV file.")
+    parser.add_argument(
+        "input_csv", nargs="?", help="Path to the input CSV file, or - for stdin."
+    )
+
+    parser.add_argument(
+        "output_csv", nargs="?", help="Path to the output CSV file, or - for stdout."
+    )
+
+    parser.add_argument(
+        "--batch",
+        help="Convert several files, glob patterns or directories instead of a single file",
+        nargs="+",
+        metavar="PATH",
+    )
+
+    parser.add_argument(
+        "--consolidate",
+        help="Convert several files, glob patterns or directories into one output ordered by date",
+        nargs="+",
+        metavar="PATH",
+    )
+
+    parser.add_argument(
+        "--output",
+        help="Output file of --consolidate, or - for stdout",
+        metavar="FILE",
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        help="With --consolidate, write transactions that occur in several inputs only once",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--memory-mb",
+        help="Memory used by --consolidate to sort rows before they are spilled to temporary files (default: %(default)s)",
+        type=positive_int,
+        default=256,
+        metavar="MB",
+    )
+
+    parser.add_argument(
+        "--discover-keys",
+        help="Scan files, glob patterns or directories for keys that are not known and report them",
+        nargs="+",
+        metavar="PATH",
+    )
+
+    parser.add_argument(
+        "--save-keys",
+        help="With --discover-keys, also write the report as JSON, which --keys can load",
+        metavar="FILE",
+    )
+
+    parser.add_argument(
+        "--keys",
+        help="Recognize the additional keys listed in this JSON file; may be repeated",
+        action="append",
+        metavar="FILE",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        help="Directory for the output files of --batch (default: next to each input file)",
+    )
+
+    parser.add_argument(
+        "--format",
+        help="Output format; by default inferred from the output file extension (.jsonl, .sqlite, .db), otherwise CSV",
+        choices=["csv", "jsonl", "sqlite"],
+    )
+
+    parser.add_argument(
+        "--partition",
+        help="Write one file per month, per value of a column, or per N rows or bytes: month, column=NAME, rows=N or bytes=N[k|M|G]",
+        type=partitioning,
+        metavar="SPEC",
+    )
+
+    parser.add_argument(
+        "--max-open-files",
+        help="Number of partition files open at the same time (default: %(default)s)",
+        type=positive_int,
+        default=32,
+        metavar="N",
+    )
+
+    parser.add_argument(
+        "--table",
+        help="Name of the table written by the sqlite format (default: transactions)",
+    )
 
-    parser.add_argument("output_csv", help="Path to the output CSV file.")
+    parser.add_argument(
+        "--sqlite-indexes",
+        help="Create indexes on the date and IBAN columns of the sqlite table",
+        action="store_true",
+    )
 
     parser.add_argument(
         "--merge",
@@ -33,7 +527,458 @@ def parse_command_line_args():
         action="store_true",
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--columns",
+        help="Comma-separated list of the output columns, in output order (default: all columns)",
+        type=column_list,
+    )
+
+    filters = parser.add_argument_group(
+        "filters", "Only transactions matching all filters are converted."
+    )
+
+    filters.add_argument(
+        "--since",
+        help="Keep transactions executed on or after this date (DD.MM.YYYY or YYYY-MM-DD)",
+        type=date_value,
+        metavar="DATE",
+    )
+
+    filters.add_argument(
+        "--until",
+        help="Keep transactions executed on or before this date (DD.MM.YYYY or YYYY-MM-DD)",
+        type=date_value,
+        metavar="DATE",
+    )
+
+    filters.add_argument(
+        "--min-amount",
+        help="Keep transactions whose signed amount is at least this value",
+        type=amount_value,
+        metavar="AMOUNT",
+    )
+
+    filters.add_argument(
+        "--max-amount",
+        help="Keep transactions whose signed amount is at most this value",
+        type=amount_value,
+        metavar="AMOUNT",
+    )
+
+    filters.add_argument(
+        "--currency",
+        help="Comma-separated list of the currencies to keep, e.g. EUR",
+        type=column_list,
+        metavar="CODES",
+    )
+
+    filters.add_argument(
+        "--has-key",
+        help="Keep transactions with a non-empty value for this key; may be repeated",
+        type=key_name,
+        action="append",
+        metavar="KEY",
+    )
+
+    filters.add_argument(
+        "--contains",
+        help="Keep transactions whose value for KEY contains TEXT (case-insensitive); may be repeated",
+        type=key_text,
+        action="append",
+        metavar="KEY=TEXT",
+    )
+
+    parser.add_argument(
+        "--aggregate",
+        help="Write the number and sum of the amounts per month, counterparty or currency instead of the transactions",
+        choices=["month", "counterparty", "currency"],
+    )
+
+    parser.add_argument(
+        "--jobs",
+        help="Number of worker processes used for large files, or files converted at the same time with --batch (default: 1)",
+        type=positive_int,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--parse-cache-size",
+        help=f"Number of distinct transaction texts whose parse result is cached, e.g. {DEFAULT_CACHE_SIZE}; 0 disables the cache (default: %(default)s)",
+        type=non_negative_int,
+        default=0,
+    )
+
+    parser.add_argument(
+        "--incremental",
+        help="Skip transactions converted in earlier runs and append new ones to the output file",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--index-file",
+        help="Fingerprint index used by --incremental (default: OUTPUT_CSV.fingerprints)",
+    )
+
+    tolerance = parser.add_argument_group(
+        "fault tolerance",
+        "Malformed rows can be set aside, and interrupted conversions continued.",
+    )
+
+    tolerance.add_argument(
+        "--reject-file",
+        help="Write rows that cannot be converted to this CSV file, with their line number and the reason, instead of stopping",
+        metavar="FILE",
+    )
+
+    tolerance.add_argument(
+        "--checkpoint",
+        help="Save the progress to OUTPUT_CSV.checkpoint.json while converting",
+        action="store_true",
+    )
+
+    tolerance.add_argument(
+        "--checkpoint-rows",
+        help="Number of written rows between two checkpoints (default: 100000)",
+        type=positive_int,
+        metavar="ROWS",
+    )
+
+    tolerance.add_argument(
+        "--resume",
+        help="Continue an interrupted conversion at its last checkpoint (implies --checkpoint)",
+        action="store_true",
+    )
+
+    cache = parser.add_argument_group(
+        "result cache",
+        "Unchanged exports converted again with the same options are copied from the cache.",
+    )
+
+    cache.add_argument(
+        "--cache",
+        help="Use the result cache in $ELBACSV_CACHE_DIR, or ~/.cache/elbacsv",
+        action="store_true",
+    )
+
+    cache.add_argument(
+        "--cache-dir",
+        help="Use the result cache in this directory (implies --cache)",
+        metavar="DIR",
+    )
+
+    cache.add_argument(
+        "--cache-max-mb",
+        help="Size limit of the result cache; least recently used results are removed (default: 1024)",
+        type=positive_int,
+        default=1024,
+        metavar="MB",
+    )
+
+    cache.add_argument(
+        "--clear-cache",
+        help="Remove all results from the cache and exit",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--stats",
+        help="Print timing and throughput statistics to stderr as text (default) or JSON",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+    )
+
+    load_key_files(parser)
+    args = parser.parse_args()
+
+    check_arguments(parser, args)
+
+    return args
+
+
+def build_filters(args):
+    """
+    Create the row filters selected on the command line.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        list[RowFilter] | None: The filters, or None if no filter was given.
+
+    """
+    from . import filters
+
+    selected = []
+
+    if args.since is not None:
+        selected.append(filters.since(args.since))
+    if args.until is not None:
+        selected.append(filters.until(args.until))
+    if args.min_amount is not None:
+        selected.append(filters.min_amount(args.min_amount))
+    if args.max_amount is not None:
+        selected.append(filters.max_amount(args.max_amount))
+    if args.currency:
+        selected.append(filters.currency(*args.currency))
+
+    selected.extend(filters.has_key(key) for key in args.has_key or ())
+    selected.extend(itertools.starmap(filters.contains, args.contains or ()))
+
+    return selected or None
+
+
+def sink_options(args):
+    """
+    Return the options of the SQLite sink selected on the command line.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        dict: Keyword arguments for SqliteSink; empty if none were given.
+
+    """
+    options = {}
+    if args.table:
+        options["table"] = args.table
+    if args.sqlite_indexes:
+        options["indexes"] = True
+    return options
+
+
+def output_sink(args, path):
+    """
+    Create the sink for the output selected on the command line.
+
+    Args:
+        args: Parsed command-line arguments.
+        path: Path of the output file, or '-' for standard output.
+
+    Returns:
+        Sink: A PartitionSink with --partition, otherwise the sink of the
+            output format.
+
+    """
+    if args.partition:
+        from .partition import PartitionSink
+
+        return PartitionSink(
+            path,
+            args.partition,
+            output_format=args.format,
+            sink_options=sink_options(args),
+            max_open=args.max_open_files,
+        )
+
+    from .sinks import make_sink
+
+    return make_sink(path, args.format, **sink_options(args))
+
+
+def format_error(e):
+    """
+    Return the error message printed for an exception.
+
+    Args:
+        e: Exception raised while processing a file.
+
+    Returns:
+        str: Human-readable error message.
+
+    """
+    if isinstance(e, FileNotFoundError):
+        return f"Error: File not found - {e}"
+    if isinstance(e, PermissionError):
+        return f"Error: Permission denied - {e}"
+    if isinstance(e, ValueError):
+        return f"Error: Invalid input - {e}"
+    return f"Error: An unexpected error occurred - {e}"
+
+
+def result_cache(args):
+    """
+    Create the result cache selected on the command line.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        ResultCache | None: The cache, or None if it is not used.
+
+    """
+    if not (args.cache or args.cache_dir or args.clear_cache):
+        return None
+
+    from .cache import ResultCache
+
+    return ResultCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+
+def checkpoint_file(args):
+    """
+    Create the checkpoint file selected on the command line.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        CheckpointFile | None: The checkpoint file, or None if no checkpoints
+            are recorded.
+
+    """
+    if not (args.checkpoint or args.resume):
+        return None
+
+    from .checkpoint import CHECKPOINT_SUFFIX, DEFAULT_CHECKPOINT_ROWS, CheckpointFile
+
+    return CheckpointFile(
+        args.output_csv + CHECKPOINT_SUFFIX,
+        every=args.checkpoint_rows or DEFAULT_CHECKPOINT_ROWS,
+        resume=args.resume,
+    )
+
+
+def silence_stdout():
+    """
+    Redirect standard output to the null device.
+
+    Called when the reader of a pipeline has gone away, so that flushing
+    standard output at exit does not raise BrokenPipeError again.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+
+def run_batch(args):
+    """
+    Convert all files given with --batch and report the result of each file.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        int: 0 if all files were converted, 1 otherwise.
+
+    """
+    from .batch import convert_many
+
+    try:
+        results = convert_many(
+            args.batch,
+            output_dir=args.output_dir,
+            merge=args.merge,
+            jobs=args.jobs,
+            incremental=args.incremental,
+            output_format=args.format,
+            sink_options=sink_options(args),
+            cache_size=args.parse_cache_size,
+            columns=args.columns,
+            filters=build_filters(args),
+            result_cache=result_cache(args),
+        )
+    except ValueError as e:
+        print(format_error(e), file=sys.stderr)
+        return 1
+
+    for result in results:
+        if result.ok:
+            print(f"OK: {result.input_csv} -> {result.output_csv}")
+        else:
+            print(f"{result.input_csv}: {format_error(result.error)}", file=sys.stderr)
+
+    failed = sum(not result.ok for result in results)
+    print(f"{len(results) - failed} converted, {failed} failed", file=sys.stderr)
+
+    return 1 if failed or not results else 0
+
+
+def run_consolidation(args):
+    """
+    Consolidate the files given with --consolidate into one output.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        int: 0 if all files were consolidated, 1 otherwise.
+
+    """
+    from .consolidate import consolidate
+
+    try:
+        result = consolidate(
+            args.consolidate,
+            output_sink(args, args.output),
+            merge=args.merge,
+            dedupe=args.dedupe,
+            memory_limit=args.memory_mb * 1024 * 1024,
+            jobs=args.jobs,
+            cache_size=args.parse_cache_size,
+            columns=args.columns,
+            filters=build_filters(args),
+        )
+    except BrokenPipeError:
+        silence_stdout()
+        return 1
+    except Exception as e:
+        print(format_error(e), file=sys.stderr)
+        return 1
+
+    print(
+        f"{len(result.inputs)} files consolidated: {result.rows} rows written, "
+        f"{result.duplicates} duplicates removed",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_discovery(args):
+    """
+    Scan the files given with --discover-keys and report unknown keys.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        int: 0 if all files were scanned, 1 otherwise.
+
+    """
+    from .discovery import discover_keys, format_report, save_report
+
+    try:
+        candidates = discover_keys(args.discover_keys, jobs=args.jobs)
+        if args.save_keys:
+            save_report(candidates, args.save_keys)
+    except Exception as e:
+        print(format_error(e), file=sys.stderr)
+        return 1
+
+    print(format_report(candidates))
+    return 0
+
+
+def write_aggregate(args, sink, stats):
+    """
+    Write the totals selected with --aggregate.
+
+    Args:
+        args: Parsed command-line arguments.
+        sink: Sink for the totals.
+        stats: ConversionStats instance, or None.
+
+    """
+    from .aggregate import write_summary
+
+    write_summary(
+        args.input_csv,
+        sink,
+        args.aggregate,
+        jobs=args.jobs,
+        stats=stats,
+        cache_size=args.parse_cache_size,
+        filters=build_filters(args),
+    )
 
 
 def main():
@@ -41,22 +986,69 @@ def main():
     Main entry point for the CSV processing script.
 
     Parses command-line arguments and processes the specified input CSV file,
-    writing the parsed results to the specified output CSV file.
+    writing the parsed results to the specified output CSV file. With --batch,
+    several files are converted and the outcome of each file is reported.
     """
     args = parse_command_line_args()
 
+    if args.clear_cache:
+        cache = result_cache(args)
+        print(
+            f"Removed {cache.clear()} results from {cache.directory}", file=sys.stderr
+        )
+        sys.exit(0)
+
+    if args.discover_keys:
+        sys.exit(run_discovery(args))
+
+    if args.batch:
+        sys.exit(run_batch(args))
+
+    if args.consolidate:
+        sys.exit(run_consolidation(args))
+
+    # Imported here so that --help and argument errors do not pay for them
+    from .core import process_csv_file
+    from .incremental import INDEX_SUFFIX
+    from .stats import ConversionStats
+
+    stats = ConversionStats() if args.stats else None
+
+    index_file = None
+    if args.incremental:
+        index_file = args.index_file or args.output_csv + INDEX_SUFFIX
+
     try:
-        process_csv_file(args.input_csv, args.output_csv, args.merge)
-    except FileNotFoundError as e:
-        print(f"Error: File not found - {e}", file=sys.stderr)
-        sys.exit(1)
-    except PermissionError as e:
-        print(f"Error: Permission denied - {e}", file=sys.stderr)
+        sink = output_sink(args, args.output_csv)
+        if args.aggregate:
+            write_aggregate(args, sink, stats)
+        else:
+            process_csv_file(
+                args.input_csv,
+                sink,
+                args.merge,
+                jobs=args.jobs,
+                stats=stats,
+                cache_size=args.parse_cache_size,
+                index_file=index_file,
+                columns=args.columns,
+                filters=build_filters(args),
+                result_cache=result_cache(args),
+                reject_file=args.reject_file,
+                checkpoint=checkpoint_file(args),
+            )
+    except BrokenPipeError:
+        # The next command of the pipeline stopped reading, e.g. head
+        silence_stdout()
         sys.exit(1)
     except Exception as e:
-        print(f"Error: An unexpected error occurred - {e}", file=sys.stderr)
+        print(format_error(e), file=sys.stderr)
         sys.exit(1)
 
+    if stats is not None:
+        report = stats.to_json() if args.stats == "json" else stats.format_text()
+        print(report, file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
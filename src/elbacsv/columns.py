@@ -0,0 +1,473 @@
+"""
+Typed columnar storage of converted transactions.
+
+The converted rows are strings: amounts with a decimal comma and dates in
+'DD.MM.YYYY' format. A ColumnSink turns the native columns into compact
+integer arrays while the rows are converted, so consumers do not need to
+parse them again row by row:
+
+- amounts are stored in cents,
+- dates as days since 1970-01-01,
+- timestamps as milliseconds since 1970-01-01, without a time zone,
+- the currency and the counterparty as codes into a list of labels.
+
+Values that are missing or cannot be parsed are stored as MISSING. If NumPy
+is installed, the columns are NumPy arrays; dates and timestamps are
+datetime64 arrays, in which MISSING is NaT. Otherwise they are arrays of the
+array module. Both share the memory of the collected values, so no copy is
+made when the sink is closed.
+"""
+
+import array
+import datetime as dt
+import functools
+import importlib
+from decimal import ROUND_HALF_EVEN
+from typing import NamedTuple
+
+from .core import process_csv_file
+from .plan import TransformPlan
+from .sinks import Sink
+from .values import parse_amount, parse_date
+
+# Value stored for missing or invalid values; NaT in NumPy datetime64 arrays
+MISSING = -(2**63)
+
+# Factor between amounts and the stored integers
+AMOUNT_SCALE = 100
+
+# Ordinal of the day that is stored as 0
+EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+# Output columns read by ColumnSink
+DATE_COLUMNS = ("Durchführungsdatum", "Valutadatum")
+AMOUNT_COLUMN = "Betrag"
+TIMESTAMP_COLUMN = "Zeitstempel"
+CURRENCY_COLUMN = "Währung"
+
+# Columns naming the counterparty, in order of preference
+NAME_COLUMNS = ("Empfänger", "Auftraggeber")
+IBAN_COLUMNS = ("IBAN Empfänger", "IBAN Zahlungsempfänger", "IBAN Auftraggeber")
+
+# All columns read by ColumnSink, e.g. for a TransformPlan
+SOURCE_COLUMNS = (
+    DATE_COLUMNS[0],
+    *NAME_COLUMNS,
+    *IBAN_COLUMNS,
+    DATE_COLUMNS[1],
+    AMOUNT_COLUMN,
+    CURRENCY_COLUMN,
+    TIMESTAMP_COLUMN,
+)
+
+# Type codes of the arrays used without NumPy
+_INTEGER_TYPE = "q"
+_CODE_TYPE = "i"
+
+# NumPy types of the typed columns
+_NUMPY_TYPES = {
+    "durchfuehrungsdatum": "datetime64[D]",
+    "valutadatum": "datetime64[D]",
+    "betrag": "int64",
+    "zeitstempel": "datetime64[ms]",
+}
+
+
+def load_numpy(use_numpy=None):
+    """
+    Return the NumPy module if it is used.
+
+    Args:
+        use_numpy: True to require NumPy, False to never use it, None to use
+            it if it is installed.
+
+    Returns:
+        module | None: The numpy module, or None.
+
+    Raises:
+        ImportError: If use_numpy is True and NumPy is not installed.
+
+    """
+    if use_numpy is False:
+        return None
+
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        if use_numpy:
+            raise
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def date_days(text):
+    """
+    Convert a date to days since 1970-01-01.
+
+    Args:
+        text: Date in ELBA or ISO format, or an empty string.
+
+    Returns:
+        int: The number of days, or MISSING.
+
+    """
+    if not text:
+        return MISSING
+
+    try:
+        return parse_date(text).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        return MISSING
+
+
+def amount_cents(text):
+    """
+    Convert an amount to cents.
+
+    Amounts with exactly two decimals after a comma, as written by ELBA, are
+    converted without creating a Decimal.
+
+    Args:
+        text: Amount with a decimal comma or point, or an empty string.
+
+    Returns:
+        int: The amount in cents, rounded half to even, or MISSING.
+
+    """
+    text = text.strip()
+
+    if text[-3:-2] == "," and text[-2:].isdigit():
+        whole = text[:-3].replace(".", "")
+        if whole.lstrip("+-").isdigit():
+            return int(whole + text[-2:])
+
+    try:
+        amount = parse_amount(text)
+    except ValueError:
+        return MISSING
+
+    return int((amount * AMOUNT_SCALE).to_integral_value(ROUND_HALF_EVEN))
+
+
+def timestamp_ms(text):
+    """
+    Convert an ELBA timestamp to milliseconds since 1970-01-01.
+
+    Args:
+        text: Timestamp such as '15.01.2024 10:00:00:000'. ISO timestamps
+            and dates without a time are accepted as well.
+
+    Returns:
+        int: The number of milliseconds, or MISSING.
+
+    """
+    text = text.strip()
+    days = date_days(text[:10])
+    if days == MISSING:
+        return MISSING
+
+    time = text[11:]
+    if not time:
+        return days * 86_400_000
+
+    parts = time.replace(".", ":").split(":")
+    parts += ["0"] * (4 - len(parts))
+    hours, minutes, seconds, fraction = parts[:4]
+
+    try:
+        return (
+            ((days * 24 + int(hours)) * 60 + int(minutes)) * 60_000
+            + int(seconds) * 1000
+            + int(fraction[:3].ljust(3, "0"))
+        )
+    except ValueError:
+        return MISSING
+
+
+def format_amount(cents):
+    """
+    Format an amount in cents like ELBA, with a decimal comma.
+
+    Args:
+        cents: Amount in cents.
+
+    Returns:
+        str: The amount, e.g. '-1234,56'.
+
+    """
+    sign = "-" if cents < 0 else ""
+    whole, fraction = divmod(abs(cents), AMOUNT_SCALE)
+    return f"{sign}{whole},{fraction:02d}"
+
+
+class Categorical(NamedTuple):
+    """Column of codes into a tuple of labels."""
+
+    codes: object
+    labels: tuple
+
+    def values(self):
+        """
+        Return the label of every row.
+
+        Returns:
+            list: The labels in row order.
+
+        """
+        labels = self.labels
+        return [labels[code] for code in self.codes]
+
+
+class TypedColumns:
+    """
+    Typed columns of converted transactions.
+
+    Attributes:
+        durchfuehrungsdatum: Days since 1970-01-01.
+        valutadatum: Days since 1970-01-01.
+        betrag: Amounts in cents.
+        zeitstempel: Milliseconds since 1970-01-01.
+        waehrung: Categorical of the currency codes.
+        gegenpartei: Categorical of (name, IBAN) pairs of the counterparty:
+            the first non-empty value of NAME_COLUMNS and of IBAN_COLUMNS.
+        invalid: Number of non-empty values that could not be parsed.
+        numpy: True if the columns are NumPy arrays.
+
+    """
+
+    def __init__(self, arrays, waehrung, gegenpartei, *, invalid=0, numpy=None):
+        self.numpy = numpy is not None
+        if numpy is not None:
+            arrays = {
+                name: numpy.frombuffer(values, dtype=_NUMPY_TYPES[name])
+                for name, values in arrays.items()
+            }
+            waehrung = waehrung._replace(
+                codes=numpy.frombuffer(waehrung.codes, dtype=numpy.int32)
+            )
+            gegenpartei = gegenpartei._replace(
+                codes=numpy.frombuffer(gegenpartei.codes, dtype=numpy.int32)
+            )
+
+        self.durchfuehrungsdatum = arrays["durchfuehrungsdatum"]
+        self.valutadatum = arrays["valutadatum"]
+        self.betrag = arrays["betrag"]
+        self.zeitstempel = arrays["zeitstempel"]
+        self.waehrung = waehrung
+        self.gegenpartei = gegenpartei
+        self.invalid = invalid
+
+    def __len__(self):
+        return len(self.betrag)
+
+    def __repr__(self):
+        return f"TypedColumns({len(self)} rows)"
+
+    def integers(self, name):
+        """
+        Return a column as integers, whether or not NumPy is used.
+
+        Args:
+            name: 'durchfuehrungsdatum', 'valutadatum', 'betrag' or
+                'zeitstempel'.
+
+        Returns:
+            Sequence[int]: The stored integers, with MISSING for missing
+                values; an int64 view of a NumPy array.
+
+        """
+        values = getattr(self, name)
+        return values.view("int64") if self.numpy else values
+
+
+class _Categories:
+    """Assigns codes to labels in order of appearance."""
+
+    def __init__(self):
+        self.codes = {}
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.codes)
+        return code
+
+    def labels(self):
+        return tuple(self.codes)
+
+
+def _column_indexes(header, names):
+    """
+    Return the positions of columns in the header.
+
+    Args:
+        header: Names of the output columns.
+        names: Names of the columns to look up.
+
+    Returns:
+        tuple[int, ...]: The positions of the names that are in the header.
+
+    """
+    return tuple(header.index(name) for name in names if name in header)
+
+
+def _first(row, indexes):
+    """
+    Return the first non-empty value of several columns.
+
+    Args:
+        row: List of strings.
+        indexes: Positions of the columns, in order of preference.
+
+    Returns:
+        str: The value, or '' if all columns are empty or missing.
+
+    """
+    for i in indexes:
+        if row[i]:
+            return row[i]
+    return ""
+
+
+class ColumnSink(Sink):
+    """
+    Sink collecting the native columns as typed arrays.
+
+    Only the columns in SOURCE_COLUMNS are read; other columns are ignored
+    and missing ones are stored as MISSING or empty labels. After the sink
+    is closed, the columns are available as a TypedColumns instance.
+
+    Args:
+        use_numpy: True to require NumPy, False to use the array module,
+            None to use NumPy if it is installed.
+
+    Attributes:
+        columns: TypedColumns of the written rows, set by close.
+        dialect: CSV dialect of the input file, set by open.
+
+    """
+
+    def __init__(self, *, use_numpy=None):
+        super().__init__(None)
+        self.numpy = load_numpy(use_numpy)
+        self.columns = None
+        self.dialect = "excel"
+        self._converters = self._missing = ()
+        self._currency_indexes = self._name_indexes = self._iban_indexes = ()
+        self._reset()
+
+    def _reset(self):
+        self._arrays = {name: array.array(_INTEGER_TYPE) for name in _NUMPY_TYPES}
+        self._currency_codes = array.array(_CODE_TYPE)
+        self._counterparty_codes = array.array(_CODE_TYPE)
+        self._currencies = _Categories()
+        self._counterparties = _Categories()
+        self._invalid = 0
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Resolve the positions of the source columns.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file, kept for writing a
+                summary in the same dialect.
+            append: If True, the rows are added to the collected columns.
+
+        """
+        header = list(header)
+        if not append:
+            self._reset()
+
+        self.dialect = dialect
+
+        # Append function, converter and column position of each typed column
+        # in the header; columns that are not in the header are always missing
+        self._converters = []
+        self._missing = []
+        for name, convert, column in (
+            ("durchfuehrungsdatum", date_days, DATE_COLUMNS[0]),
+            ("valutadatum", date_days, DATE_COLUMNS[1]),
+            ("betrag", amount_cents, AMOUNT_COLUMN),
+            ("zeitstempel", timestamp_ms, TIMESTAMP_COLUMN),
+        ):
+            append_value = self._arrays[name].append
+            if column in header:
+                self._converters.append((append_value, convert, header.index(column)))
+            else:
+                self._missing.append(append_value)
+
+        self._currency_indexes = _column_indexes(header, (CURRENCY_COLUMN,))
+        self._name_indexes = _column_indexes(header, NAME_COLUMNS)
+        self._iban_indexes = _column_indexes(header, IBAN_COLUMNS)
+
+    def write(self, row):
+        """
+        Add the typed values of one converted row.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        for append_value, convert, index in self._converters:
+            text = row[index]
+            value = convert(text)
+            if value == MISSING and text.strip():
+                self._invalid += 1
+            append_value(value)
+
+        for append_value in self._missing:
+            append_value(MISSING)
+
+        currency = _first(row, self._currency_indexes).strip().upper()
+        self._currency_codes.append(self._currencies.code(currency))
+
+        counterparty = (
+            _first(row, self._name_indexes),
+            _first(row, self._iban_indexes),
+        )
+        self._counterparty_codes.append(self._counterparties.code(counterparty))
+
+    def close(self, error=None):
+        """
+        Build the typed columns, unless the conversion failed.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        if error is not None:
+            return
+
+        self.columns = TypedColumns(
+            self._arrays,
+            Categorical(self._currency_codes, self._currencies.labels()),
+            Categorical(self._counterparty_codes, self._counterparties.labels()),
+            invalid=self._invalid,
+            numpy=self.numpy,
+        )
+
+
+def load_columns(input_csv, *, use_numpy=None, **options):
+    """
+    Convert an ELBA export into typed columns.
+
+    Only the columns in SOURCE_COLUMNS are extracted from the structured
+    column, which makes the conversion faster than a full one.
+
+    Args:
+        input_csv: Path of the input file, or '-' for standard input.
+        use_numpy: True to require NumPy, False to use the array module,
+            None to use NumPy if it is installed.
+        **options: Keyword arguments of process_csv_file, e.g. jobs, stats
+            or filters.
+
+    Returns:
+        TypedColumns: The typed columns.
+
+    """
+    sink = ColumnSink(use_numpy=use_numpy)
+    process_csv_file(
+        input_csv, sink, False, plan=TransformPlan(columns=SOURCE_COLUMNS), **options
+    )
+    return sink.columns
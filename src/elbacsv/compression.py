@@ -0,0 +1,255 @@
+"""
+Transparent compression of input and output files.
+
+Compressed input is detected from the magic bytes at the start of the file,
+so archived exports can be converted without decompressing them to disk
+first. Output is compressed if the name of the output file ends with one of
+the extensions in COMPRESSION_EXTENSIONS. Only the codecs of the standard
+library are used, and data streams through them without intermediate files.
+"""
+
+import contextlib
+import importlib
+import io
+import os
+import sys
+
+from .constants import STDIO_PATH
+from .formats import LEGACY_FALLBACK, detect_encoding
+
+# File extensions of compressed files and the name of their codec
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+# Magic bytes at the start of compressed data and the name of their codec
+MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+
+# Number of bytes needed to recognize all codecs
+MAGIC_SIZE = max(len(magic) for magic, _ in MAGIC_BYTES)
+
+# Number of bytes peeked at to detect the encoding
+ENCODING_SAMPLE_SIZE = 8192
+
+# Standard library modules implementing the codecs
+_CODEC_MODULES = {"gzip": "gzip", "bz2": "bz2", "xz": "lzma"}
+
+# Options used when compressing; gzip defaults to its slowest level
+_OUTPUT_OPTIONS = {"gzip": {"compresslevel": 6}}
+
+
+def codec(name):
+    """
+    Return the standard library module of a codec.
+
+    The modules are imported on first use, so uncompressed conversions do
+    not pay for them.
+
+    Args:
+        name: Name of the codec, 'gzip', 'bz2' or 'xz'.
+
+    Returns:
+        module: The module, which provides an open function.
+
+    """
+    return importlib.import_module(_CODEC_MODULES[name])
+
+
+def detect_compression(head):
+    """
+    Return the codec of compressed data from its first bytes.
+
+    Args:
+        head: The first bytes of the data; MAGIC_SIZE bytes are enough.
+
+    Returns:
+        str | None: The name of the codec, or None if the data is not
+            compressed.
+
+    """
+    for magic, name in MAGIC_BYTES:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def split_compression(path):
+    """
+    Split the compression extension from a path.
+
+    Args:
+        path: Path of a file.
+
+    Returns:
+        tuple[str, str]: The path without the compression extension and the
+            extension, or the path and '' if it has none.
+
+    """
+    root, ext = os.path.splitext(path)
+    if ext.lower() in COMPRESSION_EXTENSIONS:
+        return root, ext
+    return path, ""
+
+
+def output_compression(path):
+    """
+    Return the codec used for an output file.
+
+    Args:
+        path: Path of the output file.
+
+    Returns:
+        str | None: The name of the codec, or None if the output is not
+            compressed.
+
+    """
+    return COMPRESSION_EXTENSIONS.get(split_compression(path)[1].lower())
+
+
+def _open_binary(path):
+    """
+    Open an input file in binary mode.
+
+    Args:
+        path: Path of the input file, or '-' for standard input, whose file
+            descriptor is left open when the returned file is closed.
+
+    Returns:
+        BufferedReader: The opened file.
+
+    """
+    if path == STDIO_PATH:
+        return open(sys.stdin.fileno(), "rb", closefd=False)
+    return open(path, "rb")
+
+
+def _input_encoding(binary):
+    """
+    Detect the encoding of an input file from its buffered first bytes.
+
+    A legacy export may start with ASCII rows only, so UTF-8 is decoded
+    with formats.LEGACY_FALLBACK, which decodes the bytes that turn out not
+    to be valid UTF-8 with the legacy encoding. The detection only peeks at
+    ENCODING_SAMPLE_SIZE bytes, however large the file.
+
+    Args:
+        binary: The decompressed input, at the start.
+
+    Returns:
+        tuple[str, str]: The encoding and the error handler of the decoder.
+
+    """
+    encoding = detect_encoding(binary.peek(ENCODING_SAMPLE_SIZE))
+    return encoding, LEGACY_FALLBACK if encoding == "utf-8" else "strict"
+
+
+@contextlib.contextmanager
+def open_binary_input(path, *, offset=0):
+    """
+    Open an input file in binary mode, decompressing it if necessary.
+
+    The codec is detected by peeking at the buffered first bytes, so
+    standard input can be compressed as well.
+
+    Args:
+        path: Path of the input file, or '-' for standard input.
+        offset: Position in the decompressed data where reading starts.
+            Compressed files are decompressed up to the offset; standard
+            input cannot be read from an offset.
+
+    Yields:
+        BinaryIO: The decompressed input, which supports peek.
+
+    """
+    with _open_binary(path) as raw:
+        name = detect_compression(raw.peek(MAGIC_SIZE)[:MAGIC_SIZE])
+        binary = raw if name is None else codec(name).open(raw, "rb")
+
+        if offset:
+            binary.seek(offset)
+
+        yield binary
+
+
+@contextlib.contextmanager
+def open_input(path, encoding=None):
+    """
+    Open an input file as text, decompressing it if necessary.
+
+    Args:
+        path: Path of the input file, or '-' for standard input.
+        encoding: Encoding of the decompressed text. If None, it is detected
+            as described for _input_encoding.
+
+    Yields:
+        TextIO: Text stream opened with newline="".
+
+    """
+    with open_binary_input(path) as binary:
+        errors = "strict"
+        if encoding is None:
+            encoding, errors = _input_encoding(binary)
+
+        with io.TextIOWrapper(
+            binary, encoding=encoding, errors=errors, newline=""
+        ) as text:
+            yield text
+
+
+def decompressed(source):
+    """
+    Return a binary source decompressed if it starts with magic bytes.
+
+    Args:
+        source: Bytes, or a binary file object. Only file objects that
+            support peek, like files opened with open(path, 'rb') and
+            sys.stdin.buffer, are checked.
+
+    Returns:
+        bytes | BinaryIO: The source, or a file object decompressing it.
+
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:MAGIC_SIZE])
+    elif hasattr(source, "peek"):
+        head = source.peek(MAGIC_SIZE)[:MAGIC_SIZE]
+    else:
+        return source
+
+    name = detect_compression(head)
+    if name is None:
+        return source
+
+    if not hasattr(source, "read"):
+        source = io.BytesIO(source)
+    return codec(name).open(source, "rb")
+
+
+def open_output(path, mode="w", *, newline=None):
+    """
+    Open an output file as UTF-8 text, compressed if its extension says so.
+
+    Args:
+        path: Path of the output file.
+        mode: 'w' to write a new file or 'a' to append to it. Compressed
+            files are appended to as a new stream, which all codecs read as
+            part of the file.
+        newline: Newline translation, as for open().
+
+    Returns:
+        TextIO: The opened text stream.
+
+    """
+    name = output_compression(path)
+    if name is None:
+        return open(path, mode, newline=newline, encoding="utf-8")
+
+    return codec(name).open(
+        path,
+        mode + "t",
+        encoding="utf-8",
+        newline=newline,
+        **_OUTPUT_OPTIONS.get(name, {}),
+    )
@@ -0,0 +1,338 @@
+"""
+Consolidation of several exports into one date-ordered output.
+
+Exports of several accounts, or of overlapping periods of one account, are
+converted one after another and merged by Durchführungsdatum and
+Zeitstempel. The converted rows are collected in sorted runs of bounded
+size; a run that would exceed the memory limit is written to a temporary
+file. The runs are then merged with a heap (a k-way merge), which only
+holds one row per run in memory, so histories of any size are consolidated
+with bounded memory.
+
+Rows with the same date and timestamp are ordered by their values, so exact
+duplicates, e.g. from overlapping exports, are adjacent after the merge and
+can be removed while writing.
+"""
+
+import csv
+import heapq
+import os
+import tempfile
+from contextlib import ExitStack
+from typing import NamedTuple
+
+from .batch import expand_inputs
+from .columns import DATE_COLUMNS, TIMESTAMP_COLUMN, date_days, timestamp_ms
+from .core import process_csv_file
+from .sinks import Sink, make_sink
+
+# Default limit of the memory used for rows before a run is spilled, in bytes
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Estimated memory of a row besides the characters of its values: the list
+# and its pointers, and the sort key; and of every str object
+ROW_OVERHEAD = 160
+VALUE_OVERHEAD = 56
+
+# Dialect of the temporary run files
+RUN_DIALECT = "excel"
+
+
+class ConsolidationResult(NamedTuple):
+    """
+    Summary of a consolidation.
+
+    Attributes:
+        inputs: The converted input files, in input order.
+        rows: Number of rows written.
+        duplicates: Number of exact duplicates that were removed.
+        runs: Number of sorted runs that were merged, including the one
+            kept in memory.
+
+    """
+
+    inputs: list
+    rows: int
+    duplicates: int
+    runs: int
+
+
+def sort_key(header):
+    """
+    Return the function computing the sort key of a converted row.
+
+    Rows are ordered by Durchführungsdatum, then by Zeitstempel, then by
+    their values. Rows with a missing or invalid date come first.
+
+    Args:
+        header: Names of the output columns.
+
+    Returns:
+        Callable[[list[str]], tuple]: Function returning the key of a row;
+            the row is the last item of the key.
+
+    Raises:
+        ValueError: If the header contains neither Durchführungsdatum nor
+            Zeitstempel.
+
+    """
+    date = header.index(DATE_COLUMNS[0]) if DATE_COLUMNS[0] in header else None
+    stamp = header.index(TIMESTAMP_COLUMN) if TIMESTAMP_COLUMN in header else None
+
+    if date is None and stamp is None:
+        msg = f"Consolidation needs the {DATE_COLUMNS[0]} or {TIMESTAMP_COLUMN} column"
+        raise ValueError(msg)
+
+    if stamp is None:
+        return lambda row: (date_days(row[date]), 0, row)
+    if date is None:
+        return lambda row: (0, timestamp_ms(row[stamp]), row)
+    return lambda row: (date_days(row[date]), timestamp_ms(row[stamp]), row)
+
+
+def _row_size(row):
+    """
+    Estimate the memory used by a row.
+
+    Args:
+        row: List of strings.
+
+    Returns:
+        int: The estimated size in bytes.
+
+    """
+    return sum(map(len, row)) + VALUE_OVERHEAD * len(row) + ROW_OVERHEAD
+
+
+def _read_run(path, key):
+    """
+    Read a spilled run.
+
+    Args:
+        path: Path of the run file.
+        key: Function returning the sort key of a row.
+
+    Yields:
+        tuple: The sort keys of the rows, in run order.
+
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        yield from map(key, csv.reader(f, RUN_DIALECT))
+
+
+class RunSink(Sink):
+    """
+    Sink collecting converted rows in sorted runs.
+
+    Rows are buffered until their estimated size reaches the memory limit;
+    the buffer is then sorted and written to a file in the run directory.
+    The sink can be opened once per input file: all inputs must have the
+    same columns, and their rows are added to the same runs.
+
+    Args:
+        directory: Directory for the spilled runs.
+        memory_limit: Estimated memory, in bytes, of the buffered rows that
+            triggers a spill.
+
+    Attributes:
+        header: Names of the columns, set by the first open.
+        dialect: CSV dialect of the first input file.
+        spilled: Paths of the spilled runs.
+        rows: Number of rows written to the sink.
+
+    """
+
+    def __init__(self, directory, *, memory_limit=DEFAULT_MEMORY_LIMIT):
+        super().__init__(None)
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.header = None
+        self.dialect = "excel"
+        self.spilled = []
+        self.rows = 0
+        self._key = None
+        self._buffer = []
+        self._size = 0
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Check the columns of the next input file.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file.
+            append: Ignored; rows are always added to the runs.
+
+        Raises:
+            ValueError: If the columns differ from those of the first
+                input file.
+
+        """
+        header = list(header)
+
+        if self.header is None:
+            self._key = sort_key(header)
+            self.header = header
+            self.dialect = dialect
+        elif header != self.header:
+            msg = "All inputs must be converted to the same columns"
+            raise ValueError(msg)
+
+    def write(self, row):
+        """
+        Add one converted row to the current run.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        self._buffer.append(row)
+        self.rows += 1
+        self._size += _row_size(row)
+
+        if self._size >= self.memory_limit:
+            self.spill()
+
+    def close(self, error=None):
+        """
+        Do nothing; the runs are kept until they are merged.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+
+    def spill(self):
+        """Sort the buffered rows and write them to a new run file."""
+        if not self._buffer:
+            return
+
+        path = os.path.join(self.directory, f"run{len(self.spilled):05d}.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f, RUN_DIALECT).writerows(self._sorted_buffer())
+
+        self.spilled.append(path)
+        self._buffer = []
+        self._size = 0
+
+    def _sorted_buffer(self):
+        """
+        Return the buffered rows in key order.
+
+        Returns:
+            list[list[str]]: The sorted rows.
+
+        """
+        key = self._key
+        return [item[-1] for item in sorted(map(key, self._buffer))]
+
+    def runs(self, stack):
+        """
+        Return the runs as iterables of sort keys.
+
+        Args:
+            stack: ExitStack that closes the run files.
+
+        Returns:
+            list[Iterable[tuple]]: The spilled runs and the buffered rows,
+                each in key order.
+
+        """
+        runs = []
+        for path in self.spilled:
+            reader = _read_run(path, self._key)
+            stack.callback(reader.close)
+            runs.append(reader)
+
+        if self._buffer:
+            runs.append(sorted(map(self._key, self._buffer)))
+
+        return runs
+
+
+def merge_runs(runs, *, dedupe=False):
+    """
+    Merge sorted runs with a heap.
+
+    Args:
+        runs: Iterables of sort keys, each in key order.
+        dedupe: If True, rows equal to the previous row are skipped.
+
+    Yields:
+        list[str]: The rows in key order.
+
+    """
+    previous = None
+
+    for item in heapq.merge(*runs):
+        if dedupe and item == previous:
+            continue
+        previous = item
+        yield item[-1]
+
+
+def consolidate(
+    paths,
+    output,
+    *,
+    merge=False,
+    dedupe=False,
+    memory_limit=DEFAULT_MEMORY_LIMIT,
+    output_format=None,
+    sink_options=None,
+    temp_dir=None,
+    **options,
+):
+    """
+    Convert several ELBA exports into one output ordered by date.
+
+    Args:
+        paths: Iterable of file paths, glob patterns or directory paths.
+        output: Path of the output file, '-' for standard output, or a
+            Sink instance.
+        merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+        dedupe: If True, rows that are exact duplicates are written once.
+        memory_limit: Estimated memory, in bytes, of the rows kept in memory
+            before a sorted run is written to a temporary file.
+        output_format: 'csv', 'jsonl' or 'sqlite', as for make_sink.
+        sink_options: Optional keyword arguments for the SQLite sink.
+        temp_dir: Directory for the temporary run files. If None, the
+            default temporary directory is used.
+        **options: Further keyword arguments passed on to process_csv_file,
+            e.g. jobs, columns or filters.
+
+    Returns:
+        ConsolidationResult: The number of written and removed rows.
+
+    Raises:
+        ValueError: If no input files are given.
+
+    """
+    inputs = expand_inputs(paths)
+    if not inputs:
+        msg = "No input files to consolidate"
+        raise ValueError(msg)
+
+    sink = output
+    if not isinstance(sink, Sink):
+        sink = make_sink(output, output_format, **(sink_options or {}))
+
+    with ExitStack() as stack:
+        directory = stack.enter_context(
+            tempfile.TemporaryDirectory(prefix="elbacsv-", dir=temp_dir)
+        )
+        runs = RunSink(directory, memory_limit=memory_limit)
+
+        for input_csv in inputs:
+            process_csv_file(input_csv, runs, merge, **options)
+
+        sorted_runs = runs.runs(stack)
+        written = 0
+
+        with sink:
+            sink.open(runs.header, dialect=runs.dialect)
+            for row in merge_runs(sorted_runs, dedupe=dedupe):
+                sink.write(row)
+                written += 1
+
+    return ConsolidationResult(inputs, written, runs.rows - written, len(sorted_runs))
@@ -2,7 +2,7 @@
 Constants used throughout the elbacsv package.
 
 This module defines the recognized keys in ELBA CSV files along with their
-column order indices.
+column order indices, and default values of processing options.
 """
 
 KEYS = {
@@ -29,3 +29,9 @@ KEYS = {
     "Empfänger": 5,
     "Mandat": 3,
 }
+
+# Default number of distinct transaction texts kept by the parse cache
+DEFAULT_CACHE_SIZE = 4096
+
+# Path standing for standard input or standard output
+STDIO_PATH = "-"
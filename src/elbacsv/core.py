@@ -5,10 +5,47 @@ This module contains the main parsing and processing functions
 for transforming ELBA CSV files into normalized format.
 """
 
+import codecs
 import csv
-import re
+import functools
+import io
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
 
-from .constants import KEYS
+from .checkpoint import (
+    NO_PROGRESS,
+    InputPosition,
+    RejectFile,
+    checked_rows,
+    input_identity,
+    truncate_file,
+)
+from .compression import (
+    decompressed,
+    open_binary_input,
+    open_input,
+    output_compression,
+)
+from .constants import STDIO_PATH
+from .filters import RowFilter, filter_rows, rejecting_filter, split_filters
+from .formats import LEGACY_FALLBACK, detect_dialect, detect_encoding
+from .incremental import FingerprintIndex
+from .mapped import can_map, mapped_rows, record_line
+from .parser import CachingParser, default_parser
+from .plan import TransformPlan
+from .records import record_type
+from .registry import register_keys, registered_keys
+from .sinks import CsvSink, JsonLinesSink, Sink, SqliteSink, make_sink
+from .stats import ConversionStats
+
+# Minimum input size in bytes for which a process pool is used
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+# Number of rows sent to a worker process at once
+PARALLEL_CHUNK_ROWS = 2000
 
 
 def parse_key_value_string(s):
@@ -18,6 +55,7 @@ def parse_key_value_string(s):
     Extracts structured data from a string where keys are followed by colons
     and values. The function recognizes keys defined in the global KEYS list
     and creates a dictionary with all keys, setting empty strings for missing ones.
+    The work is delegated to the shared KeyValueParser instance for KEYS.
 
     Args:
         s: Input string containing key-value pairs in format "Key: Value".
@@ -31,17 +69,29 @@ def parse_key_value_string(s):
         {'Empfänger': 'John Doe', 'Betrag': '100', ...}
 
     """
-    result = dict.fromkeys(KEYS.keys(), "")
+    return default_parser().parse(s)
+
+
+def parse_record(s):
+    """
+    Parse a string into a Record of the keys defined in KEYS.
+
+    Unlike parse_key_value_string, no dict is built. The values are stored
+    in a tuple in output column order and can be accessed by attribute,
+    position or key; call to_dict() on the record to get a dict.
 
-    # Build regex: (Key1|Key2|Key3):
-    pattern = r"(" + "|".join(map(re.escape, KEYS.keys())) + r")\s*:\s*"
-    parts = re.split(pattern, s)
+    Args:
+        s: Input string containing key-value pairs in format "Key: Value".
+
+    Returns:
+        Record: The values of all keys, empty strings for missing ones.
 
-    it = iter(parts[1:])  # skip text before first key
-    for key, value in zip(it, it, strict=False):
-        result[key.strip()] = value.strip()
+    Example:
+        >>> parse_record("Empfänger: John Doe").empfaenger
+        'John Doe'
 
-    return result
+    """
+    return default_parser().parse_record(s)
 
 
 def strip_zwnbsp(x):
@@ -59,85 +109,1165 @@ def strip_zwnbsp(x):
     return x.replace("\ufeff", "") if isinstance(x, str) else x
 
 
-def process_csv_file(input_csv, output_csv, merge):
+def _source_lines(source, encoding):
+    """
+    Return an iterator over the lines of an in-memory or streamed export.
+
+    Args:
+        source: Bytes, a text or binary file object, or an iterable of lines
+            as strings or bytes. Compressed bytes and binary files are
+            decompressed, see compression.decompressed.
+        encoding: Encoding used to decode bytes. If None, it is detected
+            from the first line with formats.detect_encoding; bytes that
+            turn out not to be UTF-8 later are decoded with the legacy
+            encoding.
+
+    Returns:
+        Iterator[str]: The lines of the export.
+
+    Raises:
+        TypeError: If source is a string or a path.
+
+    """
+    if isinstance(source, (str, os.PathLike)):
+        msg = "source must be bytes, a file object or an iterable of lines, not a path"
+        raise TypeError(msg)
+
+    source = decompressed(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    # Binary file objects and iterables of bytes are decoded incrementally
+    lines = iter(source)
+    first = next(lines, "")
+    lines = itertools.chain((first,), lines)
+
+    if isinstance(first, (bytes, bytearray)):
+        errors = "strict"
+        if encoding is None:
+            encoding = detect_encoding(first)
+            errors = LEGACY_FALLBACK if encoding == "utf-8" else errors
+        return codecs.iterdecode(lines, encoding, errors)
+
+    return lines
+
+
+def _convert_rows(rows, plan, parser, *, filters=()):
+    """
+    Expand the structured column of each row into separate columns.
+
+    Args:
+        rows: Iterable of input rows as lists of strings.
+        plan: TransformPlan of the output rows.
+        parser: KeyValueParser or CachingParser used for the second column.
+        filters: Filters on parsed keys, evaluated on the record before merging.
+
+    Yields:
+        list[str]: The converted row with ZWNBSP characters removed.
+
+    """
+    second_col_index = 1
+    parse_values = parser.parse_values
+    make_record = parser.record_type._make
+    merge, build = plan.compile(parser.record_keys)
+
+    for row in rows:
+        values = parse_values(row[second_col_index])
+
+        if filters and rejecting_filter(make_record(values), filters) is not None:
+            continue
+
+        # Combine the values of merged keys, e.g. the references with --merge
+        if merge is not None:
+            merge(values)
+
+        yield [strip_zwnbsp(v) for v in build(row, values)]
+
+
+def _convert_rows_instrumented(rows, plan, parser, stats, *, filters=()):
+    """
+    Expand the structured column of each row and record statistics.
+
+    Behaves like _convert_rows, but measures the time spent in the parse,
+    merge and build stages and counts the rows and the keys found. A parser
+    extracting selected keys only finds those, which is recorded in
+    stats.counted_keys.
+
+    Args:
+        rows: Iterable of input rows as lists of strings.
+        plan: TransformPlan of the output rows.
+        parser: KeyValueParser or CachingParser used for the second column.
+        stats: ConversionStats instance that is updated.
+        filters: Filters on parsed keys, evaluated on the record before merging.
+
+    Yields:
+        list[str]: The converted row with ZWNBSP characters removed.
+
+    """
+    second_col_index = 1
+    perf_counter = time.perf_counter
+    hits, misses = _cache_counts(parser)
+    make_record = parser.record_type._make
+    merge, build = plan.compile(parser.record_keys)
+
+    if set(parser.fields) != set(parser.keys):
+        stats.counted_keys = parser.fields
+
+    for row in rows:
+        start = perf_counter()
+        pairs = tuple(parser.iter_pairs(row[second_col_index]))
+        stats.key_counts.update(key for key, _ in pairs)
+        values = parser.values_from_pairs(pairs)
+        parsed = perf_counter()
+        stats.add("parse", parsed - start)
+
+        if filters:
+            rejected = rejecting_filter(make_record(values), filters)
+            filtered = perf_counter()
+            stats.add("filter", filtered - parsed)
+            parsed = filtered
+
+            if rejected is not None:
+                stats.filtered[rejected.name] += 1
+                continue
+
+        if merge is not None:
+            merge(values)
+            merged = perf_counter()
+            stats.add("merge", merged - parsed)
+            parsed = merged
+
+        new_row = [strip_zwnbsp(v) for v in build(row, values)]
+        stats.add("build", perf_counter() - parsed)
+        stats.rows += 1
+
+        yield new_row
+
+    hits, misses = _cache_counts(parser, hits, misses)
+    stats.cache_hits += hits
+    stats.cache_misses += misses
+
+
+def _timed_rows(rows, stats):
+    """
+    Yield rows from an iterable and record the time spent reading them.
+
+    Args:
+        rows: Iterable of rows, typically a csv.reader.
+        stats: ConversionStats instance that is updated.
+
+    Yields:
+        list[str]: The rows of the iterable.
+
+    """
+    perf_counter = time.perf_counter
+    it = iter(rows)
+
+    while True:
+        start = perf_counter()
+        row = next(it, None)
+        stats.add("read", perf_counter() - start)
+
+        if row is None:
+            return
+
+        yield row
+
+
+def _write_rows_instrumented(sink, rows, stats):
+    """
+    Write rows and record the time spent in the sink.
+
+    Args:
+        sink: Opened Sink for the output.
+        rows: Iterable of converted rows.
+        stats: ConversionStats instance that is updated.
+
+    """
+    perf_counter = time.perf_counter
+    write = sink.write
+
+    for row in rows:
+        start = perf_counter()
+        write(row)
+        stats.add("write", perf_counter() - start)
+
+
+@functools.cache
+def _worker_parser(cache_size, fields=None):
+    """
+    Return the parser of a worker process.
+
+    The parser, and with it the cache, is kept for all chunks that are
+    converted by the same worker process.
+
+    Args:
+        cache_size: Size of the parse cache; 0 disables caching.
+        fields: Optional tuple of the keys whose values are extracted.
+
+    Returns:
+        KeyValueParser | CachingParser: The parser of the worker process.
+
+    """
+    return _make_parser(cache_size, fields)
+
+
+def _make_parser(cache_size, fields=None):
+    """
+    Return the parser used for a conversion.
+
+    Args:
+        cache_size: Size of the parse cache; 0 disables caching.
+        fields: Optional tuple of the keys whose values are extracted.
+            Defaults to all keys.
+
+    Returns:
+        KeyValueParser | CachingParser: The shared parser, with a cache in
+            front of it if cache_size is positive.
+
+    """
+    if cache_size > 0:
+        return CachingParser(default_parser(fields), cache_size)
+
+    return default_parser(fields)
+
+
+def _convert_chunk(rows, plan, cache_size, collect_stats, *, filters=()):
+    """
+    Convert a chunk of rows in a worker process.
+
+    Args:
+        rows: List of input rows.
+        plan: TransformPlan of the output rows.
+        cache_size: Size of the parse cache of the worker; 0 disables caching.
+        collect_stats: If True, collect statistics for the chunk.
+        filters: Filters on parsed keys, evaluated before merging.
+
+    Returns:
+        tuple[list[list[str]], ConversionStats | None]: The converted rows and
+            the statistics of the chunk, if requested.
+
+    """
+    parser = _worker_parser(cache_size, plan.fields(filters))
+
+    if not collect_stats:
+        return list(_convert_rows(rows, plan, parser, filters=filters)), None
+
+    stats = ConversionStats()
+    converted = list(
+        _convert_rows_instrumented(rows, plan, parser, stats, filters=filters)
+    )
+
+    return converted, stats
+
+
+def _cache_counts(parser, hits=0, misses=0):
+    """
+    Return the cache hits and misses of a parser since a previous reading.
+
+    Args:
+        parser: KeyValueParser or CachingParser.
+        hits: Number of hits at the previous reading.
+        misses: Number of misses at the previous reading.
+
+    Returns:
+        tuple[int, int]: Hits and misses since the previous reading, or zeros
+            if the parser has no cache.
+
+    """
+    if not isinstance(parser, CachingParser):
+        return 0, 0
+
+    return parser.hits - hits, parser.misses - misses
+
+
+def _convert_rows_parallel(rows, plan, stats, *, jobs, cache_size, filters=()):
+    """
+    Convert rows in a process pool while preserving their order.
+
+    The rows are produced by a csv.reader in the calling process, so every
+    chunk consists of complete records, including quoted fields that span
+    several lines. At most two chunks per worker are in flight at any time,
+    which keeps memory usage bounded.
+
+    Args:
+        rows: Iterable of input rows as lists of strings.
+        plan: TransformPlan of the output rows; it is compiled in each worker.
+        stats: ConversionStats instance that is updated, or None.
+        jobs: Number of worker processes.
+        cache_size: Size of the parse cache of each worker; 0 disables caching.
+        filters: Filters on parsed keys, evaluated before merging.
+
+    Yields:
+        list[str]: The converted rows in input order.
+
+    """
+    # Imported here because it is slow to import and rarely needed
+    from concurrent.futures import ProcessPoolExecutor
+
+    it = iter(rows)
+    chunks = iter(lambda: list(itertools.islice(it, PARALLEL_CHUNK_ROWS)), [])
+
+    collect_stats = stats is not None
+
+    def results(future):
+        converted, chunk_stats = future.result()
+        if chunk_stats is not None:
+            stats.update(chunk_stats)
+        return converted
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=register_keys, initargs=(registered_keys(),)
+    ) as pool:
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append(
+                pool.submit(
+                    _convert_chunk,
+                    chunk,
+                    plan,
+                    cache_size,
+                    collect_stats,
+                    filters=filters,
+                )
+            )
+            if len(pending) >= 2 * jobs:
+                yield from results(pending.popleft())
+
+        while pending:
+            yield from results(pending.popleft())
+
+
+def _input_rows(reader, stats, filters, index):
+    """
+    Wrap the CSV reader with timing, the raw filters and the fingerprint index.
+
+    Filters run before the index, so rows dropped by a filter are not
+    recorded as converted. Filters on parsed keys run after this stage, so
+    with an index they have to be turned into raw filters with
+    _raw_row_filters.
+
+    Args:
+        reader: csv.reader for the input file.
+        stats: ConversionStats instance that is updated, or None.
+        filters: Filters on the raw input row.
+        index: FingerprintIndex for incremental conversion, or None.
+
+    Returns:
+        Iterator[list[str]]: The input rows that have to be converted.
+
+    """
+    rows = reader
+
+    if stats is not None:
+        rows = _timed_rows(rows, stats)
+
+    if filters:
+        rows = filter_rows(rows, filters, stats)
+
+    if index is not None:
+        rows = index.new_rows(rows)
+
+    return rows
+
+
+def _parsed_predicate(parse_record, row_filter, row):
+    return row_filter(parse_record(row[1]))
+
+
+def _raw_row_filters(parsed_filters):
+    """
+    Turn filters on parsed keys into filters on the raw input row.
+
+    The structured text is parsed for the keys of the filters only, and the
+    last parsed text is cached, so a row is parsed once for all filters.
+
+    Args:
+        parsed_filters: Filters on parsed keys.
+
+    Returns:
+        tuple[RowFilter, ...]: Filters with the same names on the raw row.
+
+    """
+    keys = tuple(dict.fromkeys(key for f in parsed_filters for key in f.keys))
+    parse_record = CachingParser(default_parser(keys), maxsize=1).parse_record
+
+    return tuple(
+        RowFilter(f.name, functools.partial(_parsed_predicate, parse_record, f))
+        for f in parsed_filters
+    )
+
+
+def _split_filters(filters, index_file):
+    """
+    Split filters into those on the raw row and those on parsed keys.
+
+    The fingerprint index records every row it passes on as converted, so
+    with an index all filters run on the raw row, before the index.
+
+    Args:
+        filters: The filters to split.
+        index_file: Path to the fingerprint index, or None.
+
+    Returns:
+        tuple: The filters on the raw row and the filters on parsed keys.
+
+    """
+    raw_filters, parsed_filters = split_filters(filters)
+
+    if index_file is None or not parsed_filters:
+        return raw_filters, parsed_filters
+
+    return (*raw_filters, *_raw_row_filters(parsed_filters)), ()
+
+
+def _writes_stream(sink):
+    """
+    Return whether a sink writes to standard output or a file object.
+
+    Args:
+        sink: Sink the converted rows are written to.
+
+    Returns:
+        bool: True if the output is not a file given by its path.
+
+    """
+    return sink.path == STDIO_PATH or hasattr(sink.path, "write")
+
+
+def _incremental_index(index_file, sink):
+    """
+    Load the fingerprint index and decide whether the output is appended to.
+
+    New rows are appended to an existing, non-empty output file; otherwise
+    the index is reset, so it matches the output. Rows written to standard
+    output or a file object are passed on, so the index is always kept.
+
+    Args:
+        index_file: Path of the fingerprint index, or None.
+        sink: Sink the converted rows are written to.
+
+    Returns:
+        tuple[FingerprintIndex | None, bool]: The index, or None if not
+            converting incrementally, and whether to append to the output.
+
+    Raises:
+        ValueError: If the output file exists but the index does not, so
+            every row would be appended again.
+
+    """
+    if index_file is None:
+        return None, False
+
+    if _writes_stream(sink):
+        return FingerprintIndex(index_file, reset=False), False
+
+    append = os.path.exists(sink.path) and os.path.getsize(sink.path) > 0
+    if append and not os.path.exists(index_file):
+        msg = (
+            f"{sink.path} exists but its fingerprint index {index_file} is "
+            "missing; remove the output file to convert all rows again"
+        )
+        raise ValueError(msg)
+
+    return FingerprintIndex(index_file, reset=not append), append
+
+
+@contextmanager
+def _restoring_output(sink, append):
+    """
+    Cut the output file back to its size before appending if the block fails.
+
+    The fingerprint index is only saved after a successful conversion, so
+    rows appended by a failed run would be appended again by the next one.
+    SQLite rolls the transaction back itself.
+
+    Args:
+        sink: Sink the converted rows are written to.
+        append: Whether the rows are appended to the output file.
+
+    Yields:
+        None: Control to the conversion.
+
+    """
+    size = None
+    if append and not isinstance(sink, SqliteSink):
+        size = os.path.getsize(sink.path)
+
+    try:
+        yield
+    except BaseException:
+        if size is not None:
+            os.truncate(sink.path, size)
+        raise
+
+
+def _result_cache_key(
+    result_cache, input_csv, sink, index_file, options, *, side_outputs=False
+):
+    """
+    Return the key of a conversion in the result cache.
+
+    Only conversions from an input file to a CSV or JSON Lines output file
+    are cached. Incremental conversions depend on the index, SQLite output
+    may share its database with other tables, reject and checkpoint files
+    would not be written on a hit, and filters without a signature, e.g.
+    with a lambda as predicate, could change without changing the key, so
+    they are not.
+
+    Args:
+        result_cache: ResultCache instance, or None.
+        input_csv: Path to the input file, or '-'.
+        sink: Sink the converted rows are written to.
+        index_file: Path of the fingerprint index, or None.
+        options: Options that change the output, as accepted by
+            ResultCache.key, with the filters as [name, signature] pairs.
+        side_outputs: If True, the conversion writes a reject file or
+            checkpoints besides the output.
+
+    Returns:
+        str | None: The key, or None if the conversion is not cached.
+
+    """
+    if side_outputs or any(signature is None for _, signature in options["filters"]):
+        return None
+
+    if (
+        result_cache is None
+        or index_file is not None
+        or input_csv == STDIO_PATH
+        or not isinstance(sink, (CsvSink, JsonLinesSink))
+        or _writes_stream(sink)
+    ):
+        return None
+
+    options = {
+        **options,
+        "sink": type(sink).__name__,
+        "compression": output_compression(sink.path),
+    }
+    return result_cache.key(input_csv, **options)
+
+
+def _begin_checkpoint(checkpoint, input_csv, sink, *, index_file, reject_file, options):
+    """
+    Check a conversion with checkpoints and return where it continues.
+
+    When resuming, the output and reject files are cut back to their size
+    at the checkpoint.
+
+    Args:
+        checkpoint: CheckpointFile recording the progress.
+        input_csv: Path to the input file, or '-'.
+        sink: Sink the converted rows are written to.
+        index_file: Path of the fingerprint index, or None.
+        reject_file: Path of the reject file, or None.
+        options: Options that change the output, as for _result_cache_key.
+
+    Returns:
+        Checkpoint | None: The checkpoint the conversion continues from, or
+            None if it starts at the beginning of the input.
+
+    Raises:
+        ValueError: If the input is standard input, the conversion is
+            incremental, or the output is not an uncompressed CSV or JSON
+            Lines file, or the reject file is compressed.
+
+    """
+    if input_csv == STDIO_PATH or index_file is not None:
+        msg = "Checkpoints need an input file and cannot be combined with incremental conversion"
+        raise ValueError(msg)
+
+    if (
+        not isinstance(sink, (CsvSink, JsonLinesSink))
+        or _writes_stream(sink)
+        or output_compression(sink.path) is not None
+        or (reject_file is not None and output_compression(reject_file) is not None)
+    ):
+        msg = "Checkpoints need uncompressed CSV or JSON Lines output and reject files"
+        raise ValueError(msg)
+
+    resume = checkpoint.begin({
+        "input": input_identity(input_csv),
+        "sink": type(sink).__name__,
+        "reject_file": reject_file is not None,
+        **options,
+    })
+
+    if resume is not None:
+        truncate_file(sink.path, resume.output)
+        if reject_file is not None:
+            truncate_file(reject_file, resume.rejects)
+
+    return resume
+
+
+def _mapped_input(stack, input_csv, f_in, dialect, use_mmap):
+    """
+    Return the rows of an input file read through a memory map, if it is used.
+
+    Args:
+        stack: ExitStack that closes the memory map.
+        input_csv: Path to the input file, or '-'.
+        f_in: Input file opened with open_input, whose encoding and error
+            handler are used.
+        dialect: CSV dialect of the input file.
+        use_mmap: True to require the memory map, False to never use it,
+            None to use it if the file can be mapped.
+
+    Returns:
+        Iterator[list[str]] | None: The rows, checked with checked_rows,
+            or None if the file is read with csv.reader.
+
+    Raises:
+        ValueError: If use_mmap is True and the file cannot be mapped.
+
+    """
+    if use_mmap is False:
+        return None
+
+    if not can_map(input_csv, f_in.encoding):
+        if use_mmap:
+            msg = f"{input_csv} cannot be read through a memory map"
+            raise ValueError(msg)
+        return None
+
+    rows = mapped_rows(input_csv, dialect, f_in.encoding, f_in.errors)
+    stack.callback(rows.close)
+    return checked_rows(rows, functools.partial(record_line, input_csv, dialect))
+
+
+def _read_rows(
+    stack,
+    input_csv,
+    f_in,
+    dialect,
+    lines,
+    *,
+    checkpoint,
+    resume,
+    reject_file,
+    use_mmap=None,
+):
+    """
+    Return the input rows, continuing at a checkpoint and rejecting bad rows.
+
+    Without a reject file, a row that cannot be converted ends the
+    conversion with a ValueError naming its line, see checked_rows.
+
+    Args:
+        stack: ExitStack that closes the files opened here.
+        input_csv: Path to the input file, or '-'.
+        f_in: Input file opened with open_input.
+        dialect: CSV dialect of the input file.
+        lines: Lines of the input file returned by detect_dialect.
+        checkpoint: CheckpointFile recording the progress, or None.
+        resume: Checkpoint the conversion continues from, or None.
+        reject_file: Path of the reject file, or None.
+        use_mmap: Whether the file is read through a memory map, as for
+            process_csv_file.
+
+    Returns:
+        tuple[Iterator[list[str]], InputPosition | None, RejectFile | None]:
+            The rows, the position in the input if checkpoints are
+            recorded, and the reject file.
+
+    Raises:
+        ValueError: If use_mmap is True with a checkpoint or a reject file.
+
+    """
+    # Checkpoints and reject files need the line of every row, which only
+    # csv.reader keeps track of
+    if checkpoint is None and reject_file is None:
+        rows = _mapped_input(stack, input_csv, f_in, dialect, use_mmap)
+        if rows is not None:
+            return rows, None, None
+    elif use_mmap:
+        msg = "A memory map cannot be used with checkpoints or a reject file"
+        raise ValueError(msg)
+
+    start = resume or NO_PROGRESS
+    position = None
+
+    if checkpoint is not None:
+        # The input is read again from the start or the checkpoint, so its
+        # bytes can be counted
+        position = InputPosition(
+            f_in.encoding, f_in.errors, line=start.line, offset=start.offset
+        )
+        binary = stack.enter_context(open_binary_input(input_csv, offset=start.offset))
+        lines = position.lines(binary)
+
+    rows = csv.reader(lines, dialect)
+    rejects = None
+
+    if reject_file is not None:
+        rejects = stack.enter_context(
+            RejectFile(
+                reject_file, dialect, append=resume is not None, count=start.rejected
+            )
+        )
+        rows = rejects.rows(rows, line=start.line)
+    else:
+        rows = checked_rows(rows, line=start.line)
+
+    return rows, position, rejects
+
+
+def _convert(rows, plan, stats, *, jobs, cache_size, filters=()):
+    """
+    Convert rows using the serial, instrumented or parallel code path.
+
+    Args:
+        rows: Iterable of input rows as lists of strings.
+        plan: TransformPlan of the output rows.
+        stats: ConversionStats instance that is updated, or None.
+        jobs: Number of worker processes; 1 converts in the calling process.
+        cache_size: Size of the parse cache; 0 disables caching.
+        filters: Filters on parsed keys, evaluated before merging.
+
+    Returns:
+        Iterator[list[str]]: The converted rows in input order.
+
+    """
+    if jobs > 1:
+        return _convert_rows_parallel(
+            rows, plan, stats, jobs=jobs, cache_size=cache_size, filters=filters
+        )
+
+    parser = _make_parser(cache_size, plan.fields(filters))
+
+    if stats is not None:
+        return _convert_rows_instrumented(rows, plan, parser, stats, filters=filters)
+
+    return _convert_rows(rows, plan, parser, filters=filters)
+
+
+def _convert_file(
+    input_csv,
+    sink,
+    plan,
+    *,
+    stats,
+    jobs,
+    cache_size,
+    raw_filters,
+    parsed_filters,
+    index,
+    append,
+    checkpoint,
+    resume,
+    reject_file,
+    use_mmap=None,
+):
+    """
+    Read, convert and write the rows of an input file.
+
+    Args:
+        input_csv: Path to the input file, or '-'.
+        sink: Sink the converted rows are written to.
+        plan: TransformPlan of the output rows.
+        stats: ConversionStats instance that is updated, or None.
+        jobs: Number of worker processes; 1 converts in the calling process.
+        cache_size: Size of the parse cache; 0 disables caching.
+        raw_filters: Filters on the raw input row.
+        parsed_filters: Filters on parsed keys.
+        index: FingerprintIndex for incremental conversion, or None.
+        append: If True, the rows are added to the existing output.
+        checkpoint: CheckpointFile recording the progress, or None.
+        resume: Checkpoint the conversion continues from, or None.
+        reject_file: Path of the reject file, or None.
+        use_mmap: Whether the file is read through a memory map, as for
+            process_csv_file.
+
+    """
+    with ExitStack() as stack:
+        f_in = stack.enter_context(open_input(input_csv))
+        start = time.perf_counter()
+        dialect, lines = detect_dialect(f_in)
+
+        if stats is not None:
+            stats.add("sniff", time.perf_counter() - start)
+
+        rows, position, rejects = _read_rows(
+            stack,
+            input_csv,
+            f_in,
+            dialect,
+            lines,
+            checkpoint=checkpoint,
+            resume=resume,
+            reject_file=reject_file,
+            use_mmap=use_mmap,
+        )
+
+        new_rows = _convert(
+            _input_rows(rows, stats, raw_filters, index),
+            plan,
+            stats,
+            jobs=jobs,
+            cache_size=cache_size,
+            filters=parsed_filters,
+        )
+
+        with sink:
+            sink.open(
+                [strip_zwnbsp(v) for v in plan.header], dialect=dialect, append=append
+            )
+
+            if checkpoint is not None:
+                checkpoint.write_rows(
+                    sink, new_rows, position, rejects, resume or NO_PROGRESS
+                )
+            elif stats is None:
+                sink.write_rows(new_rows)
+            else:
+                _write_rows_instrumented(sink, new_rows, stats)
+
+
+def _transform_plan(plan, merge, columns):
+    """
+    Return the transform plan of a conversion.
+
+    Args:
+        plan: TransformPlan given by the caller, or None.
+        merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+        columns: Optional names of the output columns, in output order.
+
+    Returns:
+        TransformPlan: The given plan, or the plan for merge and columns.
+
+    Raises:
+        ValueError: If a plan is combined with merge or columns.
+
+    """
+    if plan is None:
+        return TransformPlan.from_options(merge=merge, columns=columns)
+
+    if merge or columns is not None:
+        msg = "merge and columns cannot be combined with a plan"
+        raise ValueError(msg)
+
+    return plan
+
+
+class RecordReader:
+    """
+    Lazy iterator over the converted transactions of an ELBA export.
+
+    The export is read from bytes, a file object or an iterable of lines,
+    so uploads can be converted without writing temporary files. Creating
+    the reader only reads the sample used to detect the CSV dialect; rows
+    are read, parsed and converted one at a time while iterating, so memory
+    usage does not depend on the size of the export.
+
+    Every converted row is returned as a Record whose keys are the output
+    columns, e.g. record.betrag or record['IBAN Empfänger'].
+
+    Args:
+        source: Bytes, a text or binary file object, or an iterable of lines
+            as strings or bytes. A path is not accepted; use
+            process_csv_file, or open the file and pass the file object.
+        merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+        columns: Optional names of the output columns, as for process_csv_file.
+        filters: Optional iterable of RowFilter instances, as for process_csv_file.
+        cache_size: Size of the parse cache; 0 disables caching.
+        jobs: Number of worker processes used to parse the rows.
+        encoding: Encoding used to decode bytes. If None, it is detected
+            from a byte order mark or the first line.
+        plan: Optional TransformPlan, as for process_csv_file.
+
+    Attributes:
+        header: Names of the output columns.
+        dialect: CSV dialect detected in the export.
+        record_type: Record type of the returned records.
+
+    """
+
+    def __init__(
+        self,
+        source,
+        *,
+        merge=False,
+        columns=None,
+        filters=None,
+        cache_size=0,
+        jobs=1,
+        encoding=None,
+        plan=None,
+    ):
+        plan = _transform_plan(plan, merge, columns)
+        raw_filters, parsed_filters = split_filters(filters)
+
+        self.header = tuple(strip_zwnbsp(v) for v in plan.header)
+        self.record_type = record_type(self.header)
+        self.dialect, lines = detect_dialect(_source_lines(source, encoding))
+
+        rows = _convert(
+            _input_rows(
+                checked_rows(csv.reader(lines, self.dialect)), None, raw_filters, None
+            ),
+            plan,
+            None,
+            jobs=jobs,
+            cache_size=cache_size,
+            filters=parsed_filters,
+        )
+        self._records = map(self.record_type._make, rows)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._records)
+
+
+def read_records(source, **options):
+    """
+    Convert an ELBA export from bytes, a stream or lines into records.
+
+    Example:
+        >>> for record in read_records(request.body):
+        ...     print(record.durchfuehrungsdatum, record.betrag, record.empfaenger)
+
+    Args:
+        source: Bytes, a text or binary file object, or an iterable of lines.
+        **options: Keyword arguments of RecordReader, e.g. merge, columns,
+            filters or plan.
+
+    Returns:
+        RecordReader: Lazy iterator over the converted records.
+
+    """
+    return RecordReader(source, **options)
+
+
+def write_records(
+    records, target, output_format=None, *, header=None, dialect=None, **options
+):
+    """
+    Write converted records to a file or a file object.
+
+    This is the counterpart of read_records: the records are written as they
+    are produced, so a RecordReader can be streamed straight into a response
+    body or a buffer without keeping all rows in memory.
+
+    Args:
+        records: Iterable of records, e.g. a RecordReader.
+        target: Path of the output file, a writable text or binary file
+            object, or a Sink instance. File objects are not closed.
+        output_format: 'csv', 'jsonl' or 'sqlite', as for make_sink.
+        header: Names of the output columns. Defaults to the header of a
+            RecordReader, or to the keys of the first record.
+        dialect: CSV dialect of the output. Defaults to the dialect of a
+            RecordReader, or to the excel dialect.
+        **options: Keyword arguments for SqliteSink, e.g. table and indexes.
+
+    """
+    if header is None:
+        header = getattr(records, "header", None)
+    if dialect is None:
+        dialect = getattr(records, "dialect", "excel")
+
+    records = iter(records)
+    if header is None:
+        first = next(records, None)
+        if first is None:
+            return
+        header = first.keys()
+        records = itertools.chain((first,), records)
+
+    sink = target
+    if not isinstance(sink, Sink):
+        sink = make_sink(target, output_format, **options)
+
+    with sink:
+        sink.open(list(header), dialect=dialect)
+        sink.write_rows(records)
+
+
+def process_csv_file(
+    input_csv,
+    output_csv,
+    merge,
+    *,
+    jobs=1,
+    stats=None,
+    cache_size=0,
+    index_file=None,
+    columns=None,
+    filters=None,
+    output_format=None,
+    result_cache=None,
+    plan=None,
+    reject_file=None,
+    checkpoint=None,
+    use_mmap=None,
+):
     """
     Process an ELBA CSV file and write parsed results to a new CSV file.
 
     Reads the input CSV file, parses the second column (index 1) which contains
     structured key-value data, expands it into separate columns based on the
-    KEYS list, and writes the result to the output file.
+    KEYS list, and writes the result to the output file. Instead of CSV, the
+    rows can also be written as JSON Lines or loaded into an SQLite database.
+
+    The file is processed as a stream: every row is parsed and written before
+    the next one is read, so memory usage does not depend on the file size.
+    The encoding and the dialect are detected by the formats module from a
+    sample of the decompressed data read ahead of the rows rather than by
+    seeking back, so the input and output can be pipes.
 
     Args:
-        input_csv: Path to the input CSV file to be processed.
-        output_csv: Path to the output CSV file where results will be written.
+        input_csv: Path to the input CSV file to be processed, or '-' to
+            read standard input. Input compressed with gzip, bzip2 or xz is
+            detected from its first bytes and decompressed while reading.
+        output_csv: Path to the output file where results will be written,
+            '-' to write standard output, or a Sink instance from the sinks
+            module. Output files ending in .gz, .bz2 or .xz are compressed.
         merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz' columns.
+        jobs: Number of worker processes used to parse the rows. Files smaller
+            than PARALLEL_MIN_BYTES are always processed in a single process.
+        stats: Optional ConversionStats instance. If given, it is filled in
+            with timing, throughput and key statistics. Without it, the
+            conversion runs without any instrumentation overhead.
+        cache_size: Number of distinct structured strings whose parse result
+            is cached, so recurring transactions are parsed only once. The
+            cache only pays off for exports with many recurring texts, so
+            it is not used by default.
+        index_file: Path of a fingerprint index for incremental conversion.
+            If given, rows whose fingerprint is in the index are skipped and
+            the remaining rows are appended to the output file if it already
+            exists. The index is reset when the output file does not exist,
+            and a ValueError is raised if the output file exists without
+            it. If the conversion fails, the output file is cut back to its
+            previous size and the index is left unchanged. When writing to
+            standard output, only the new rows are written and the index is
+            never reset.
+        columns: Optional names of the output columns, in output order. Only
+            the selected keys are extracted from the structured column, which
+            makes the conversion faster and the output smaller. Key
+            boundaries are still determined by all keys. A ValueError is
+            raised if a column does not exist in the output.
+        filters: Optional iterable of RowFilter instances from the filters
+            module; only rows accepted by all filters are written. Filters
+            on the native columns run before the structured column is
+            parsed, filters on parsed keys right after it. With stats, the
+            rows dropped by each filter are counted.
+        output_format: 'csv', 'jsonl' or 'sqlite'. If None, the format is
+            inferred from the extension of output_csv, defaulting to CSV.
+        result_cache: Optional ResultCache. If the same input content was
+            converted with the same options before, the cached output is
+            copied instead of converting the file; otherwise the output is
+            added to the cache. Filters are identified by their names.
+            Standard input, incremental conversions and SQLite output are
+            never cached, and no statistics are collected on a hit.
+        plan: Optional TransformPlan with custom merges, renamed or dropped
+            columns. It is compiled once per conversion; merge and columns
+            must not be given with it. A ValueError is raised otherwise.
+        reject_file: Optional path of a reject file. If given, rows that
+            cannot be parsed as CSV or have too few fields are written to it
+            with their line number and the reason instead of aborting the
+            conversion, see checkpoint.RejectFile.
+        checkpoint: Optional CheckpointFile. If given, the input position
+            and the output size are saved every checkpoint.every rows, and a
+            conversion that was interrupted continues at the last checkpoint
+            if the CheckpointFile was created with resume. The rows are then
+            converted in a single process. Only input files and uncompressed
+            CSV or JSON Lines output files are supported, and the conversion
+            must not be incremental. The checkpoint file is removed once the
+            conversion has finished.
+        use_mmap: True to read the input file through a memory map, False to
+            read it with csv.reader, None to use the memory map if the file
+            can be mapped, see mapped.can_map. The memory map is not used
+            with a reject file or checkpoints. A ValueError is raised if it
+            is required but cannot be used.
 
     Note:
         The function assumes the second column (index 1) contains the structured
         data to be parsed. All other columns are preserved in their original positions.
 
     """
-    with open(input_csv, newline="", encoding="utf-8") as f:
-        sample = f.read(1024)
-        dialect = csv.Sniffer().sniff(sample)
-        f.seek(0)
-        reader = csv.reader(f, dialect)
-        rows = list(reader)
+    plan = _transform_plan(plan, merge, columns)
 
-    second_col_index = 1
+    sink = output_csv
+    if not isinstance(sink, Sink):
+        sink = make_sink(output_csv, output_format)
 
-    # Sort keys by their values in the KEYS dictionary
-    sorted_keys = sorted(KEYS.keys(), key=lambda k: KEYS[k])
+    options = {
+        "plan": plan.to_dict(),
+        "filters": [[f.name, f.signature] for f in filters or ()],
+    }
 
-    new_header = [
-        "Durchführungsdatum",
-        *list(sorted_keys),
-        "Valutadatum",
-        "Betrag",
-        "Währung",
-        "Zeitstempel",
-    ]
+    cache_key = _result_cache_key(
+        result_cache,
+        input_csv,
+        sink,
+        index_file,
+        options,
+        side_outputs=reject_file is not None or checkpoint is not None,
+    )
+    if cache_key is not None and result_cache.fetch(cache_key, sink.path):
+        return
 
-    new_rows = []
-    for row in rows:
-        row_data = parse_key_value_string(row[second_col_index])
-
-        # If merge is True, combine Zahlungsreferenz, Verwendungszweck and Auftraggeberreferenz
-        if merge:
-            zahlungsreferenz = row_data["Zahlungsreferenz"].strip()
-            verwendungszweck = row_data["Verwendungszweck"].strip()
-            auftraggeberreferenz = row_data["Auftraggeberreferenz"].strip()
-
-            # Collect all non-empty values
-            merged_parts = [
-                part
-                for part in [zahlungsreferenz, verwendungszweck, auftraggeberreferenz]
-                if part
-            ]
-
-            # Merge the fields with space separation
-            row_data["Verwendungszweck"] = " ".join(merged_parts)
-
-            # If merge is True, remove 'Zahlungsreferenz' and 'Auftraggeberreferenz' from sorted_keys
-            sorted_keys = [
-                k
-                for k in sorted_keys
-                if k not in {"Zahlungsreferenz", "Auftraggeberreferenz"}
-            ]
-
-        new_row = (
-            row[:second_col_index]
-            + [row_data[k] for k in sorted_keys]
-            + row[second_col_index + 1 :]
+    raw_filters, parsed_filters = _split_filters(filters, index_file)
+
+    resume = None
+    if checkpoint is not None:
+        resume = _begin_checkpoint(
+            checkpoint,
+            input_csv,
+            sink,
+            index_file=index_file,
+            reject_file=reject_file,
+            options=options,
         )
-        new_rows.append(new_row)
+        # A checkpoint records the input position of the last written row,
+        # which needs the rows converted one after another
+        jobs = 1
+
+    # Starting a process pool only pays off for large files; the size of
+    # standard input is not known in advance
+    if (
+        jobs > 1
+        and input_csv != STDIO_PATH
+        and os.path.getsize(input_csv) < PARALLEL_MIN_BYTES
+    ):
+        jobs = 1
+
+    index, append = _incremental_index(index_file, sink)
+
+    if stats is not None:
+        stats.start()
+
+    with _restoring_output(sink, append):
+        _convert_file(
+            input_csv,
+            sink,
+            plan,
+            stats=stats,
+            jobs=jobs,
+            cache_size=cache_size,
+            raw_filters=raw_filters,
+            parsed_filters=parsed_filters,
+            index=index,
+            append=append or resume is not None,
+            checkpoint=checkpoint,
+            resume=resume,
+            reject_file=reject_file,
+            use_mmap=use_mmap,
+        )
+
+    if checkpoint is not None:
+        checkpoint.finish()
+
+    # The index is only updated once all new rows have been written
+    if index is not None:
+        index.save()
 
-    if merge:
-        new_header.remove("Zahlungsreferenz")
-        new_header.remove("Auftraggeberreferenz")
+    if cache_key is not None:
+        result_cache.store(cache_key, sink.path)
 
-    with open(output_csv, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f, dialect)
-        writer.writerow([strip_zwnbsp(v) for v in new_header])
-        for row in new_rows:
-            writer.writerow([strip_zwnbsp(v) for v in row])
+    if stats is not None:
+        stats.stop()
@@ -0,0 +1,272 @@
+"""
+Discovery of keys of the structured text that are not in KEYS.
+
+An unknown key is not recognized by the parser, so it ends up in the value
+of the key before it. To find such keys, the structured column of one or
+many exports is split at the known keys, and the remaining text is searched
+for candidates: up to MAX_KEY_WORDS words starting with a capital letter
+and followed by a colon, like 'Kundennummer:' or 'Ref. Nummer:'. Words
+of the preceding value are folded away when the shorter candidate is at
+least as frequent. Every candidate is reported with its frequency and a few
+examples of the text around it.
+
+Rows whose text has no colon besides those of the known keys are skipped
+after a single split, so scanning large histories is fast. Several files
+are scanned in parallel by a process pool. The report can be saved with
+save_report and loaded with registry.load_keys, so keys confirmed by a
+human are recognized without a new release.
+"""
+
+import csv
+import itertools
+import re
+from collections import Counter
+from typing import NamedTuple
+
+from .compression import open_input
+from .formats import detect_dialect
+from .parser import default_parser
+from .registry import register_keys, registered_keys, save_keys
+
+# Maximum number of words of a candidate key
+MAX_KEY_WORDS = 4
+
+# Default number of examples kept per candidate
+DEFAULT_MAX_EXAMPLES = 3
+
+# Characters of context kept on each side of a candidate in an example
+EXAMPLE_WIDTH = 40
+
+_WORD = r"[A-ZÄÖÜ][\w./-]*"
+_CONNECTOR = r"[a-zäöüß]{1,4}\.?"
+
+# Candidate key: a capitalized word, optionally followed by more words or
+# short connectors such as 'mit', and a colon that ends a word
+CANDIDATE_PATTERN = re.compile(
+    rf"(?<!\S)({_WORD}(?: (?:{_WORD}|{_CONNECTOR})){{0,{MAX_KEY_WORDS - 1}}})\s*:(?!\S)"
+)
+
+
+class KeyCandidate(NamedTuple):
+    """Text that looks like a key but is not in KEYS."""
+
+    key: str
+    count: int
+    examples: tuple
+
+
+def _example(segment, match):
+    """
+    Return the text around a candidate.
+
+    Args:
+        segment: Text between two known keys in which the candidate was found.
+        match: Match of CANDIDATE_PATTERN in segment.
+
+    Returns:
+        str: Up to EXAMPLE_WIDTH characters on each side of the candidate.
+
+    """
+    start = max(match.start() - EXAMPLE_WIDTH, 0)
+    end = match.end() + EXAMPLE_WIDTH
+    return segment[start:end].strip()
+
+
+def scan_texts(texts, max_examples=DEFAULT_MAX_EXAMPLES):
+    """
+    Find candidate keys in structured texts.
+
+    Args:
+        texts: Iterable of texts of the structured column.
+        max_examples: Number of distinct examples kept per candidate.
+
+    Returns:
+        tuple[Counter, dict[str, list[str]]]: The number of occurrences and
+            the examples of every candidate.
+
+    """
+    split = default_parser().segments
+    finditer = CANDIDATE_PATTERN.finditer
+    counts = Counter()
+    examples = {}
+
+    for text in texts:
+        colons = text.count(":")
+        if not colons:
+            continue
+
+        segments = split(text)
+
+        # Every known key accounts for one colon
+        if colons == len(segments) - 1:
+            continue
+
+        for segment in segments:
+            for match in finditer(segment):
+                key = match.group(1)
+                counts[key] += 1
+
+                found = examples.setdefault(key, [])
+                if len(found) < max_examples:
+                    example = _example(segment, match)
+                    if example not in found:
+                        found.append(example)
+
+    return counts, examples
+
+
+def scan_file(path, max_examples=DEFAULT_MAX_EXAMPLES):
+    """
+    Find candidate keys in the structured column of an export.
+
+    Args:
+        path: Path of the export, or '-' for standard input. Compressed
+            exports are decompressed while reading.
+        max_examples: Number of distinct examples kept per candidate.
+
+    Returns:
+        tuple[Counter, dict[str, list[str]]]: As returned by scan_texts.
+
+    """
+    with open_input(path) as f:
+        dialect, lines = detect_dialect(f)
+        texts = (row[1] for row in csv.reader(lines, dialect) if len(row) > 1)
+        return scan_texts(texts, max_examples)
+
+
+def _merge_scans(scans, max_examples):
+    """
+    Combine the results of several scans.
+
+    Args:
+        scans: Iterable of results of scan_texts.
+        max_examples: Number of distinct examples kept per candidate.
+
+    Returns:
+        tuple[Counter, dict[str, list[str]]]: The combined result.
+
+    """
+    counts = Counter()
+    examples = {}
+
+    for scan_counts, scan_examples in scans:
+        counts.update(scan_counts)
+        for key, found in scan_examples.items():
+            kept = examples.setdefault(key, [])
+            kept.extend(e for e in found if e not in kept)
+            del kept[max_examples:]
+
+    return counts, examples
+
+
+def _fold_prefixed(counts, examples, max_examples):
+    """
+    Count candidates preceded by other words as their shorter form.
+
+    The words before a key in free text are matched as part of the
+    candidate, e.g. 'ACME Kundennummer'. If a candidate ends with a shorter
+    candidate that was found at least as often, it is counted as the
+    shorter one.
+
+    Args:
+        counts: Counter of candidates, modified in place.
+        examples: Examples of the candidates, modified in place.
+        max_examples: Number of distinct examples kept per candidate.
+
+    """
+    for key in sorted(counts, key=lambda key: -key.count(" ")):
+        words = key.split(" ")
+        suffixes = (" ".join(words[i:]) for i in range(1, len(words)))
+        target = next((s for s in suffixes if counts.get(s, 0) >= counts[key]), None)
+        if target is None:
+            continue
+
+        counts[target] += counts.pop(key)
+        kept = examples[target]
+        kept.extend(e for e in examples.pop(key) if e not in kept)
+        del kept[max_examples:]
+
+
+def discover_keys(paths, *, jobs=1, max_examples=DEFAULT_MAX_EXAMPLES, min_count=1):
+    """
+    Find candidate keys in many exports.
+
+    Args:
+        paths: Iterable of files, glob patterns or directories, expanded as
+            by batch.convert_many.
+        jobs: Number of files scanned at the same time in worker processes.
+        max_examples: Number of distinct examples kept per candidate.
+        min_count: Candidates found fewer times are not reported.
+
+    Returns:
+        list[KeyCandidate]: The candidates, most frequent first.
+
+    """
+    # Imported here because batch imports the whole conversion machinery
+    from .batch import expand_inputs
+
+    inputs = expand_inputs(paths)
+
+    if jobs <= 1 or len(inputs) <= 1:
+        scans = [scan_file(path, max_examples) for path in inputs]
+    else:
+        # Imported here because it is slow to import and rarely needed
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(inputs)),
+            initializer=register_keys,
+            initargs=(registered_keys(),),
+        ) as pool:
+            scans = list(pool.map(scan_file, inputs, itertools.repeat(max_examples)))
+
+    counts, examples = _merge_scans(scans, max_examples)
+    _fold_prefixed(counts, examples, max_examples)
+
+    return [
+        KeyCandidate(key, count, tuple(examples[key]))
+        for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        if count >= min_count
+    ]
+
+
+def format_report(candidates):
+    """
+    Format candidates as a table for the terminal.
+
+    Args:
+        candidates: List of KeyCandidate instances.
+
+    Returns:
+        str: One line per candidate with its count, key and first example.
+
+    """
+    if not candidates:
+        return "No unknown keys found"
+
+    width = max(len(candidate.key) for candidate in candidates)
+    lines = [f"{'count':>8}  {'key':<{width}}  example"]
+    lines.extend(
+        f"{c.count:>8}  {c.key:<{width}}  {c.examples[0] if c.examples else ''}"
+        for c in candidates
+    )
+    return "\n".join(lines)
+
+
+def save_report(candidates, path):
+    """
+    Write candidates to a JSON file that registry.load_keys can read.
+
+    Args:
+        candidates: List of KeyCandidate instances. Remove the entries that
+            are not keys before loading the file as a registry.
+        path: Path of the JSON file.
+
+    """
+    save_keys(
+        (
+            {"key": c.key, "count": c.count, "examples": list(c.examples)}
+            for c in candidates
+        ),
+        path,
+    )
@@ -0,0 +1,373 @@
+"""
+Row filters for ELBA CSV conversions.
+
+A RowFilter decides whether a transaction is converted. Filters on the
+native columns (dates, amount, currency) are evaluated on the raw input row,
+before the structured column is parsed, so rows they reject cost almost
+nothing. Filters on parsed keys declare the keys they read and are evaluated
+right after parsing, before merging and writing.
+
+Filters are passed to process_csv_file with the filters argument. The
+filters created by the functions in this module can be sent to worker
+processes; custom predicates must be picklable to be used with jobs > 1.
+"""
+
+import datetime as dt
+import functools
+import json
+import time
+from decimal import Decimal
+
+from .constants import KEYS
+from .values import parse_amount, parse_date
+
+# Positions of the native columns in an input row
+DATE_COLUMN = 0
+AMOUNT_COLUMN = 3
+CURRENCY_COLUMN = 4
+
+
+class RowFilter:
+    """
+    Named predicate deciding whether a row is converted.
+
+    A filter without keys is called with the raw input row, a list of
+    strings. A filter with keys is called with the Record returned by the
+    parser, which contains at least these keys and supports record[key].
+
+    Args:
+        name: Name of the filter, used in the statistics.
+        predicate: Callable returning True for rows that are kept.
+        keys: Keys of the structured column read by the predicate. If empty,
+            the predicate reads the raw input row.
+
+    Raises:
+        ValueError: If one of the keys is not in KEYS.
+
+    """
+
+    def __init__(self, name, predicate, keys=()):
+        unknown = [key for key in keys if key not in KEYS]
+        if unknown:
+            msg = f"Unknown keys: {unknown!r}"
+            raise ValueError(msg)
+
+        self.name = name
+        self.predicate = predicate
+        self.keys = tuple(keys)
+
+    def __repr__(self):
+        return f"RowFilter({self.name!r})"
+
+    @property
+    def signature(self):
+        """
+        Canonical JSON description of the filter and its arguments.
+
+        Two filters have the same signature only if they call the same
+        function with equal arguments, so the signature can be part of a
+        cache key. Predicates that cannot be described, such as lambdas and
+        closures, have none.
+
+        Returns:
+            str | None: The signature, or None if the predicate is not a
+                functools.partial of a module-level function with dates,
+                amounts, strings or sets of strings as arguments.
+
+        """
+        predicate = self.predicate
+        if not isinstance(predicate, functools.partial):
+            return None
+
+        func = predicate.func
+        qualname = getattr(func, "__qualname__", "<")
+        if "<" in qualname or getattr(func, "__closure__", None):
+            return None
+
+        description = [
+            f"{func.__module__}.{qualname}",
+            predicate.args,
+            predicate.keywords,
+            self.keys,
+        ]
+        try:
+            return json.dumps(description, default=_canonical, sort_keys=True)
+        except TypeError:
+            return None
+
+    def __call__(self, values):
+        """
+        Return whether a row is kept.
+
+        Args:
+            values: The raw input row, or the parsed Record if the filter has keys.
+
+        Returns:
+            bool: True if the row is kept.
+
+        """
+        return self.predicate(values)
+
+    @property
+    def parsed(self):
+        """True if the filter reads parsed keys instead of the raw row."""
+        return bool(self.keys)
+
+
+def _canonical(value):
+    """
+    Return a JSON-compatible form of a filter argument.
+
+    Args:
+        value: Argument that json cannot serialize by itself.
+
+    Returns:
+        str | list[str]: The date in ISO format, the normalized amount, or
+            the sorted set.
+
+    Raises:
+        TypeError: If the argument has another type.
+
+    """
+    if isinstance(value, dt.date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+
+    msg = f"Cannot describe filter argument {value!r}"
+    raise TypeError(msg)
+
+
+def _column(row, index):
+    return row[index] if index < len(row) else ""
+
+
+def _date_in_range(first, last, row):
+    try:
+        date = parse_date(_column(row, DATE_COLUMN))
+    except ValueError:
+        return False
+    return (first is None or date >= first) and (last is None or date <= last)
+
+
+def _amount_in_range(low, high, row):
+    try:
+        amount = parse_amount(_column(row, AMOUNT_COLUMN))
+    except ValueError:
+        return False
+    return (low is None or amount >= low) and (high is None or amount <= high)
+
+
+def _currency_in(codes, row):
+    return _column(row, CURRENCY_COLUMN).strip().upper() in codes
+
+
+def _has_key(key, values):
+    return bool(values[key])
+
+
+def _contains(key, text, values):
+    return text in values[key].casefold()
+
+
+def _as_date(value):
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def _as_amount(value):
+    return parse_amount(str(value))
+
+
+def since(date):
+    """
+    Keep transactions executed on or after a date.
+
+    Args:
+        date: dt.date or string in ELBA or ISO format.
+
+    Returns:
+        RowFilter: Filter on the Durchführungsdatum column.
+
+    """
+    date = _as_date(date)
+    return RowFilter(
+        f"since {date.isoformat()}", functools.partial(_date_in_range, date, None)
+    )
+
+
+def until(date):
+    """
+    Keep transactions executed on or before a date.
+
+    Args:
+        date: dt.date or string in ELBA or ISO format.
+
+    Returns:
+        RowFilter: Filter on the Durchführungsdatum column.
+
+    """
+    date = _as_date(date)
+    return RowFilter(
+        f"until {date.isoformat()}", functools.partial(_date_in_range, None, date)
+    )
+
+
+def min_amount(amount):
+    """
+    Keep transactions whose signed amount is at least a given value.
+
+    Args:
+        amount: Number or string; strings may use a decimal comma.
+
+    Returns:
+        RowFilter: Filter on the Betrag column.
+
+    """
+    amount = _as_amount(amount)
+    return RowFilter(
+        f"min amount {amount}", functools.partial(_amount_in_range, amount, None)
+    )
+
+
+def max_amount(amount):
+    """
+    Keep transactions whose signed amount is at most a given value.
+
+    Debits are negative, so max_amount(-100) keeps payments of 100 or more.
+
+    Args:
+        amount: Number or string; strings may use a decimal comma.
+
+    Returns:
+        RowFilter: Filter on the Betrag column.
+
+    """
+    amount = _as_amount(amount)
+    return RowFilter(
+        f"max amount {amount}", functools.partial(_amount_in_range, None, amount)
+    )
+
+
+def currency(*codes):
+    """
+    Keep transactions in one of the given currencies.
+
+    Args:
+        *codes: Currency codes such as 'EUR', compared case-insensitively.
+
+    Returns:
+        RowFilter: Filter on the Währung column.
+
+    """
+    codes = frozenset(code.strip().upper() for code in codes)
+    return RowFilter(
+        f"currency {','.join(sorted(codes))}", functools.partial(_currency_in, codes)
+    )
+
+
+def has_key(key):
+    """
+    Keep transactions whose structured text contains a non-empty key.
+
+    For example, has_key('Kartenzahlung mit Kartenfolge-Nr.') keeps card
+    payments only.
+
+    Args:
+        key: One of the keys in KEYS.
+
+    Returns:
+        RowFilter: Filter on the parsed key.
+
+    """
+    return RowFilter(f"has {key}", functools.partial(_has_key, key), (key,))
+
+
+def contains(key, text):
+    """
+    Keep transactions whose value of a key contains a text.
+
+    The comparison is case-insensitive.
+
+    Args:
+        key: One of the keys in KEYS.
+        text: Text to search for.
+
+    Returns:
+        RowFilter: Filter on the parsed key.
+
+    """
+    return RowFilter(
+        f"{key} contains {text!r}",
+        functools.partial(_contains, key, text.casefold()),
+        (key,),
+    )
+
+
+def split_filters(filters):
+    """
+    Split filters into those on the raw row and those on parsed keys.
+
+    Args:
+        filters: Iterable of RowFilter instances, or None.
+
+    Returns:
+        tuple[tuple[RowFilter, ...], tuple[RowFilter, ...]]: The raw and the
+            parsed filters, each in the given order.
+
+    """
+    filters = tuple(filters or ())
+    raw = tuple(f for f in filters if not f.parsed)
+    parsed = tuple(f for f in filters if f.parsed)
+    return raw, parsed
+
+
+def rejecting_filter(values, filters):
+    """
+    Return the first filter that rejects a row.
+
+    Args:
+        values: The raw input row or the parsed Record.
+        filters: Filters that all read the same kind of values.
+
+    Returns:
+        RowFilter | None: The rejecting filter, or None if the row is kept.
+
+    """
+    for row_filter in filters:
+        if not row_filter(values):
+            return row_filter
+    return None
+
+
+def filter_rows(rows, filters, stats=None):
+    """
+    Yield the rows accepted by all raw filters.
+
+    Args:
+        rows: Iterable of input rows as lists of strings.
+        filters: Filters without keys.
+        stats: Optional ConversionStats instance; the time spent filtering
+            and the rows dropped by each filter are recorded.
+
+    Yields:
+        list[str]: The rows accepted by all filters.
+
+    """
+    if stats is None:
+        for row in rows:
+            if rejecting_filter(row, filters) is None:
+                yield row
+        return
+
+    perf_counter = time.perf_counter
+    for row in rows:
+        start = perf_counter()
+        rejected = rejecting_filter(row, filters)
+        stats.add("filter", perf_counter() - start)
+
+        if rejected is None:
+            yield row
+        else:
+            stats.filtered[rejected.name] += 1
@@ -0,0 +1,273 @@
+"""
+Detection of the encoding and CSV dialect of ELBA exports.
+
+ELBA exports have a fixed layout: six columns separated by semicolons, with
+the Durchführungsdatum, the structured text, the Valutadatum, the amount,
+the currency and a timestamp. Instead of running csv.Sniffer on every file,
+the first record is checked against this layout for a few candidate
+delimiters. Only files that do not look like ELBA exports are sniffed, with
+the candidate delimiters only and a sample that grows until the sniffer
+succeeds. Detection is therefore fast and deterministic, and semicolons
+inside a description cannot mislead it.
+
+The encoding is taken from a byte order mark if there is one. Otherwise,
+UTF-8 is used if the start of the file is valid UTF-8, and the Windows code
+page of older ELBA versions if it is not. Such exports often start with
+plain ASCII rows, so UTF-8 is decoded with the LEGACY_FALLBACK error
+handler, which decodes the bytes that turn out not to be UTF-8 further on
+with the code page.
+"""
+
+import codecs
+import csv
+import functools
+import io
+import itertools
+import re
+
+# Delimiters tried, in this order, for the ELBA layout and by the sniffer
+DELIMITERS = ";,\t|"
+
+# Number of characters read to detect the dialect
+SAMPLE_SIZE = 1024
+
+# Largest sample given to the sniffer before giving up
+MAX_SAMPLE_SIZE = 64 * 1024
+
+# Encoding of exports that are not valid UTF-8
+LEGACY_ENCODING = "cp1252"
+
+# Name of the codec error handler decoding bytes that are not valid UTF-8
+# with LEGACY_ENCODING
+LEGACY_FALLBACK = "elbacsv-legacy"
+
+# Byte order marks and the encoding they stand for
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_DATE = r"(?:\d{2}\.\d{2}\.\d{4}|\d{4}-\d{2}-\d{2})"
+
+# Patterns of the native columns of the ELBA layout, by column index
+ELBA_SIGNATURE = (
+    (0, re.compile(_DATE)),
+    (2, re.compile(_DATE)),
+    (3, re.compile(r"[+-]?\d[\d.,]*")),
+    (4, re.compile(r"[A-Z]{3}")),
+    (5, re.compile(_DATE + r"(?:[ T][\d:.]+)?")),
+)
+
+# Number of columns of an ELBA export
+ELBA_COLUMNS = 6
+
+
+class ElbaDialect(csv.Dialect):
+    """CSV dialect of ELBA exports."""
+
+    delimiter = ";"
+    quotechar = '"'
+    doublequote = True
+    skipinitialspace = False
+    lineterminator = "\r\n"
+    quoting = csv.QUOTE_MINIMAL
+
+
+@functools.cache
+def elba_dialect(delimiter):
+    """
+    Return the ELBA dialect with a given delimiter.
+
+    Args:
+        delimiter: One of DELIMITERS.
+
+    Returns:
+        type[csv.Dialect]: ElbaDialect, or a subclass with the delimiter.
+
+    """
+    if delimiter == ElbaDialect.delimiter:
+        return ElbaDialect
+    return type("ElbaDialect", (ElbaDialect,), {"delimiter": delimiter})
+
+
+def detect_encoding(head):
+    """
+    Detect the encoding of an export from its first bytes.
+
+    A legacy export may only have ASCII characters in head, so 'utf-8' is
+    decoded with the LEGACY_FALLBACK error handler.
+
+    Args:
+        head: The first bytes of the export.
+
+    Returns:
+        str: 'utf-8-sig' or 'utf-16' if the export starts with a byte order
+            mark, 'utf-8' if head is valid UTF-8, LEGACY_ENCODING otherwise.
+
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    # The last character of head may be cut off, which is not an error
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return LEGACY_ENCODING
+
+    return "utf-8"
+
+
+def _decode_legacy(error):
+    """
+    Decode the bytes that are not valid UTF-8 with LEGACY_ENCODING.
+
+    Args:
+        error: UnicodeDecodeError raised by the UTF-8 decoder.
+
+    Returns:
+        tuple[str, int]: The decoded bytes and the position after them.
+
+    """
+    invalid = error.object[error.start : error.end]
+    return invalid.decode(LEGACY_ENCODING, errors="replace"), error.end
+
+
+codecs.register_error(LEGACY_FALLBACK, _decode_legacy)
+
+
+def is_elba_row(row):
+    """
+    Return whether a row has the layout of an ELBA export.
+
+    Args:
+        row: Row as a list of strings.
+
+    Returns:
+        bool: True if the row has six columns and its native columns match
+            ELBA_SIGNATURE.
+
+    """
+    return len(row) == ELBA_COLUMNS and all(
+        pattern.fullmatch(row[i].strip()) for i, pattern in ELBA_SIGNATURE
+    )
+
+
+def match_elba(sample):
+    """
+    Return the ELBA dialect if the first record of a sample has the ELBA layout.
+
+    Args:
+        sample: Start of the export, containing at least one complete line.
+
+    Returns:
+        type[csv.Dialect] | None: The dialect, or None if no delimiter in
+            DELIMITERS gives a record with the ELBA layout.
+
+    """
+    sample = sample.removeprefix("\ufeff")
+
+    for delimiter in DELIMITERS:
+        dialect = elba_dialect(delimiter)
+        row = next(csv.reader(io.StringIO(sample, newline=""), dialect), None)
+        if row is not None and is_elba_row(row):
+            return dialect
+
+    return None
+
+
+def _sniff(sample):
+    """
+    Sniff the dialect of a sample, restricted to DELIMITERS.
+
+    Args:
+        sample: Start of the export.
+
+    Returns:
+        type[csv.Dialect] | None: The dialect, or None if it is not clear.
+
+    """
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        return None
+
+
+def _extend(head, lines, size):
+    """
+    Append lines to head until it holds at least size characters.
+
+    Args:
+        head: List of lines read so far, extended in place.
+        lines: Iterator over the remaining lines.
+        size: Number of characters to reach.
+
+    Returns:
+        bool: True if lines may hold more lines, False if it is exhausted.
+
+    """
+    total = sum(map(len, head))
+    for line in lines:
+        head.append(line)
+        total += len(line)
+        if total >= size:
+            return True
+    return False
+
+
+def _sample(head):
+    """
+    Join lines into a sample, adding line terminators where they are missing.
+
+    Returns:
+        str: The sample.
+
+    """
+    return "".join(
+        line if line.endswith(("\n", "\r")) else line + "\n" for line in head
+    )
+
+
+def detect_dialect(lines):
+    """
+    Detect the CSV dialect from the first lines of an export.
+
+    The first record is checked against the ELBA layout. If it does not
+    match, the sniffer is run on a sample of SAMPLE_SIZE characters, which
+    is enlarged up to MAX_SAMPLE_SIZE until the sniffer succeeds. The lines
+    read for the sample are returned in front of the remaining lines, so
+    the input never has to be seeked back.
+
+    Args:
+        lines: Iterable over the lines of the export, e.g. a text file
+            opened with newline="". Lines without a line terminator, such
+            as those returned by str.splitlines, are accepted.
+
+    Returns:
+        tuple[type[csv.Dialect], Iterator[str]]: The detected dialect and an
+            iterator over all lines.
+
+    Raises:
+        csv.Error: If the dialect cannot be determined.
+
+    """
+    lines = iter(lines)
+    head = []
+    more = _extend(head, lines, SAMPLE_SIZE)
+    sample = _sample(head)
+
+    dialect = match_elba(sample) or _sniff(sample)
+    size = SAMPLE_SIZE
+
+    while dialect is None and more and size < MAX_SAMPLE_SIZE:
+        size *= 4
+        more = _extend(head, lines, size)
+        sample = _sample(head)
+        dialect = _sniff(sample)
+
+    if dialect is None:
+        msg = "Could not determine the CSV dialect"
+        raise csv.Error(msg)
+
+    return dialect, itertools.chain(head, lines)
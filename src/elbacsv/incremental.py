@@ -0,0 +1,111 @@
+"""
+Incremental conversion support for the elbacsv package.
+
+This module keeps an on-disk index of the fingerprints of the transactions
+that have already been converted, so overlapping ELBA exports can be
+appended to an existing output file without converting or writing the same
+transactions again.
+"""
+
+import hashlib
+import os
+from collections import Counter
+
+# Suffix appended to the output file name to get the default index file name
+INDEX_SUFFIX = ".fingerprints"
+
+# Input columns that identify a transaction: Durchführungsdatum, the raw
+# structured text, Betrag, Währung and Zeitstempel
+FINGERPRINT_COLUMNS = (0, 1, 3, 4, 5)
+
+
+def transaction_fingerprint(row, occurrence=0):
+    """
+    Compute the fingerprint of an input row.
+
+    Identical transactions in one export, for example two equal payments at
+    the same time, are distinguished by their occurrence number.
+
+    Args:
+        row: Input row as a list of strings.
+        occurrence: How many identical rows preceded this row in the export.
+
+    Returns:
+        str: Hexadecimal fingerprint of the row.
+
+    """
+    fields = [row[i] if i < len(row) else "" for i in FINGERPRINT_COLUMNS]
+    fields.append(str(occurrence))
+    data = "\x1f".join(fields).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class FingerprintIndex:
+    """
+    On-disk set of the fingerprints of already converted transactions.
+
+    The index is stored as a text file with one fingerprint per line. New
+    fingerprints are collected in memory and appended to the file by save().
+
+    Args:
+        path: Path of the index file.
+        reset: If True, ignore an existing index file and start a new one.
+
+    """
+
+    def __init__(self, path, *, reset=False):
+        self.path = path
+        self._reset = reset
+        self._known = set()
+        self._new = []
+
+        if not reset and os.path.exists(path):
+            with open(path, encoding="ascii") as f:
+                self._known.update(line.strip() for line in f)
+
+    def __len__(self):
+        return len(self._known)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._known
+
+    def new_rows(self, rows):
+        """
+        Yield only the rows that are not in the index yet.
+
+        The fingerprints of the yielded rows are added to the index.
+
+        Args:
+            rows: Iterable of input rows as lists of strings.
+
+        Yields:
+            list[str]: The rows that have not been converted before.
+
+        """
+        known = self._known
+        occurrences = Counter()
+
+        for row in rows:
+            fingerprint = transaction_fingerprint(row)
+            occurrence = occurrences[fingerprint]
+            occurrences[fingerprint] += 1
+
+            if occurrence:
+                fingerprint = transaction_fingerprint(row, occurrence)
+
+            if fingerprint in known:
+                continue
+
+            known.add(fingerprint)
+            self._new.append(fingerprint)
+            yield row
+
+    def save(self):
+        """Write the fingerprints added since the index was loaded to disk."""
+        mode = "w" if self._reset else "a"
+
+        with open(self.path, mode, encoding="ascii") as f:
+            f.writelines(f"{fingerprint}\n" for fingerprint in self._new)
+
+        self._reset = False
+        self._new = []
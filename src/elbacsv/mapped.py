@@ -0,0 +1,235 @@
+"""
+Reading uncompressed input files through a memory map.
+
+For large exports, decoding the file line by line and splitting every line
+with csv.reader takes a large share of the conversion before any
+structured text is parsed. Instead, the file is mapped into memory and cut
+into blocks of about BLOCK_SIZE bytes at line feeds, which are found on the
+raw bytes. Each block is decoded with a single call, and blocks without
+quote or escape characters are split into fields with str.split. Only
+blocks containing them are read with csv.reader, so quoting is handled
+exactly as in the sniffed dialect; a record continuing in the next block,
+because of a line break in a quoted field, is read again with that block.
+
+The data is read from the page cache of the operating system, so files that
+are converted repeatedly are not copied through a read buffer each time,
+and only one block is held in Python memory at a time.
+"""
+
+import collections
+import csv
+import io
+import itertools
+import mmap
+
+from .compression import MAGIC_SIZE, detect_compression, open_input
+from .constants import STDIO_PATH
+
+# Approximate number of bytes decoded and split at once
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Number of bytes checked for a line feed before mapping a file
+NEWLINE_SAMPLE_SIZE = 64 * 1024
+
+# Encodings in which a line feed is a single byte that is never part of
+# another character, and the codec decoding the data after the byte order
+# mark
+MAPPED_ENCODINGS = {"utf-8": "utf-8", "utf-8-sig": "utf-8", "cp1252": "cp1252"}
+
+_BOM = b"\xef\xbb\xbf"
+
+# Text added to a block to find out whether its last record is complete;
+# a character of the private use area, which does not occur in exports
+_MARKER = "\ue000"
+
+
+def can_map(path, encoding):
+    """
+    Return whether an input file can be read through a memory map.
+
+    Args:
+        path: Path of the input file, or '-' for standard input.
+        encoding: Encoding of the input file.
+
+    Returns:
+        bool: True if the file is a non-empty, uncompressed file in one of
+            MAPPED_ENCODINGS with line feeds.
+
+    """
+    if path == STDIO_PATH or encoding not in MAPPED_ENCODINGS:
+        return False
+
+    with open(path, "rb") as f:
+        head = f.read(NEWLINE_SAMPLE_SIZE)
+
+    # Without line feeds, e.g. with CR line ends, a block could not end
+    # before the end of the file
+    return (
+        bool(head)
+        and detect_compression(head[:MAGIC_SIZE]) is None
+        and (b"\n" in head or len(head) < NEWLINE_SAMPLE_SIZE)
+    )
+
+
+def _block_end(data, start, limit):
+    """
+    Find the end of a block of whole lines.
+
+    Args:
+        data: The mapped file.
+        start: Offset of the first byte of the block.
+        limit: Offset before which the block should end.
+
+    Returns:
+        int: Offset after the last line feed before limit, after the first
+            line feed if there is none, or the size of the file.
+
+    """
+    if limit >= len(data):
+        return len(data)
+
+    end = data.rfind(b"\n", start, limit)
+    if end < 0:
+        end = data.find(b"\n", limit)
+
+    return len(data) if end < 0 else end + 1
+
+
+class _Block:
+    """
+    Rows of a block of the mapped file.
+
+    Args:
+        data: The bytes of the block, ending at a line feed unless final.
+        dialect: CSV dialect of the input file.
+        codec: Codec decoding the block.
+        errors: Error handler of the decoder.
+        final: True if the block ends at the end of the file.
+
+    Attributes:
+        rest_size: Number of bytes of a last record that continues after
+            the block, set once all rows have been read.
+
+    """
+
+    def __init__(self, data, dialect, *, codec, errors, final):
+        self.data = data
+        self.text = data.decode(codec, errors)
+        self.dialect = dialect
+        self.final = final
+        self.rest_size = 0
+
+    def __iter__(self):
+        text = self.text
+        lines = text.replace("\r\n", "\n") if "\r" in text else text
+        special = (self.dialect.quotechar, self.dialect.escapechar, "\r")
+
+        if self.dialect.skipinitialspace or any(c and c in lines for c in special):
+            return self._records()
+
+        lines = lines.split("\n")
+        if not lines[-1]:
+            lines.pop()
+
+        delimiter = self.dialect.delimiter
+        return (line.split(delimiter) if line else [] for line in lines)
+
+    def _records(self):
+        """
+        Read the records of the block with csv.reader.
+
+        Yields:
+            list[str]: The rows of the complete records.
+
+        """
+        if self.final:
+            yield from csv.reader(io.StringIO(self.text, newline=""), self.dialect)
+            return
+
+        # The marker is a record of its own after the last line feed, unless
+        # the last record continues in a quoted field
+        reader = csv.reader(io.StringIO(self.text + _MARKER, newline=""), self.dialect)
+        row = next(reader)
+        before = 0
+        after = reader.line_num
+
+        for following in reader:
+            yield row
+            row = following
+            before, after = after, reader.line_num
+
+        # The lines are counted on the bytes, because the legacy fallback
+        # may decode a byte to a character that is longer in UTF-8; like
+        # the lines of the reader, they end at CR, LF or CRLF
+        if row != [_MARKER]:
+            lines = self.data.splitlines(keepends=True)
+            self.rest_size = sum(map(len, lines[before:]))
+
+
+def mapped_rows(path, dialect, encoding, errors="strict"):
+    """
+    Read the rows of an input file through a memory map.
+
+    The file must pass can_map. The rows are the same as those of a
+    csv.reader over the file opened with open_input, except that
+    csv.field_size_limit is not applied to blocks split with str.split.
+
+    Args:
+        path: Path of the input file.
+        dialect: CSV dialect of the input file.
+        encoding: Encoding of the input file, one of MAPPED_ENCODINGS.
+        errors: Error handler of the decoder, as used by open_input.
+
+    Yields:
+        list[str]: The rows of the file.
+
+    """
+    codec = MAPPED_ENCODINGS[encoding]
+
+    with (
+        open(path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            data.madvise(mmap.MADV_SEQUENTIAL)
+
+        start = 0
+        if encoding == "utf-8-sig" and data[: len(_BOM)] == _BOM:
+            start = len(_BOM)
+
+        size = len(data)
+        block_size = BLOCK_SIZE
+
+        while start < size:
+            end = _block_end(data, start, start + block_size)
+            block = _Block(
+                data[start:end], dialect, codec=codec, errors=errors, final=end == size
+            )
+            yield from block
+            following = end - block.rest_size
+
+            # Nothing was read if a record is longer than the block
+            block_size = BLOCK_SIZE if following > start else 2 * block_size
+            start = following
+
+
+def record_line(path, dialect, number):
+    """
+    Return the line of an input file where a record ends.
+
+    mapped_rows does not count lines, so the file is read again with
+    csv.reader to report the line of a malformed record.
+
+    Args:
+        path: Path of the input file.
+        dialect: CSV dialect of the input file.
+        number: Number of the record, starting at 1.
+
+    Returns:
+        int: The number of the last line of the record.
+
+    """
+    with open_input(path) as f:
+        reader = csv.reader(f, dialect)
+        collections.deque(itertools.islice(reader, number), maxlen=0)
+        return reader.line_num
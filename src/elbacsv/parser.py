@@ -0,0 +1,441 @@
+"""
+Reusable key-value parser for the structured ELBA text column.
+
+This module provides a parser object that is built once per key set. It
+holds a precompiled scanner that locates key boundaries in a single
+left-to-right pass over the input, so the per-row cost no longer includes
+building and compiling a regular expression. An optional LRU cache can be
+put in front of the parser to avoid parsing recurring strings again.
+"""
+
+import functools
+import re
+import sys
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .constants import DEFAULT_CACHE_SIZE, KEYS
+from .records import column_order, record_type
+
+
+class CacheInfo(NamedTuple):
+    """Hit and miss counts and size of a CachingParser."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def _compile_trie(trie):
+    """
+    Turn a character trie into a regular expression with shared prefixes.
+
+    Args:
+        trie: Nested dicts mapping characters to subtries. An empty string
+            key marks the end of a key.
+
+    Returns:
+        str: Regular expression matching exactly the keys stored in the trie.
+
+    """
+    branches = [
+        re.escape(char) + _compile_trie(subtrie)
+        for char, subtrie in sorted(trie.items())
+        if char
+    ]
+
+    if not branches:
+        return ""
+
+    if len(branches) == 1 and "" not in trie:
+        return branches[0]
+
+    group = "(?:" + "|".join(branches) + ")"
+    return group + "?" if "" in trie else group
+
+
+class KeyValueParser:
+    r"""
+    Parser for strings of the form "Key1: Value1 Key2: Value2 ...".
+
+    The parser is compiled once for a given set of keys. The keys are stored
+    in a trie which is compiled into a single regular expression whose
+    branches share common prefixes, so key boundaries are found in one
+    left-to-right pass without trying every key at every position. The
+    results are identical to splitting the string with the plain alternation
+    ``(Key1|Key2|...)\s*:\s*``.
+
+    A parser can be restricted to a subset of its keys, the fields. Value
+    boundaries are still determined by all keys, so the value of a field
+    never swallows the text of another key, but only the values of the
+    fields are extracted and returned.
+
+    Results are available as records (see the records module), as lists of
+    values in record order, or as dicts. Records and value lists are ordered
+    like the output columns and are cheaper to create than dicts.
+
+    Args:
+        keys: Iterable of the keys to recognize. Keys must be non-empty, must
+            not contain a colon and must not end with whitespace.
+        fields: Iterable of the keys whose values are extracted. Defaults to
+            all keys.
+
+    Raises:
+        ValueError: If one of the keys is not valid or a field is not a key.
+
+    """
+
+    def __init__(self, keys, fields=None):
+        self._keys = tuple(keys)
+        self._fields = self._keys if fields is None else tuple(fields)
+
+        unknown = set(self._fields).difference(self._keys)
+        if unknown:
+            msg = f"Unknown fields: {sorted(unknown)!r}"
+            raise ValueError(msg)
+
+        # Set of the fields, or None if all keys are extracted
+        self._wanted = None
+        if len(set(self._fields)) < len(set(self._keys)):
+            self._wanted = frozenset(self._fields)
+
+        self._record_keys = column_order(dict.fromkeys(self._fields))
+        self._record_type = record_type(self._record_keys)
+        self._positions = {key: i for i, key in enumerate(self._record_keys)}
+        self._empty = [""] * len(self._record_keys)
+
+        trie = {}
+        for key in self._keys:
+            if not key or ":" in key or key[-1].isspace():
+                msg = f"Invalid key: {key!r}"
+                raise ValueError(msg)
+
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        self._pattern = re.compile("(" + _compile_trie(trie) + r")\s*:\s*")
+
+    @property
+    def keys(self):
+        """Tuple of the keys recognized by this parser."""
+        return self._keys
+
+    @property
+    def fields(self):
+        """Tuple of the keys whose values are extracted by this parser."""
+        return self._fields
+
+    @property
+    def record_keys(self):
+        """Tuple of the fields in record order, which is the output column order."""
+        return self._record_keys
+
+    @property
+    def record_type(self):
+        """Record type returned by parse_record, ordered like the output columns."""
+        return self._record_type
+
+    def iter_pairs(self, s):
+        """
+        Yield the key-value pairs found in a string, in order of appearance.
+
+        Text before the first key is ignored. Values are stripped of leading
+        and trailing whitespace. A key that appears multiple times is yielded
+        multiple times. Keys that are not fields are skipped.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Yields:
+            tuple[str, str]: The key and its value.
+
+        """
+        wanted = self._wanted
+        parts = self._pattern.split(s)
+
+        it = iter(parts[1:])  # skip text before first key
+        for key, value in zip(it, it, strict=False):
+            if wanted is None or key in wanted:
+                yield key, value.strip()
+
+    def segments(self, s):
+        """
+        Return the parts of a string that are not keys.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            list[str]: The text before the first key, followed by the value
+                of every key in order of appearance, not stripped.
+
+        """
+        return self._pattern.split(s)[::2]
+
+    def parse(self, s):
+        """
+        Parse a string into a dict of key: value pairs.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            dict[str, str]: Dictionary mapping each field of the parser to its
+                extracted value, or empty string if the key is not found in
+                the input. If a key appears multiple times, the last value wins.
+
+        """
+        result = dict.fromkeys(self._fields, "")
+        parts = self._pattern.split(s)
+
+        it = iter(parts[1:])  # skip text before first key
+        wanted = self._wanted
+        if wanted is None:
+            for key, value in zip(it, it, strict=False):
+                result[key] = value.strip()
+        else:
+            # Values of other keys are never stripped or stored
+            for key, value in zip(it, it, strict=False):
+                if key in wanted:
+                    result[key] = value.strip()
+
+        return result
+
+    def parse_values(self, s):
+        """
+        Parse a string into a list of values in record order.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            list[str]: A new list with one value per field of the record
+                type, or empty string if the key is not found in the input.
+
+        """
+        values = self._empty.copy()
+        positions = self._positions
+        parts = self._pattern.split(s)
+
+        it = iter(parts[1:])  # skip text before first key
+        if self._wanted is None:
+            for key, value in zip(it, it, strict=False):
+                values[positions[key]] = value.strip()
+        else:
+            for key, value in zip(it, it, strict=False):
+                i = positions.get(key)
+                if i is not None:
+                    values[i] = value.strip()
+
+        return values
+
+    def parse_record(self, s):
+        """
+        Parse a string into a record.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            Record: Record of the parser's record type.
+
+        """
+        return self._record_type._make(self.parse_values(s))
+
+    def values_from_pairs(self, pairs):
+        """
+        Arrange key-value pairs as a list of values in record order.
+
+        Args:
+            pairs: Iterable of (key, value) pairs of fields, e.g. from iter_pairs.
+
+        Returns:
+            list[str]: A new list with one value per field of the record type.
+
+        """
+        values = self._empty.copy()
+        positions = self._positions
+
+        for key, value in pairs:
+            values[positions[key]] = value
+
+        return values
+
+
+@functools.cache
+def default_parser(fields=None):
+    """
+    Return the shared parser instance for the keys defined in KEYS.
+
+    Args:
+        fields: Optional tuple of the keys whose values are extracted. Each
+            distinct tuple gets its own shared parser.
+
+    Returns:
+        KeyValueParser: Parser compiled once for KEYS and reused by all callers.
+
+    """
+    return KeyValueParser(KEYS, fields)
+
+
+class CachingParser:
+    """
+    Bounded LRU cache in front of a KeyValueParser.
+
+    Recurring transactions such as standing orders and direct debits repeat
+    the same structured text month after month. The cache is keyed on the
+    raw string and stores the parsed pairs as an immutable tuple with
+    interned values, so identical strings are parsed only once and equal
+    values share memory. Callers always receive a new dict, so they cannot
+    modify the cached result.
+
+    Args:
+        parser: The KeyValueParser to put the cache in front of. Defaults to
+            the shared parser for KEYS.
+        maxsize: Maximum number of cached strings. If 0, nothing is cached.
+
+    """
+
+    def __init__(self, parser=None, maxsize=DEFAULT_CACHE_SIZE):
+        self._parser = parser or default_parser()
+        self._maxsize = maxsize
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def keys(self):
+        """Tuple of the keys recognized by the underlying parser."""
+        return self._parser.keys
+
+    @property
+    def fields(self):
+        """Tuple of the keys whose values are extracted by the underlying parser."""
+        return self._parser.fields
+
+    @property
+    def record_keys(self):
+        """Tuple of the fields in record order."""
+        return self._parser.record_keys
+
+    @property
+    def record_type(self):
+        """Record type returned by parse_record."""
+        return self._parser.record_type
+
+    def values_from_pairs(self, pairs):
+        """
+        Arrange key-value pairs as a list of values in record order.
+
+        Args:
+            pairs: Iterable of (key, value) pairs of fields, e.g. from iter_pairs.
+
+        Returns:
+            list[str]: A new list with one value per field of the record type.
+
+        """
+        return self._parser.values_from_pairs(pairs)
+
+    def _pairs(self, s):
+        """
+        Return the key-value pairs of a string, using the cache.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            tuple[tuple[str, str], ...]: The key-value pairs in order of appearance.
+
+        """
+        cache = self._cache
+        pairs = cache.get(s)
+
+        if pairs is not None:
+            self.hits += 1
+            cache.move_to_end(s)
+            return pairs
+
+        self.misses += 1
+        intern = sys.intern
+        pairs = tuple((key, intern(value)) for key, value in self._parser.iter_pairs(s))
+
+        if self._maxsize > 0:
+            cache[s] = pairs
+            if len(cache) > self._maxsize:
+                cache.popitem(last=False)
+
+        return pairs
+
+    def iter_pairs(self, s):
+        """
+        Yield the key-value pairs found in a string, in order of appearance.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            Iterator[tuple[str, str]]: The keys and their values.
+
+        """
+        return iter(self._pairs(s))
+
+    def parse(self, s):
+        """
+        Parse a string into a dict of key: value pairs.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            dict[str, str]: A new dictionary mapping each field to its value,
+                or empty string if the key is not found in the input.
+
+        """
+        result = dict.fromkeys(self._parser.fields, "")
+        result.update(self._pairs(s))
+        return result
+
+    def parse_values(self, s):
+        """
+        Parse a string into a list of values in record order.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            list[str]: A new list with one value per field of the record type.
+
+        """
+        return self._parser.values_from_pairs(self._pairs(s))
+
+    def parse_record(self, s):
+        """
+        Parse a string into a record.
+
+        Args:
+            s: Input string containing key-value pairs in format "Key: Value".
+
+        Returns:
+            Record: Record of the parser's record type.
+
+        """
+        return self._parser.record_type._make(self.parse_values(s))
+
+    def cache_info(self):
+        """
+        Return the hit and miss counts and the size of the cache.
+
+        Returns:
+            CacheInfo: Named tuple with hits, misses, maxsize and currsize.
+
+        """
+        return CacheInfo(self.hits, self.misses, self._maxsize, len(self._cache))
+
+    def cache_clear(self):
+        """Remove all entries from the cache and reset the counters."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
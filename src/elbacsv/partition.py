@@ -0,0 +1,539 @@
+"""
+Partitioned output of converted transactions.
+
+A PartitionSink distributes the converted rows of one pass over several
+output files: one per month of Durchführungsdatum, one per value of a
+column such as 'IBAN Auftraggeber', or consecutive files of at most a given
+number of rows or bytes. The files are named after the output path with the
+partition appended, e.g. 'ledger_2024-01.csv', and keep its format and
+compression.
+
+Rows are buffered per partition and written in blocks, and only a limited
+number of partition files is open at the same time: when the limit is
+reached, the least recently written file is closed and later reopened for
+appending. A JSON manifest next to the files lists every partition with its
+number of rows and its range of dates.
+"""
+
+import csv
+import datetime as dt
+import functools
+import io
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .columns import DATE_COLUMNS, EPOCH_ORDINAL, MISSING, date_days
+from .compression import split_compression
+from .constants import STDIO_PATH
+from .sinks import Sink, infer_format, make_sink
+
+# Kinds of partitioning and whether they take an argument
+PARTITION_MODES = {"month": False, "column": True, "rows": True, "bytes": True}
+
+# Factors of the size suffixes accepted by bytes=N
+SIZE_SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+# Version of the manifest format and the suffix of its file name
+MANIFEST_FORMAT = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Default number of partition files open at the same time
+DEFAULT_MAX_OPEN = 32
+
+# Default number of rows buffered per partition before they are written
+DEFAULT_BUFFER_ROWS = 1000
+
+# Partition of rows without a valid Durchführungsdatum
+UNDATED = "undated"
+
+# Characters replaced in partition names used in file names
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.-]+")
+
+
+class Partitioning(NamedTuple):
+    """
+    How rows are assigned to partitions.
+
+    Attributes:
+        mode: One of the keys of PARTITION_MODES.
+        argument: The column name for 'column', the maximum number of rows
+            or bytes per file for 'rows' and 'bytes', otherwise None.
+
+    """
+
+    mode: str
+    argument: object = None
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse a partitioning given on the command line.
+
+        Accepted are 'month', 'column=NAME', 'rows=N' and 'bytes=N', where
+        the number of bytes may end in k, M or G.
+
+        Args:
+            text: The partitioning.
+
+        Returns:
+            Partitioning: The parsed partitioning.
+
+        Raises:
+            ValueError: If the mode is unknown, or its argument missing or
+                invalid.
+
+        """
+        mode, sep, argument = text.partition("=")
+        mode = mode.strip().lower()
+
+        if mode not in PARTITION_MODES or bool(sep) != PARTITION_MODES[mode]:
+            msg = f"Invalid partitioning: {text!r}"
+            raise ValueError(msg)
+
+        if mode == "month":
+            return cls(mode)
+        if mode == "column":
+            return cls(mode, argument.strip())
+
+        argument = argument.strip().lower()
+        factor = SIZE_SUFFIXES.get(argument[-1:], 1) if mode == "bytes" else 1
+        digits = argument.rstrip("".join(SIZE_SUFFIXES)) if factor > 1 else argument
+
+        if not digits.isdigit() or int(digits) < 1:
+            msg = f"Invalid partitioning: {text!r}"
+            raise ValueError(msg)
+
+        return cls(mode, int(digits) * factor)
+
+    def __str__(self):
+        if self.argument is None:
+            return self.mode
+        return f"{self.mode}={self.argument}"
+
+
+@functools.lru_cache(maxsize=4096)
+def month_of(text):
+    """
+    Return the month of a date as the name of its partition.
+
+    Args:
+        text: Date in ELBA or ISO format.
+
+    Returns:
+        str: The month in 'YYYY-MM' format, or UNDATED.
+
+    """
+    days = date_days(text)
+    if days == MISSING:
+        return UNDATED
+
+    date = dt.date.fromordinal(days + EPOCH_ORDINAL)
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+def partition_path(path, name):
+    """
+    Return the path of a partition file.
+
+    Args:
+        path: Path of the partitioned output, e.g. 'ledger.csv.gz'.
+        name: Name of the partition, used in the file name.
+
+    Returns:
+        str: The path with the name before the extensions, e.g.
+            'ledger_2024-01.csv.gz'.
+
+    """
+    root, compression = split_compression(path)
+    stem, ext = os.path.splitext(root)
+    return f"{stem}_{name}{ext}{compression}"
+
+
+def manifest_path(path):
+    """
+    Return the path of the manifest of a partitioned output.
+
+    Args:
+        path: Path of the partitioned output.
+
+    Returns:
+        str: The path without extensions and with MANIFEST_SUFFIX.
+
+    """
+    return os.path.splitext(split_compression(path)[0])[0] + MANIFEST_SUFFIX
+
+
+def _iso_date(days):
+    """
+    Return a number of days since 1970-01-01 as an ISO date.
+
+    Args:
+        days: Days since 1970-01-01, or None.
+
+    Returns:
+        str | None: The date, or None.
+
+    """
+    if days is None:
+        return None
+    return dt.date.fromordinal(days + EPOCH_ORDINAL).isoformat()
+
+
+class _Partition:
+    """Rows, statistics and output file of one partition."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.rows = 0
+        self.first_day = None
+        self.last_day = None
+        self.buffer = []
+        self.written = False
+
+    def add(self, row, days):
+        self.buffer.append(row)
+        self.rows += 1
+
+        if days != MISSING:
+            if self.first_day is None or days < self.first_day:
+                self.first_day = days
+            if self.last_day is None or days > self.last_day:
+                self.last_day = days
+
+    def to_dict(self):
+        return {
+            "partition": self.name,
+            "path": os.path.basename(self.path),
+            "rows": self.rows,
+            "first_date": _iso_date(self.first_day),
+            "last_date": _iso_date(self.last_day),
+        }
+
+
+class PartitionSink(Sink):
+    """
+    Sink writing the rows into one output file per partition.
+
+    Args:
+        path: Path of the partitioned output. It is not written itself;
+            see partition_path and manifest_path.
+        partitioning: Partitioning, or a string accepted by
+            Partitioning.parse.
+        output_format: 'csv', 'jsonl' or 'sqlite', as for make_sink.
+        sink_options: Optional keyword arguments for the SQLite sink.
+        max_open: Maximum number of partition files open at the same time.
+        buffer_rows: Number of rows buffered per partition before they are
+            written to its file.
+
+    Attributes:
+        partitions: The partitions in order of their first row.
+        manifest_path: Path of the manifest written by close.
+
+    Raises:
+        ValueError: If the path is standard output or a file object, or the
+            partitioning is invalid.
+
+    """
+
+    def __init__(
+        self,
+        path,
+        partitioning,
+        *,
+        output_format=None,
+        sink_options=None,
+        max_open=DEFAULT_MAX_OPEN,
+        buffer_rows=DEFAULT_BUFFER_ROWS,
+    ):
+        if path == STDIO_PATH or hasattr(path, "write"):
+            msg = "Partitioned output needs the path of a file"
+            raise ValueError(msg)
+
+        super().__init__(path)
+        if isinstance(partitioning, str):
+            partitioning = Partitioning.parse(partitioning)
+
+        self.partitioning = partitioning
+        self.output_format = output_format
+        self.sink_options = sink_options or {}
+        self.max_open = max_open
+        self.buffer_rows = buffer_rows
+        self.partitions = {}
+        self.manifest_path = manifest_path(path)
+
+        self._header = ()
+        self._dialect = "excel"
+        self._date_index = None
+        self._column_index = None
+        self._open_sinks = OrderedDict()
+        self._paths = set()
+        self._sequence = 0
+        self._sequence_size = 0
+        self._header_size = 0
+        self._row_size = None
+        self._line = io.StringIO()
+        self._line_writer = None
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Prepare the partitioning of the rows.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file.
+            append: Must be False; partitions are always written anew.
+
+        Raises:
+            ValueError: If append is True, or a column needed by the
+                partitioning is not in the header.
+
+        """
+        if append:
+            msg = "Partitioned output cannot be appended to"
+            raise ValueError(msg)
+
+        self._header = list(header)
+        self._dialect = dialect
+
+        # Rows are measured as their sinks write them; SQLite files are
+        # measured as CSV
+        if (self.output_format or infer_format(self.path)) == "jsonl":
+            self._row_size = self._json_size
+        else:
+            self._line_writer = csv.writer(self._line, dialect)
+            self._row_size = self._csv_size
+            self._header_size = self._csv_size(self._header)
+
+        date_column = DATE_COLUMNS[0]
+        if date_column in self._header:
+            self._date_index = self._header.index(date_column)
+        elif self.partitioning.mode == "month":
+            msg = f"Partitioning by month needs the {date_column} column"
+            raise ValueError(msg)
+
+        if self.partitioning.mode == "column":
+            column = self.partitioning.argument
+            if column not in self._header:
+                msg = f"Unknown partition column: {column!r}"
+                raise ValueError(msg)
+            self._column_index = self._header.index(column)
+
+    def _name(self, row):
+        """
+        Return the name of the partition of a row.
+
+        Args:
+            row: List of strings in header order.
+
+        Returns:
+            str: The name of the partition.
+
+        """
+        mode, limit = self.partitioning
+
+        if mode == "month":
+            return month_of(row[self._date_index])
+        if mode == "column":
+            return row[self._column_index]
+
+        if mode == "rows":
+            size, empty = 1, 0
+        else:
+            size, empty = self._row_size(row), self._header_size
+
+        # A file holds at least one row, even if it exceeds the limit
+        if self._sequence == 0 or (
+            self._sequence_size > empty and self._sequence_size + size > limit
+        ):
+            self._next_sequence(empty)
+        self._sequence_size += size
+        return f"{self._sequence:04d}"
+
+    def _csv_size(self, row):
+        """
+        Return the size of a row written as CSV.
+
+        Args:
+            row: List of strings.
+
+        Returns:
+            int: The number of UTF-8 bytes of the line, with quotes,
+                delimiters and the line end.
+
+        """
+        self._line.seek(0)
+        self._line.truncate()
+        self._line_writer.writerow(row)
+        return len(self._line.getvalue().encode("utf-8"))
+
+    def _json_size(self, row):
+        """
+        Return the size of a row written as JSON Lines.
+
+        Args:
+            row: List of strings in header order.
+
+        Returns:
+            int: The number of UTF-8 bytes of the line.
+
+        """
+        record = dict(zip(self._header, row, strict=False))
+        return len((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def _next_sequence(self, size):
+        """
+        Write and close the current file of a row or size partitioning.
+
+        Args:
+            size: Size of the next file before its first row, i.e. the size
+                of its header.
+
+        """
+        current = self.partitions.get(f"{self._sequence:04d}")
+        if current is not None:
+            self._flush(current)
+            self._close_sink(current.name)
+
+        self._sequence += 1
+        self._sequence_size = size
+
+    def _partition(self, name):
+        """
+        Return a partition, creating it on first use.
+
+        Args:
+            name: Name of the partition.
+
+        Returns:
+            _Partition: The partition.
+
+        """
+        partition = self.partitions.get(name)
+        if partition is not None:
+            return partition
+
+        safe = _UNSAFE_CHARACTERS.sub("_", name).strip("._") or "empty"
+        path = partition_path(self.path, safe)
+        suffix = 1
+        while path in self._paths:
+            suffix += 1
+            path = partition_path(self.path, f"{safe}_{suffix}")
+
+        self._paths.add(path)
+        partition = self.partitions[name] = _Partition(name, path)
+        return partition
+
+    def write(self, row):
+        """
+        Add one converted row to its partition.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        partition = self._partition(self._name(row))
+        days = MISSING if self._date_index is None else date_days(row[self._date_index])
+        partition.add(row, days)
+
+        if len(partition.buffer) >= self.buffer_rows:
+            self._flush(partition)
+
+    def _sink(self, partition):
+        """
+        Return the open sink of a partition, opening it if necessary.
+
+        Args:
+            partition: The partition.
+
+        Returns:
+            Sink: The sink writing the file of the partition.
+
+        """
+        sink = self._open_sinks.get(partition.name)
+        if sink is not None:
+            self._open_sinks.move_to_end(partition.name)
+            return sink
+
+        while len(self._open_sinks) >= self.max_open:
+            self._close_sink(next(iter(self._open_sinks)))
+
+        sink = make_sink(partition.path, self.output_format, **self.sink_options)
+        sink.open(self._header, dialect=self._dialect, append=partition.written)
+        partition.written = True
+        self._open_sinks[partition.name] = sink
+        return sink
+
+    def _close_sink(self, name, error=None):
+        """
+        Close the sink of a partition if it is open.
+
+        Args:
+            name: Name of the partition.
+            error: Exception that aborted the conversion, or None.
+
+        """
+        sink = self._open_sinks.pop(name, None)
+        if sink is not None:
+            sink.close(error)
+
+    def _flush(self, partition):
+        """
+        Write the buffered rows of a partition.
+
+        Args:
+            partition: The partition.
+
+        """
+        if partition.buffer:
+            self._sink(partition).write_rows(partition.buffer)
+            partition.buffer = []
+
+    def manifest(self):
+        """
+        Return the manifest of the written partitions.
+
+        Returns:
+            dict: The partitioning, the columns and one entry per partition
+                with its file name, number of rows and first and last
+                Durchführungsdatum.
+
+        """
+        return {
+            "format": MANIFEST_FORMAT,
+            "partitioning": str(self.partitioning),
+            "columns": self._header,
+            "partitions": [
+                partition.to_dict() for partition in self.partitions.values()
+            ],
+        }
+
+    def close(self, error=None):
+        """
+        Write the remaining rows, close all files and write the manifest.
+
+        If the conversion failed, the open files are closed with the error
+        and no manifest is written.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        try:
+            if error is None:
+                for partition in self.partitions.values():
+                    self._flush(partition)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            for name in list(self._open_sinks):
+                self._close_sink(name, error)
+
+        if error is None:
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest(), f, ensure_ascii=False, indent=2)
+                f.write("\n")
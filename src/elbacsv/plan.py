@@ -0,0 +1,386 @@
+"""
+Transform plans describing the layout of the output rows.
+
+A TransformPlan fixes everything about the output that does not depend on
+the data: the order of the columns, which keys are merged into one column,
+which columns are dropped or renamed, and where each output value comes
+from. The plan is built once per conversion and compiled against the keys
+the parser extracts. Compiling resolves every column to a position in the
+input row or in the parsed values, so converting a row only runs a fixed
+list of merges and one projection, without looking up any key.
+
+Merges are described by Merge tuples. The --merge option of the command
+line is REFERENCE_MERGE; other merges, such as combining 'Empfänger' and
+'Auftraggeber' into one counterparty column, cost the same per row.
+"""
+
+import functools
+import operator
+from typing import NamedTuple
+
+from .constants import KEYS
+from .records import column_order
+
+# Columns copied from the input file and their position in an input row
+NATIVE_COLUMNS = {
+    "Durchführungsdatum": 0,
+    "Valutadatum": 2,
+    "Betrag": 3,
+    "Währung": 4,
+    "Zeitstempel": 5,
+}
+
+# Native columns written before and after the parsed keys
+LEADING_COLUMNS = ("Durchführungsdatum",)
+TRAILING_COLUMNS = ("Valutadatum", "Betrag", "Währung", "Zeitstempel")
+
+# Keys combined into 'Verwendungszweck' when merging
+MERGE_KEYS = ("Zahlungsreferenz", "Verwendungszweck", "Auftraggeberreferenz")
+
+
+class Merge(NamedTuple):
+    """
+    Combination of the values of several keys into one output column.
+
+    The non-empty values of the sources are joined with the separator. The
+    sources are not written themselves, except for a source that is also the
+    target. A new target column takes the place of the first source.
+
+    Attributes:
+        target: Name of the merged column, a key or a new name.
+        sources: Keys whose values are merged, in this order.
+        separator: Text put between the values.
+
+    """
+
+    target: str
+    sources: tuple
+    separator: str = " "
+
+
+# Merge applied by process_csv_file and the command line with --merge
+REFERENCE_MERGE = Merge("Verwendungszweck", MERGE_KEYS)
+
+
+class CompiledPlan(NamedTuple):
+    """
+    Transform plan resolved against the keys extracted by a parser.
+
+    Attributes:
+        merge: Function merging the parsed values in place, or None if no
+            merge is needed.
+        build: Function building the output row from an input row and its
+            merged values.
+
+    """
+
+    merge: object
+    build: object
+
+
+def _apply_merges(values, operations):
+    """
+    Merge parsed values in place.
+
+    Args:
+        values: List of values returned by the parser.
+        operations: Tuple of (target, sources, separator) triples, where
+            target and sources are positions in values. A target equal to
+            len(values) appends the merged value.
+
+    """
+    for target, sources, separator in operations:
+        merged = separator.join(
+            part for part in (values[i].strip() for i in sources) if part
+        )
+
+        if target == len(values):
+            values.append(merged)
+        else:
+            values[target] = merged
+
+
+def _project_row(row, values, layout):
+    """
+    Build an output row containing only the selected columns.
+
+    Args:
+        row: Input row as a list of strings.
+        values: List of values returned by the parser.
+        layout: Tuple of (index, position) pairs, one per output column. A
+            native column has its input index and the position None, a
+            parsed column has the index None and its position in values.
+
+    Returns:
+        list[str]: The selected values in output order.
+
+    """
+    return [
+        values[position] if index is None else row[index] for index, position in layout
+    ]
+
+
+def _splice_all(row, values):
+    return row[:1] + values + row[2:]
+
+
+def _splice(row, values, select):
+    return [*row[:1], *select(values), *row[2:]]
+
+
+class TransformPlan:
+    """
+    Layout of the output rows of a conversion.
+
+    The output consists of the native columns and the parsed keys in the
+    order of KEYS. Merges are applied first, then the dropped columns are
+    removed and the remaining ones selected with columns. Renames only
+    change the header.
+
+    If neither columns nor dropped native columns are given, the first input
+    column is followed by the parsed columns and all remaining input
+    columns, as in the original conversion. Otherwise exactly the selected
+    columns are written.
+
+    Args:
+        merges: Iterable of Merge tuples, applied in this order.
+        renames: Optional mapping from column names to names in the header.
+        drops: Names of columns that are not written.
+        columns: Optional names of the output columns, in output order.
+
+    Raises:
+        ValueError: If a merge refers to an unknown key or a native column,
+            or if a dropped, selected or renamed column does not exist in
+            the output, or if the header would contain a name twice.
+
+    """
+
+    def __init__(self, merges=(), *, renames=None, drops=(), columns=None):
+        self.merges = tuple(
+            Merge(merge.target, tuple(merge.sources), merge.separator)
+            for merge in merges
+        )
+        self.renames = dict(renames or {})
+        self.drops = tuple(drops)
+
+        parsed = self._parsed_columns()
+        available = [
+            column
+            for column in (*LEADING_COLUMNS, *parsed, *TRAILING_COLUMNS)
+            if column not in self.drops
+        ]
+        _check_columns(self.drops, (*LEADING_COLUMNS, *parsed, *TRAILING_COLUMNS))
+
+        if columns is None:
+            self.columns = tuple(available)
+        else:
+            _check_columns(columns, available)
+            self.columns = tuple(columns)
+
+        _check_columns(self.renames, self.columns)
+        if len(set(self.header)) < len(self.header):
+            msg = f"Duplicate column names: {self.header!r}"
+            raise ValueError(msg)
+
+        # Whether the output keeps the input row around the parsed columns
+        self._splice = columns is None and not set(self.drops) & set(NATIVE_COLUMNS)
+
+    @classmethod
+    def from_options(cls, *, merge=False, columns=None):
+        """
+        Return the plan for the merge and columns options of a conversion.
+
+        Args:
+            merge: If True, merge 'Zahlungsreferenz', 'Verwendungszweck' and 'Auftraggeberreferenz'.
+            columns: Optional names of the output columns, in output order.
+
+        Returns:
+            TransformPlan: The plan.
+
+        """
+        return cls((REFERENCE_MERGE,) if merge else (), columns=columns)
+
+    def __repr__(self):
+        return f"TransformPlan({list(self.columns)!r})"
+
+    def _parsed_columns(self):
+        """
+        Return the parsed columns in output order, after merging.
+
+        Returns:
+            list[str]: The keys and new merge targets.
+
+        Raises:
+            ValueError: If a merge refers to an unknown key or a native column.
+
+        """
+        columns = list(column_order(KEYS))
+
+        for merge in self.merges:
+            unknown = [key for key in merge.sources if key not in KEYS]
+            if unknown or not merge.sources:
+                msg = f"Unknown keys in merge: {unknown!r}"
+                raise ValueError(msg)
+            if merge.target in NATIVE_COLUMNS:
+                msg = f"Cannot merge into a native column: {merge.target!r}"
+                raise ValueError(msg)
+
+            if merge.target not in columns:
+                first = min(
+                    (columns.index(key) for key in merge.sources if key in columns),
+                    default=len(columns),
+                )
+                columns.insert(first, merge.target)
+
+            columns = [
+                column
+                for column in columns
+                if column == merge.target or column not in merge.sources
+            ]
+
+        return columns
+
+    @property
+    def header(self):
+        """Names of the output columns, after renaming."""
+        return [self.renames.get(column, column) for column in self.columns]
+
+    def _active_merges(self):
+        """
+        Return the merges whose result is written.
+
+        Returns:
+            list[Merge]: The merges whose target is an output column or a
+                source of a later merge, in order.
+
+        """
+        needed = set(self.columns)
+        active = []
+
+        for merge in reversed(self.merges):
+            if merge.target in needed:
+                active.append(merge)
+                needed.update(merge.sources)
+
+        return active[::-1]
+
+    def fields(self, filters=()):
+        """
+        Return the keys the parser has to extract.
+
+        Args:
+            filters: Filters on parsed keys; the keys they read are extracted too.
+
+        Returns:
+            tuple[str, ...] | None: The keys in KEYS order, or None if all keys
+                are needed.
+
+        """
+        needed = {column for column in self.columns if column in KEYS}
+        for merge in self._active_merges():
+            needed.update(merge.sources)
+            if merge.target in KEYS:
+                needed.add(merge.target)
+        for row_filter in filters:
+            needed.update(row_filter.keys)
+
+        if len(needed) == len(KEYS):
+            return None
+
+        return tuple(key for key in KEYS if key in needed)
+
+    def compile(self, record_keys):
+        """
+        Resolve the plan against the keys extracted by a parser.
+
+        Args:
+            record_keys: Keys of the parsed values, in order, as given by
+                the record_keys attribute of the parser.
+
+        Returns:
+            CompiledPlan: The merge and build functions.
+
+        """
+        positions = {key: i for i, key in enumerate(record_keys)}
+
+        operations = []
+        for merge in self._active_merges():
+            target = positions.setdefault(merge.target, len(positions))
+            sources = tuple(positions[key] for key in merge.sources)
+            operations.append((target, sources, merge.separator))
+
+        merge = None
+        if operations:
+            merge = functools.partial(_apply_merges, operations=tuple(operations))
+
+        return CompiledPlan(merge, self._builder(positions, len(record_keys)))
+
+    def _builder(self, positions, size):
+        """
+        Return the function building an output row.
+
+        Args:
+            positions: Positions of the parsed columns in the merged values.
+            size: Number of values returned by the parser.
+
+        Returns:
+            Callable[[list[str], list[str]], list[str]]: The row builder.
+
+        """
+        if not self._splice:
+            layout = tuple(
+                (NATIVE_COLUMNS[column], None)
+                if column in NATIVE_COLUMNS
+                else (None, positions[column])
+                for column in self.columns
+            )
+            return functools.partial(_project_row, layout=layout)
+
+        indices = [
+            positions[column] for column in self.columns if column not in NATIVE_COLUMNS
+        ]
+
+        # Values in record order are already in output column order
+        if indices == list(range(size)):
+            return _splice_all
+
+        # A single index would make itemgetter return a value, not a tuple
+        if len(indices) == 1:
+            select = operator.itemgetter(slice(indices[0], indices[0] + 1))
+        else:
+            select = operator.itemgetter(*indices)
+
+        return functools.partial(_splice, select=select)
+
+    def to_dict(self):
+        """
+        Return the plan as a dictionary of JSON-compatible values.
+
+        Returns:
+            dict: The merges, renames, drops and columns of the plan.
+
+        """
+        return {
+            "merges": [[m.target, list(m.sources), m.separator] for m in self.merges],
+            "renames": self.renames,
+            "drops": list(self.drops),
+            "columns": list(self.columns),
+        }
+
+
+def _check_columns(names, available):
+    """
+    Check that names refer to existing columns.
+
+    Args:
+        names: Iterable of column names.
+        available: Names of the existing columns.
+
+    Raises:
+        ValueError: If a name is not in available.
+
+    """
+    for name in names:
+        if name not in available:
+            msg = f"Unknown column: {name!r}"
+            raise ValueError(msg)
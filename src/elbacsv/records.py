@@ -0,0 +1,170 @@
+"""
+Compact record type for parsed transaction texts.
+
+A record holds the values of the keys of the structured ELBA text in a
+tuple, ordered like the output columns. Compared to a dict per row, a
+record needs a fraction of the memory and is cheap to create, which matters
+when millions of parsed rows are kept. Values can be accessed by attribute,
+by position and by key; a dict is only built when to_dict is called.
+"""
+
+import functools
+import keyword
+import re
+from typing import NamedTuple
+
+from .constants import KEYS
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+# Methods of records that must not be shadowed by a field
+_RESERVED = frozenset({"count", "get", "index", "keys", "to_dict"})
+
+
+def attribute_name(key):
+    """
+    Return the attribute name of a key.
+
+    Args:
+        key: Key of the structured text, e.g. 'IBAN Empfänger'.
+
+    Returns:
+        str: Lower-case identifier, e.g. 'iban_empfaenger'.
+
+    """
+    name = key.lower().translate(_UMLAUTS)
+    return re.sub(r"\W+", "_", name, flags=re.ASCII).strip("_")
+
+
+def _field_names(keys):
+    """
+    Return unique, valid attribute names for keys.
+
+    Keys whose attribute name is not a valid field name of a named tuple, is
+    the name of a record method or is already taken, get the positional name
+    'field_<i>'.
+
+    Args:
+        keys: Tuple of keys.
+
+    Returns:
+        list[str]: One attribute name per key.
+
+    """
+    names = []
+    for i, key in enumerate(keys):
+        name = attribute_name(key)
+        if (
+            not name.isidentifier()
+            or keyword.iskeyword(name)
+            or name.startswith("_")
+            or name in _RESERVED
+            or name in names
+        ):
+            name = f"field_{i}"
+        names.append(name)
+    return names
+
+
+def column_order(keys):
+    """
+    Sort keys by their output column, as defined in KEYS.
+
+    Keys that are not in KEYS keep their order and are put last.
+
+    Args:
+        keys: Iterable of keys.
+
+    Returns:
+        tuple[str, ...]: The keys in output column order.
+
+    """
+    return tuple(sorted(keys, key=lambda key: KEYS.get(key, len(KEYS) + 1)))
+
+
+def _rebuild(keys, values):
+    return record_type(keys)._make(values)
+
+
+@functools.cache
+def record_type(keys):
+    """
+    Return the record type for a tuple of keys.
+
+    The type is a named tuple whose attribute names are derived from the
+    keys with attribute_name. The keys are available as the _keys class
+    attribute. Record types are cached, so equal key tuples give the same
+    type.
+
+    Args:
+        keys: Tuple of keys, in record order.
+
+    Returns:
+        type: Tuple subclass with one field per key.
+
+    """
+    record_keys = tuple(keys)
+    base = NamedTuple("Record", [(name, str) for name in _field_names(record_keys)])
+    positions = {key: i for i, key in enumerate(record_keys)}
+
+    class Record(base):
+        """
+        Values of the keys of one structured text.
+
+        Values are accessed by attribute (record.iban_empfaenger), by
+        position (record[7]) or by key (record['IBAN Empfänger']).
+        """
+
+        __slots__ = ()
+        _keys = record_keys
+        _positions = positions
+
+        def __getitem__(self, item):
+            if isinstance(item, str):
+                return tuple.__getitem__(self, self._positions[item])
+            return tuple.__getitem__(self, item)
+
+        def __reduce__(self):
+            return _rebuild, (self._keys, tuple(self))
+
+        def get(self, key, default=None):
+            """
+            Return the value of a key, or a default if the key is not a field.
+
+            Args:
+                key: Key of the structured text.
+                default: Value returned for unknown keys.
+
+            Returns:
+                str: The value of the key.
+
+            """
+            i = self._positions.get(key)
+            return default if i is None else self[i]
+
+        def keys(self):
+            """
+            Return the keys of the record, so dict(record) works.
+
+            Returns:
+                tuple[str, ...]: The keys in record order.
+
+            """
+            return self._keys
+
+        def to_dict(self):
+            """
+            Return the record as a dict.
+
+            Returns:
+                dict[str, str]: Mapping of each key to its value.
+
+            """
+            return dict(zip(self._keys, self, strict=True))
+
+    Record.__module__ = __name__
+    return Record
+
+
+# Record type for all keys in KEYS, in output column order
+Record = record_type(column_order(KEYS))
@@ -0,0 +1,162 @@
+"""
+Registry of keys added to KEYS at runtime.
+
+ELBA does not publish a list of the keys of its structured text, so KEYS is
+maintained by hand. Keys found later, for example with the discovery module,
+can be registered without changing the code: register_keys adds them to
+KEYS as new columns after the known ones, and load_keys reads them from a
+JSON file such as the report written by discovery.save_report.
+
+Registered keys are passed to the worker processes of parallel and batch
+conversions, so they are recognized regardless of the process start method.
+"""
+
+import json
+
+from .constants import KEYS
+from .parser import default_parser
+
+# Version of the JSON format written by save_keys
+REGISTRY_FORMAT = 1
+
+# Keys registered in this process, in registration order
+_registered = []
+
+
+def _check_key(key):
+    """
+    Check that a key can be recognized by the parser.
+
+    Args:
+        key: The key.
+
+    Raises:
+        ValueError: If the key is empty, contains a colon or ends with
+            whitespace.
+
+    """
+    if not isinstance(key, str) or not key or ":" in key or key[-1].isspace():
+        msg = f"Invalid key: {key!r}"
+        raise ValueError(msg)
+
+
+def register_keys(keys):
+    """
+    Add keys to KEYS.
+
+    New keys get the columns after the last known column, in the given
+    order. Keys that are already known are skipped, so registering the same
+    keys again has no effect. The shared parsers are rebuilt on next use.
+
+    Args:
+        keys: Iterable of keys.
+
+    Returns:
+        tuple[str, ...]: The keys that were added.
+
+    """
+    keys = list(dict.fromkeys(keys))
+    for key in keys:
+        _check_key(key)
+
+    added = tuple(key for key in keys if key not in KEYS)
+    column = max(KEYS.values(), default=0)
+
+    for key in added:
+        column += 1
+        KEYS[key] = column
+        _registered.append(key)
+
+    if added:
+        default_parser.cache_clear()
+
+    return added
+
+
+def registered_keys():
+    """
+    Return the keys registered in this process.
+
+    Returns:
+        tuple[str, ...]: The keys in registration order.
+
+    """
+    return tuple(_registered)
+
+
+def reset_keys():
+    """
+    Remove all keys registered in this process from KEYS.
+
+    Returns:
+        tuple[str, ...]: The removed keys.
+
+    """
+    removed = registered_keys()
+    for key in removed:
+        KEYS.pop(key, None)
+
+    _registered.clear()
+    if removed:
+        default_parser.cache_clear()
+
+    return removed
+
+
+def load_keys(path):
+    """
+    Read keys from a JSON file.
+
+    The file contains an object with a 'keys' list. Its items are either
+    keys or objects with a 'key' member, like the entries of a discovery
+    report, so a report can be used as a registry after removing the
+    entries that are not keys.
+
+    Args:
+        path: Path of the JSON file.
+
+    Returns:
+        tuple[str, ...]: The keys in file order.
+
+    Raises:
+        ValueError: If the file is not valid JSON or has no 'keys' list, or
+            if one of the keys is not valid.
+
+    """
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            msg = f"{path}: {e}"
+            raise ValueError(msg) from None
+
+    try:
+        entries = list(data["keys"])
+    except (KeyError, TypeError):
+        msg = f"{path}: expected an object with a 'keys' list"
+        raise ValueError(msg) from None
+
+    keys = tuple(
+        entry.get("key") if isinstance(entry, dict) else entry for entry in entries
+    )
+    for key in keys:
+        _check_key(key)
+
+    return keys
+
+
+def save_keys(entries, path):
+    """
+    Write keys to a JSON file that load_keys can read.
+
+    Args:
+        entries: Iterable of keys, or of dicts with a 'key' item and any
+            other JSON-compatible items, e.g. counts and examples.
+        path: Path of the JSON file.
+
+    """
+    data = {"format": REGISTRY_FORMAT, "keys": list(entries)}
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
@@ -0,0 +1,479 @@
+"""
+Output sinks for converted ELBA transactions.
+
+A sink receives the header and the converted rows of a conversion and
+stores them. Besides CSV, rows can be written as JSON Lines or loaded
+straight into an SQLite database, so no second pass over a CSV file is
+needed to make the transactions queryable.
+
+The CSV and JSON Lines sinks also write to file objects, so converted rows
+can be streamed to a socket, a response body or a buffer in memory.
+"""
+
+import csv
+import functools
+import io
+import json
+import os
+import sqlite3
+import sys
+
+from .compression import open_output, output_compression, split_compression
+from .constants import STDIO_PATH
+from .values import parse_amount, parse_date
+
+# Output formats and the file extension used for them
+SINK_EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "sqlite": ".sqlite"}
+
+# File extensions from which the output format is inferred
+_FORMAT_BY_EXTENSION = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+}
+
+# Columns indexed by SqliteSink if indexes are requested
+INDEXED_COLUMNS = (
+    "Durchführungsdatum",
+    "IBAN Empfänger",
+    "IBAN Zahlungsempfänger",
+    "IBAN Auftraggeber",
+    "IBAN Transaktionsteilnehmer",
+)
+
+
+def _detach(wrapper):
+    wrapper.flush()
+    wrapper.detach()
+
+
+def _open_output(path, *, append, newline=None):
+    """
+    Open the output of a sink for writing text.
+
+    Args:
+        path: Path of the output file, '-' for standard output, or a
+            writable text or binary file object. Files are compressed if
+            their extension is one of COMPRESSION_EXTENSIONS. Standard
+            output and binary file objects are wrapped to write UTF-8.
+        append: If True, a file is opened for appending.
+        newline: Newline translation, as for open().
+
+    Returns:
+        tuple[TextIO, Callable[[], None]]: The text stream and the function
+            releasing it. Files opened here are closed, file objects passed
+            by the caller are only flushed and stay open.
+
+    """
+    if path == STDIO_PATH:
+        sys.stdout.flush()
+        path = sys.stdout.buffer
+
+    if not hasattr(path, "write"):
+        file = open_output(path, "a" if append else "w", newline=newline)
+        return file, file.close
+
+    if isinstance(path, (io.RawIOBase, io.BufferedIOBase)):
+        wrapper = io.TextIOWrapper(path, encoding="utf-8", newline=newline)
+        return wrapper, functools.partial(_detach, wrapper)
+
+    return path, path.flush
+
+
+class Sink:
+    """
+    Base class of the output sinks.
+
+    A sink is opened once with the header, receives the converted rows with
+    write or write_rows and is closed at the end. Sinks can be used as
+    context managers; if the block raises, close is called with the error.
+
+    Args:
+        path: Path of the output file. CsvSink and JsonLinesSink also accept
+            '-' for standard output and writable text or binary file objects,
+            which are left open.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(exc_value)
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Prepare the sink for writing rows.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file.
+            append: If True, add the rows to an existing output.
+
+        """
+        raise NotImplementedError
+
+    def write(self, row):
+        """
+        Write one converted row.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        raise NotImplementedError
+
+    def write_rows(self, rows):
+        """
+        Write converted rows.
+
+        Args:
+            rows: Iterable of lists of strings in header order.
+
+        """
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """Write buffered rows to the output; sinks without a buffer do nothing."""
+
+    def close(self, error=None):
+        """
+        Finish writing and release the output file.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        raise NotImplementedError
+
+
+class CsvSink(Sink):
+    """Sink writing a CSV file in the dialect of the input file."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = None
+        self._release = None
+        self._writer = None
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Open the CSV file and write the header unless appending.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file.
+            append: If True, add the rows to an existing output.
+
+        """
+        self._file, self._release = _open_output(self.path, append=append, newline="")
+        self._writer = csv.writer(self._file, dialect)
+        if not append:
+            self._writer.writerow(header)
+
+    def write(self, row):
+        """
+        Write one converted row.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        self._writer.writerow(row)
+
+    def write_rows(self, rows):
+        """
+        Write converted rows.
+
+        Args:
+            rows: Iterable of lists of strings in header order.
+
+        """
+        self._writer.writerows(rows)
+
+    def flush(self):
+        """Write buffered rows to the output."""
+        self._file.flush()
+
+    def close(self, error=None):
+        """
+        Close the CSV file.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        if self._file is not None:
+            self._release()
+            self._file = None
+            self._release = None
+
+
+class JsonLinesSink(Sink):
+    """Sink writing one JSON object per row, keyed by the column names."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = None
+        self._release = None
+        self._header = ()
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Open the JSON Lines file.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file; not used.
+            append: If True, add the rows to an existing output.
+
+        """
+        self._header = tuple(header)
+        self._file, self._release = _open_output(self.path, append=append)
+
+    def write(self, row):
+        """
+        Write one converted row.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        record = dict(zip(self._header, row, strict=False))
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        """Write buffered rows to the output."""
+        self._file.flush()
+
+    def close(self, error=None):
+        """
+        Close the JSON Lines file.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        if self._file is not None:
+            self._release()
+            self._file = None
+            self._release = None
+
+
+def _sql_date(value):
+    if not value:
+        return None
+    try:
+        return parse_date(value).isoformat()
+    except ValueError:
+        return value
+
+
+def _sql_amount(value):
+    if not value:
+        return None
+    try:
+        return str(parse_amount(value))
+    except ValueError:
+        return value
+
+
+# Column types and value converters of the typed SQLite columns
+_SQL_TYPES = {
+    "Durchführungsdatum": ("DATE", _sql_date),
+    "Valutadatum": ("DATE", _sql_date),
+    "Betrag": ("NUMERIC", _sql_amount),
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SqliteSink(Sink):
+    """
+    Sink loading the rows into a table of an SQLite database.
+
+    Dates are stored in ISO format in DATE columns and amounts in a NUMERIC
+    column, so they can be compared and summed in SQL. All other columns
+    are TEXT. Rows are inserted with executemany in batches, and the whole
+    conversion is a single transaction, which is rolled back on errors.
+
+    Args:
+        path: Path of the database file.
+        table: Name of the table. Unless appending, an existing table of
+            that name is replaced.
+        indexes: If True, create indexes on the date and IBAN columns after
+            loading the rows.
+        batch_size: Number of rows inserted with one executemany call.
+
+    """
+
+    def __init__(self, path, *, table="transactions", indexes=False, batch_size=1000):
+        super().__init__(path)
+        self.table = table
+        self.indexes = indexes
+        self.batch_size = batch_size
+        self._connection = None
+        self._header = ()
+        self._converters = ()
+        self._insert = ""
+        self._batch = []
+
+    def open(self, header, *, dialect="excel", append=False):
+        """
+        Create the table and start the transaction.
+
+        Args:
+            header: Names of the output columns.
+            dialect: CSV dialect of the input file; not used.
+            append: If True, add the rows to an existing table.
+
+        """
+        self._header = tuple(header)
+        self._converters = tuple(
+            (i, _SQL_TYPES[name][1])
+            for i, name in enumerate(self._header)
+            if name in _SQL_TYPES
+        )
+
+        table = _quote(self.table)
+        columns = ", ".join(
+            f"{_quote(name)} {_SQL_TYPES.get(name, ('TEXT',))[0]}"
+            for name in self._header
+        )
+        placeholders = ", ".join("?" * len(self._header))
+        self._insert = f"INSERT INTO {table} VALUES ({placeholders})"
+
+        # Transactions are controlled explicitly, so replacing the table is
+        # rolled back together with the inserted rows
+        self._connection = sqlite3.connect(self.path, isolation_level=None)
+        self._connection.execute("BEGIN")
+        if not append:
+            self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+
+    def write(self, row):
+        """
+        Add one converted row to the current batch.
+
+        Args:
+            row: List of strings in header order.
+
+        """
+        if self._converters:
+            row = list(row)
+            for i, convert in self._converters:
+                row[i] = convert(row[i])
+
+        self._batch.append(row)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        """Insert the rows of the current batch."""
+        if self._batch:
+            self._connection.executemany(self._insert, self._batch)
+            self._batch = []
+
+    def _create_indexes(self):
+        """Create the indexes on the date and IBAN columns."""
+        for name in INDEXED_COLUMNS:
+            if name in self._header:
+                index = _quote(f"{self.table}_{name}")
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index} "
+                    f"ON {_quote(self.table)} ({_quote(name)})"
+                )
+
+    def close(self, error=None):
+        """
+        Commit the transaction, or roll it back if the conversion failed.
+
+        Args:
+            error: Exception that aborted the conversion, or None.
+
+        """
+        if self._connection is None:
+            return
+
+        try:
+            if error is None:
+                self._flush()
+                if self.indexes:
+                    self._create_indexes()
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self._connection.close()
+            self._connection = None
+            self._batch = []
+
+
+def infer_format(path):
+    """
+    Infer the output format from the extension of a path.
+
+    A compression extension is ignored, e.g. 'out.jsonl.gz' is JSON Lines.
+
+    Args:
+        path: Path of the output file.
+
+    Returns:
+        str: One of the keys of SINK_EXTENSIONS; 'csv' for unknown extensions.
+
+    """
+    root = split_compression(path)[0]
+    return _FORMAT_BY_EXTENSION.get(os.path.splitext(root)[1].lower(), "csv")
+
+
+def make_sink(path, output_format=None, **options):
+    """
+    Create the sink for an output file.
+
+    Args:
+        path: Path of the output file, or '-' or a writable file object for
+            the csv and jsonl formats.
+        output_format: 'csv', 'jsonl' or 'sqlite'. If None, the format is
+            inferred from the file extension; standard output and file
+            objects default to CSV.
+        **options: Keyword arguments for SqliteSink, e.g. table and indexes.
+
+    Returns:
+        Sink: The sink writing to the path.
+
+    Raises:
+        ValueError: If the format is unknown, options are given for a
+            format that does not take any, or standard output, a file
+            object or a compressed file is given for the sqlite format.
+
+    """
+    stream = path == STDIO_PATH or hasattr(path, "write")
+    name = output_format or ("csv" if stream else infer_format(path))
+
+    if name == "sqlite":
+        if stream:
+            msg = "The sqlite format needs the path of a database file"
+            raise ValueError(msg)
+        if output_compression(path):
+            msg = "The sqlite format cannot be compressed"
+            raise ValueError(msg)
+        return SqliteSink(path, **options)
+
+    if name not in SINK_EXTENSIONS:
+        msg = f"Unknown output format: {name!r}"
+        raise ValueError(msg)
+
+    if options:
+        msg = f"Options {sorted(options)!r} are not supported by the {name} format"
+        raise ValueError(msg)
+
+    return CsvSink(path) if name == "csv" else JsonLinesSink(path)
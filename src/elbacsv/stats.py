@@ -0,0 +1,185 @@
+"""
+Instrumentation for ELBA CSV conversions.
+
+This module provides the ConversionStats class which collects wall time per
+processing stage, the number of rows, the throughput, the peak memory usage,
+how often each key was found and how many rows each filter dropped while a
+file is converted.
+"""
+
+import json
+import sys
+import time
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+STAGES = ("sniff", "read", "filter", "parse", "merge", "build", "write")
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the current process.
+
+    Returns:
+        int | None: Peak RSS in bytes, or None if it cannot be determined on
+            this platform.
+
+    """
+    if resource is None:
+        return None
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+class ConversionStats:
+    """
+    Statistics collected during a conversion.
+
+    An instance is passed to process_csv_file, which fills it in. When no
+    instance is passed, the conversion runs without any instrumentation.
+
+    Attributes:
+        counted_keys: Tuple of the keys counted in key_counts if only the
+            selected keys are extracted, e.g. with --columns, or None if all
+            keys of the input are counted.
+
+    Note:
+        When rows are parsed in worker processes, the 'parse', 'merge' and
+        'build' times are summed over all workers and may exceed the total
+        time.
+
+    """
+
+    def __init__(self):
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.rows = 0
+        self.key_counts = Counter()
+        self.counted_keys = None
+        self.filtered = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total_seconds = 0.0
+        self.peak_rss = None
+        self._started = None
+
+    def start(self):
+        """Start measuring the total time of the conversion."""
+        self._started = time.perf_counter()
+
+    def stop(self):
+        """Stop measuring the total time and record the peak memory usage."""
+        self.total_seconds = time.perf_counter() - self._started
+        self.peak_rss = peak_rss()
+
+    def add(self, stage, seconds):
+        """
+        Add time spent in a stage.
+
+        Args:
+            stage: Name of the stage, one of STAGES.
+            seconds: Time spent in seconds.
+
+        """
+        self.stage_seconds[stage] += seconds
+
+    def update(self, other):
+        """
+        Add the stage times, rows, key counts and dropped rows of another instance.
+
+        Args:
+            other: ConversionStats collected, for example, in a worker process.
+
+        """
+        for stage, seconds in other.stage_seconds.items():
+            self.stage_seconds[stage] += seconds
+        self.rows += other.rows
+        self.key_counts.update(other.key_counts)
+        if other.counted_keys is not None:
+            self.counted_keys = other.counted_keys
+        self.filtered.update(other.filtered)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    @property
+    def rows_per_sec(self):
+        """Number of rows converted per second of total time."""
+        return self.rows / self.total_seconds if self.total_seconds else 0.0
+
+    def to_dict(self):
+        """
+        Return the statistics as a JSON-serializable dictionary.
+
+        Returns:
+            dict: The collected statistics.
+
+        """
+        return {
+            "rows": self.rows,
+            "total_seconds": self.total_seconds,
+            "rows_per_sec": self.rows_per_sec,
+            "peak_rss_bytes": self.peak_rss,
+            "stage_seconds": dict(self.stage_seconds),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "key_counts": dict(self.key_counts.most_common()),
+            "counted_keys": (
+                None if self.counted_keys is None else list(self.counted_keys)
+            ),
+            "filtered": dict(self.filtered),
+        }
+
+    def to_json(self):
+        """
+        Return the statistics as a JSON string.
+
+        Returns:
+            str: The statistics serialized as JSON.
+
+        """
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def format_text(self):
+        """
+        Return the statistics as a human-readable report.
+
+        Returns:
+            str: Multi-line report.
+
+        """
+        lines = [
+            f"Rows:          {self.rows}",
+            f"Total time:    {self.total_seconds:.3f} s",
+            f"Throughput:    {self.rows_per_sec:,.0f} rows/s",
+            f"Parse cache:   {self.cache_hits} hits, {self.cache_misses} misses",
+        ]
+        if self.peak_rss is not None:
+            lines.append(f"Peak RSS:      {self.peak_rss / 2**20:.1f} MiB")
+
+        lines.append("Stages:")
+        lines.extend(
+            f"  {stage:<12}{seconds:.3f} s"
+            for stage, seconds in self.stage_seconds.items()
+        )
+
+        if self.filtered:
+            lines.append("Filtered:")
+            lines.extend(
+                f"  {name:<36}{count}" for name, count in self.filtered.items()
+            )
+
+        if self.counted_keys is None:
+            lines.append("Keys found:")
+        else:
+            lines.append("Keys found (selected keys only):")
+        lines.extend(
+            f"  {key:<36}{count}" for key, count in self.key_counts.most_common()
+        )
+
+        return "\n".join(lines)
@@ -0,0 +1,77 @@
+"""
+Parsing of the native column values of ELBA CSV exports.
+
+ELBA writes dates as 'DD.MM.YYYY' and amounts with a decimal comma, for
+example '-1.234,56'. The functions in this module also accept ISO dates and
+amounts with a decimal point, so they work with re-exported files as well.
+"""
+
+import datetime as dt
+from decimal import Decimal, InvalidOperation
+
+
+def parse_date(s):
+    """
+    Parse a date in ELBA ('DD.MM.YYYY') or ISO ('YYYY-MM-DD') format.
+
+    Only the first ten characters are used, so timestamps such as
+    '15.01.2024 10:00:00:000' are accepted as well.
+
+    Args:
+        s: String containing the date.
+
+    Returns:
+        dt.date: The parsed date.
+
+    Raises:
+        ValueError: If the string does not start with a valid date.
+
+    """
+    s = s.strip()
+
+    if s[2:3] == "." and s[5:6] == ".":
+        try:
+            return dt.date(int(s[6:10]), int(s[3:5]), int(s[:2]))
+        except ValueError:
+            pass
+    else:
+        try:
+            return dt.date.fromisoformat(s[:10])
+        except ValueError:
+            pass
+
+    msg = f"Invalid date: {s!r}"
+    raise ValueError(msg)
+
+
+def parse_amount(s):
+    """
+    Parse an amount with a decimal comma or a decimal point.
+
+    If the string contains a comma, it is taken as the decimal separator and
+    dots are taken as thousands separators.
+
+    Args:
+        s: String containing the amount, e.g. '-1.234,56' or '-1234.56'.
+
+    Returns:
+        Decimal: The parsed amount.
+
+    Raises:
+        ValueError: If the string is not a valid amount.
+
+    """
+    text = s.strip()
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        amount = None
+
+    if amount is None or not amount.is_finite():
+        msg = f"Invalid amount: {s!r}"
+        raise ValueError(msg)
+
+    return amount
@@ -0,0 +1,161 @@
+import importlib.util
+
+import pytest
+
+from elbacsv.aggregate import Total, aggregate, summary_header, write_summary
+from elbacsv.cli import main
+from elbacsv.columns import load_columns
+from elbacsv.sinks import make_sink
+
+ROWS = [
+    (
+        "15.01.2024;Empfänger: ACME IBAN Empfänger: AT611904300234573201;"
+        "16.01.2024;-1.234,56;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "20.01.2024;Auftraggeber: Employer Verwendungszweck: Gehalt;"
+        "20.01.2024;2500,00;EUR;20.01.2024 08:00:00:000"
+    ),
+    (
+        "03.02.2024;Empfänger: ACME IBAN Empfänger: AT611904300234573201;"
+        "03.02.2024;-10,00;EUR;03.02.2024 10:00:00:000"
+    ),
+    (
+        "04.02.2024;Empfänger: ACME IBAN Empfänger: AT611904300234573201;"
+        "04.02.2024;-20,00;USD;04.02.2024 10:00:00:000"
+    ),
+    ";Empfänger: Shop;;-1,00;EUR;",
+]
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+@pytest.fixture(
+    params=[
+        False,
+        pytest.param(
+            True, marks=pytest.mark.skipif(not HAS_NUMPY, reason="needs NumPy")
+        ),
+    ],
+    ids=["array", "numpy"],
+)
+def use_numpy(request):
+    """
+    Run a test with and without NumPy.
+
+    Returns:
+        bool: The use_numpy argument of load_columns.
+
+    """
+    return request.param
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write the rows to an export.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    path = tmp_path / "export.csv"
+    path.write_text("\n".join(ROWS) + "\n", encoding="utf-8")
+    return str(path)
+
+
+class TestAggregate:
+    """Test suite for computing totals of typed columns."""
+
+    def test_month(self, export, use_numpy):
+        """Test that totals per month are split by currency."""
+        totals = aggregate(load_columns(export, use_numpy=use_numpy), "month")
+
+        assert totals == [
+            Total(("",), "EUR", 1, -100, -100, 0),
+            Total(("2024-01",), "EUR", 2, 126544, -123456, 250000),
+            Total(("2024-02",), "EUR", 1, -1000, -1000, 0),
+            Total(("2024-02",), "USD", 1, -2000, -2000, 0),
+        ]
+
+    def test_counterparty(self, export, use_numpy):
+        """Test that totals per counterparty use the name and the IBAN."""
+        totals = aggregate(load_columns(export, use_numpy=use_numpy), "counterparty")
+
+        assert [(t.group, t.currency, t.count, t.total) for t in totals] == [
+            (("ACME", "AT611904300234573201"), "EUR", 2, -124456),
+            (("ACME", "AT611904300234573201"), "USD", 1, -2000),
+            (("Employer", ""), "EUR", 1, 250000),
+            (("Shop", ""), "EUR", 1, -100),
+        ]
+
+    def test_currency(self, export, use_numpy):
+        """Test that totals per currency are computed."""
+        totals = aggregate(load_columns(export, use_numpy=use_numpy), "currency")
+
+        assert totals == [
+            Total((), "EUR", 4, 125444, -124556, 250000),
+            Total((), "USD", 1, -2000, -2000, 0),
+        ]
+
+    def test_missing_amounts_are_counted(self, tmp_path, use_numpy):
+        """Test that rows without an amount are counted but not summed."""
+        path = tmp_path / "export.csv"
+        path.write_text(";Empfänger: Shop;;;EUR;\n", encoding="utf-8")
+
+        totals = aggregate(load_columns(str(path), use_numpy=use_numpy), "currency")
+
+        assert totals == [Total((), "EUR", 1, 0, 0, 0)]
+
+    def test_unknown_aggregation(self, export):
+        """Test that an unknown grouping raises a ValueError."""
+        columns = load_columns(export, use_numpy=False)
+
+        with pytest.raises(ValueError, match="Unknown aggregation"):
+            aggregate(columns, "year")
+
+
+class TestWriteSummary:
+    """Test suite for writing totals."""
+
+    def test_csv(self, export, tmp_path):
+        """Test that totals are written in the dialect of the input file."""
+        output = tmp_path / "summary.csv"
+
+        write_summary(export, make_sink(str(output)), "month", use_numpy=False)
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert lines[0] == ";".join(summary_header("month"))
+        assert lines[2] == "2024-01;EUR;2;1265,44;-1234,56;2500,00"
+
+    def test_command_line(self, export, tmp_path, monkeypatch):
+        """Test that --aggregate writes the totals."""
+        output = tmp_path / "summary.jsonl"
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "elbacsv",
+                "--aggregate",
+                "currency",
+                "--since",
+                "2024-02-01",
+                export,
+                str(output),
+            ],
+        )
+        main()
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert '"Summe": "-10,00"' in lines[0]
+
+    @pytest.mark.parametrize("option", ["--merge", "--incremental", "--cache"])
+    def test_incompatible_options(self, option, monkeypatch):
+        """Test that options changing the conversion are rejected."""
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "--aggregate", "month", option, "in.csv", "out"]
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
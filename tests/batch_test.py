@@ -0,0 +1,181 @@
+import csv
+
+import pytest
+
+from elbacsv import convert_many
+from elbacsv.batch import expand_inputs, output_path
+from elbacsv.cli import main
+
+EXPORT = (
+    "2024-01-15,Verwendungszweck: Rent,2024-01-15,-500.00,EUR,2024-01-15 10:00:00\n"
+)
+
+
+def read_rows(path):
+    """
+    Read all rows of a CSV file.
+
+    Returns:
+        list[list[str]]: The rows of the file.
+
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+class TestExpandInputs:
+    """Test suite for the expand_inputs function."""
+
+    def test_directory(self, tmp_path):
+        """Test that a directory expands to its CSV files, sorted."""
+        for name in ("b.csv", "a.csv", "notes.txt", "a_converted.csv"):
+            (tmp_path / name).write_text(EXPORT, encoding="utf-8")
+
+        assert expand_inputs([str(tmp_path)]) == [
+            str(tmp_path / "a.csv"),
+            str(tmp_path / "b.csv"),
+        ]
+
+    def test_glob_pattern(self, tmp_path):
+        """Test that glob patterns are expanded and outputs are skipped."""
+        for name in ("2024-02.csv", "2024-01.csv", "2024-01_converted.csv"):
+            (tmp_path / name).write_text(EXPORT, encoding="utf-8")
+
+        assert expand_inputs([str(tmp_path / "2024-*.csv")]) == [
+            str(tmp_path / "2024-01.csv"),
+            str(tmp_path / "2024-02.csv"),
+        ]
+
+    def test_compressed_files(self, tmp_path):
+        """Test that directories include compressed CSV files."""
+        for name in ("b.csv.gz", "a.csv", "c.csv.xz", "a_converted.csv.gz", "d.gz"):
+            (tmp_path / name).write_bytes(b"")
+
+        assert expand_inputs([str(tmp_path)]) == [
+            str(tmp_path / "a.csv"),
+            str(tmp_path / "b.csv.gz"),
+            str(tmp_path / "c.csv.xz"),
+        ]
+
+    def test_files_are_kept_once(self, tmp_path):
+        """Test that explicit files are kept in order and only once."""
+        a = str(tmp_path / "a.csv")
+        b = str(tmp_path / "b.csv")
+
+        assert expand_inputs([b, a, b]) == [b, a]
+
+
+class TestOutputPath:
+    """Test suite for the output_path function."""
+
+    def test_next_to_input(self):
+        """Test that the output file is written next to the input file."""
+        assert output_path("data/export.csv") == "data/export_converted.csv"
+
+    def test_output_dir(self):
+        """Test that the output file is written to the output directory."""
+        assert output_path("data/export.csv", "out") == "out/export_converted.csv"
+
+    def test_compression_is_kept(self):
+        """Test that compressed inputs give compressed outputs, except SQLite."""
+        assert output_path("export.csv.gz") == "export_converted.csv.gz"
+        assert (
+            output_path("export.csv.xz", None, ".jsonl") == "export_converted.jsonl.xz"
+        )
+        assert (
+            output_path("export.csv.gz", None, ".sqlite") == "export_converted.sqlite"
+        )
+
+
+class TestConvertMany:
+    """Test suite for the convert_many function."""
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_failure_does_not_stop_batch(self, tmp_path, jobs):
+        """Test that one failing file does not affect the other files."""
+        good = tmp_path / "good.csv"
+        good.write_text(EXPORT, encoding="utf-8")
+        missing = tmp_path / "missing.csv"
+        output_dir = tmp_path / "out"
+
+        results = convert_many(
+            [str(good), str(missing)], output_dir=str(output_dir), jobs=jobs
+        )
+
+        assert [result.ok for result in results] == [True, False]
+        assert isinstance(results[1].error, FileNotFoundError)
+        rows = read_rows(output_dir / "good_converted.csv")
+        assert rows[1][0] == "2024-01-15"
+
+    def test_incremental(self, tmp_path):
+        """Test that every output file keeps its own fingerprint index."""
+        export = tmp_path / "export.csv"
+        export.write_text(EXPORT, encoding="utf-8")
+
+        convert_many([str(export)], incremental=True)
+        convert_many([str(export)], incremental=True)
+
+        assert len(read_rows(tmp_path / "export_converted.csv")) == 2
+        assert (tmp_path / "export_converted.csv.fingerprints").exists()
+
+
+class TestBatchCommandLine:
+    """Test suite for the --batch command-line option."""
+
+    def test_batch(self, tmp_path, monkeypatch, capsys):
+        """Test converting a directory into an output directory."""
+        for name in ("a.csv", "b.csv"):
+            (tmp_path / name).write_text(EXPORT, encoding="utf-8")
+        output_dir = tmp_path / "out"
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv.py", "--batch", str(tmp_path), "--output-dir", str(output_dir)],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 0
+        assert sorted(p.name for p in output_dir.iterdir()) == [
+            "a_converted.csv",
+            "b_converted.csv",
+        ]
+        assert "2 converted, 0 failed" in capsys.readouterr().err
+
+    def test_batch_with_failure(self, tmp_path, monkeypatch, capsys):
+        """Test that the exit status is 1 if a file could not be converted."""
+        good = tmp_path / "good.csv"
+        good.write_text(EXPORT, encoding="utf-8")
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv.py", "--batch", str(good), str(tmp_path / "missing.csv")],
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert "OK:" in captured.out
+        assert "Error: File not found" in captured.err
+        assert "1 converted, 1 failed" in captured.err
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["input.csv", "output.csv", "--batch", "a.csv"],
+            ["--batch", "a.csv", "--stats"],
+            ["input.csv", "output.csv", "--output-dir", "out"],
+            ["input.csv"],
+        ],
+    )
+    def test_invalid_arguments(self, monkeypatch, argv):
+        """Test that invalid combinations of arguments are rejected."""
+        monkeypatch.setattr("sys.argv", ["elbacsv.py", *argv])
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
@@ -0,0 +1,241 @@
+import os
+
+import pytest
+
+from elbacsv import ResultCache, RowFilter, process_csv_file
+from elbacsv import core as core_module
+from elbacsv.cache import ENTRY_SUFFIX, default_cache_dir
+from elbacsv.cli import main
+from elbacsv.filters import contains, currency, max_amount, since
+
+EXPORT = (
+    "2024-01-15,Empfänger: ACME IBAN Empfänger: AT01 Verwendungszweck: Invoice,"
+    "2024-01-16,-50.25,EUR,2024-01-15 10:00:00\n"
+    "2024-01-20,Auftraggeber: Employer Verwendungszweck: Salary,"
+    "2024-01-20,2500.00,EUR,2024-01-20 08:00:00\n"
+)
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write a small ELBA export.
+
+    Returns:
+        pathlib.Path: Path of the export.
+
+    """
+    path = tmp_path / "export.csv"
+    path.write_text(EXPORT, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """
+    Create an empty result cache.
+
+    Returns:
+        ResultCache: Cache in a temporary directory.
+
+    """
+    return ResultCache(str(tmp_path / "cache"))
+
+
+def no_conversion(*_args, **_kwargs):
+    """
+    Fail if a conversion is started.
+
+    Raises:
+        AssertionError: Always.
+
+    """
+    raise AssertionError("the export was converted")
+
+
+class TestResultCache:
+    """Test suite for the ResultCache class."""
+
+    def test_key(self, cache, export, tmp_path):
+        """Test that keys depend on the content and the options only."""
+        copy = tmp_path / "copy.csv"
+        copy.write_bytes(export.read_bytes())
+        key = cache.key(str(export), merge=False)
+
+        assert cache.key(str(copy), merge=False) == key
+        assert cache.key(str(export), merge=True) != key
+
+        export.write_text(EXPORT + EXPORT, encoding="utf-8")
+        assert cache.key(str(export), merge=False) != key
+
+    def test_fetch_and_store(self, cache, export, tmp_path):
+        """Test that stored results are copied to the output file."""
+        output = tmp_path / "output.csv"
+
+        assert not cache.fetch("key", str(output))
+        cache.store("key", str(export))
+        assert cache.fetch("key", str(output))
+        assert output.read_bytes() == export.read_bytes()
+
+    def test_lru_eviction(self, cache, export):
+        """Test that the least recently used results are evicted first."""
+        size = export.stat().st_size
+        cache.max_bytes = 2 * size
+
+        for i, key in enumerate(("a", "b")):
+            cache.store(key, str(export))
+            entry = os.path.join(cache.directory, key + ENTRY_SUFFIX)
+            os.utime(entry, (1000 + i, 1000 + i))
+
+        # Using 'a' makes 'b' the least recently used result
+        assert cache.fetch("a", os.devnull)
+        cache.store("c", str(export))
+
+        assert sorted(os.listdir(cache.directory)) == [
+            "a" + ENTRY_SUFFIX,
+            "c" + ENTRY_SUFFIX,
+        ]
+        assert cache.size() == 2 * size
+
+    def test_clear(self, cache, export):
+        """Test that clear removes all results."""
+        cache.store("a", str(export))
+        cache.store("b", str(export))
+
+        assert cache.clear() == 2
+        assert cache.size() == 0
+        assert cache.clear() == 0
+
+    def test_clear_removes_temporary_files(self, cache, export, tmp_path):
+        """Test that clear removes files left behind by interrupted stores."""
+        cache.store("a", str(export))
+        (tmp_path / "cache" / "tmpabc.tmp").write_bytes(b"partial result")
+
+        assert cache.clear() == 1
+        assert os.listdir(cache.directory) == []
+
+    def test_default_directory(self, monkeypatch, tmp_path):
+        """Test that the cache directory follows the environment."""
+        monkeypatch.delenv("ELBACSV_CACHE_DIR", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        assert default_cache_dir() == str(tmp_path / "elbacsv")
+
+        monkeypatch.setenv("ELBACSV_CACHE_DIR", "/var/cache/elbacsv")
+        assert default_cache_dir() == "/var/cache/elbacsv"
+
+
+class TestCachedConversion:
+    """Test suite for process_csv_file with a result cache."""
+
+    def test_hit_skips_conversion(self, cache, export, tmp_path, monkeypatch):
+        """Test that a repeated conversion copies the cached output."""
+        first = tmp_path / "first.csv"
+        second = tmp_path / "second.csv"
+        process_csv_file(str(export), str(first), False, result_cache=cache)
+
+        monkeypatch.setattr(core_module, "_convert", no_conversion)
+        process_csv_file(str(export), str(second), False, result_cache=cache)
+
+        assert second.read_bytes() == first.read_bytes()
+
+    def test_options_are_part_of_the_key(self, cache, export, tmp_path):
+        """Test that other options and formats give separate results."""
+        runs = [
+            ("a.csv", {"merge": False}),
+            ("b.csv", {"merge": True}),
+            ("c.csv", {"merge": False, "columns": ["Betrag"]}),
+            ("d.csv", {"merge": False, "filters": [currency("USD")]}),
+            ("e.jsonl", {"merge": False}),
+            ("f.csv.gz", {"merge": False}),
+        ]
+        for name, options in runs:
+            process_csv_file(
+                str(export), str(tmp_path / name), result_cache=cache, **options
+            )
+
+        assert len(os.listdir(cache.directory)) == len(runs)
+
+    def test_filter_arguments_are_part_of_the_key(self, cache, export, tmp_path):
+        """Test that filters with different arguments give separate results."""
+        runs = [
+            max_amount("-100"),
+            max_amount("-10,5"),
+            since("2024-01-16"),
+            since("2024-01-17"),
+            contains("Empfänger", "acme"),
+            contains("Empfänger", "acm"),
+        ]
+        for i, row_filter in enumerate(runs):
+            process_csv_file(
+                str(export),
+                str(tmp_path / f"{i}.csv"),
+                False,
+                filters=[row_filter],
+                result_cache=cache,
+            )
+
+        assert len(os.listdir(cache.directory)) == len(runs)
+
+    def test_same_filter_arguments_share_the_key(self):
+        """Test that equal normalized arguments give the same signature."""
+        assert max_amount("-100,00").signature == max_amount(-100).signature
+        assert currency("eur", "USD").signature == currency("usd", "EUR").signature
+        assert RowFilter("custom", lambda _row: True).signature is None
+
+    def test_not_cached(self, cache, export, tmp_path):
+        """Test that incremental conversions and SQLite output are not cached."""
+        process_csv_file(
+            str(export),
+            str(tmp_path / "output.csv"),
+            False,
+            index_file=str(tmp_path / "index"),
+            result_cache=cache,
+        )
+        process_csv_file(
+            str(export), str(tmp_path / "output.db"), False, result_cache=cache
+        )
+        process_csv_file(
+            str(export),
+            str(tmp_path / "output.csv"),
+            False,
+            filters=[RowFilter("custom", lambda _row: True)],
+            result_cache=cache,
+        )
+
+        assert cache.size() == 0
+
+
+class TestCacheCommandLine:
+    """Test suite for the result cache options."""
+
+    def test_cache_and_clear(self, export, tmp_path, monkeypatch, capsys):
+        """Test converting with --cache-dir and clearing the cache."""
+        cache_dir = str(tmp_path / "cache")
+        output = str(tmp_path / "output.csv")
+
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "--cache-dir", cache_dir, str(export), output]
+        )
+        main()
+        assert len(os.listdir(cache_dir)) == 1
+
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "--cache-dir", cache_dir, "--clear-cache"]
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 0
+        assert "Removed 1 results" in capsys.readouterr().err
+        assert os.listdir(cache_dir) == []
+
+    def test_clear_cache_with_files(self, monkeypatch):
+        """Test that --clear-cache does not convert files."""
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "--clear-cache", "input.csv", "output.csv"]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
@@ -0,0 +1,317 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from elbacsv import CheckpointFile, RowFilter, process_csv_file, read_records
+from elbacsv.checkpoint import InputPosition, RejectFile, truncate_file
+from elbacsv.cli import main
+from elbacsv.formats import LEGACY_FALLBACK
+
+ROW = "{day:02d}.01.2024;Empfänger: Shop {n};{day:02d}.01.2024;-{n},00;EUR;{day:02d}.01.2024 10:00:00:000"
+
+ROWS = [ROW.format(day=n % 28 + 1, n=n) for n in range(1, 41)]
+
+
+def write_export(path, rows):
+    """
+    Write rows to an export with a byte order mark, compressed for .gz.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    data = ("﻿" + "\n".join(rows) + "\n").encode("utf-8")
+    if str(path).endswith(".gz"):
+        data = gzip.compress(data)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write an export with a short row and an empty line.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    rows = [*ROWS[:5], "kaputt;nur zwei", *ROWS[5:20], "", *ROWS[20:]]
+    return write_export(tmp_path / "export.csv", rows)
+
+
+def interrupt_at(row_number):
+    """
+    Return a filter that stops the first conversion at a row.
+
+    Returns:
+        RowFilter: Filter raising KeyboardInterrupt once, at the given row.
+
+    """
+    state = {"rows": 0, "raised": False}
+
+    def predicate(_row):
+        state["rows"] += 1
+        if state["rows"] == row_number and not state["raised"]:
+            state["raised"] = True
+            raise KeyboardInterrupt
+        return True
+
+    return RowFilter("interrupt", predicate)
+
+
+class TestRejectFile:
+    """Test suite for setting aside rows that cannot be converted."""
+
+    def test_rows(self, tmp_path):
+        """Test that short rows are rejected with their line number."""
+        path = tmp_path / "rejects.csv"
+        reader = csv.reader(["a;b;c;d;e;f\n", "x;y\n", "1;2;3;4;5;6\n"], delimiter=";")
+
+        with RejectFile(str(path), "excel") as rejects:
+            rows = list(rejects.rows(reader, line=10))
+
+        assert rows == [list("abcdef"), list("123456")]
+        assert rejects.count == 1
+        assert path.read_text(encoding="utf-8").splitlines() == [
+            "Zeile,Fehler",
+            '12,"expected at least 6 fields, found 2",x,y',
+        ]
+
+    def test_csv_error(self, tmp_path):
+        """Test that rows the CSV reader cannot parse are rejected."""
+        path = tmp_path / "rejects.csv"
+        reader = csv.reader(['"a"b;c\n', "a;b;c;d;e;f\n"], delimiter=";", strict=True)
+
+        with RejectFile(str(path), "excel") as rejects:
+            rows = list(rejects.rows(reader))
+
+        assert rows == [list("abcdef")]
+        assert path.read_text(encoding="utf-8").splitlines()[1].startswith("1,")
+
+
+class TestTolerantConversion:
+    """Test suite for converting exports with malformed rows."""
+
+    @pytest.mark.parametrize("use_mmap", [False, True])
+    @pytest.mark.parametrize("columns", [None, ["Betrag", "Empfänger"]])
+    def test_short_row_aborts(self, export, tmp_path, use_mmap, columns):
+        """Test that a short row stops the conversion without a reject file."""
+        with pytest.raises(ValueError, match="Line 6: expected at least 6 fields"):
+            process_csv_file(
+                export,
+                str(tmp_path / "out.csv"),
+                False,
+                columns=columns,
+                use_mmap=use_mmap,
+            )
+
+    def test_short_row_in_records(self):
+        """Test that read_records reports a short row with its line."""
+        data = "\n".join([*ROWS[:2], "kaputt"]).encode("utf-8")
+
+        with pytest.raises(ValueError, match="Line 3: expected at least 6 fields"):
+            list(read_records(data))
+
+    def test_short_row_command_line(self, export, tmp_path, monkeypatch, capsys):
+        """Test that the command-line tool reports the line of a short row."""
+        monkeypatch.setattr("sys.argv", ["elbacsv", export, str(tmp_path / "o.csv")])
+
+        with pytest.raises(SystemExit):
+            main()
+
+        assert "Error: Invalid input - Line 6: expected at least 6 fields, found 2" in (
+            capsys.readouterr().err
+        )
+
+    def test_reject_file(self, export, tmp_path):
+        """Test that bad rows are set aside and the others converted."""
+        output = tmp_path / "out.csv"
+        rejects = tmp_path / "rejects.csv"
+
+        process_csv_file(export, str(output), False, reject_file=str(rejects))
+
+        assert len(output.read_text(encoding="utf-8").splitlines()) == 41
+        assert rejects.read_text(encoding="utf-8").splitlines() == [
+            "Zeile;Fehler",
+            "6;expected at least 6 fields, found 2;kaputt;nur zwei",
+            "22;expected at least 6 fields, found 0",
+        ]
+
+
+class TestCheckpoints:
+    """Test suite for resuming interrupted conversions."""
+
+    @pytest.mark.parametrize(
+        ("input_name", "output_name"),
+        [("in.csv", "out.csv"), ("in.csv.gz", "out.csv"), ("in.csv", "out.jsonl")],
+    )
+    def test_resume(self, input_name, output_name, tmp_path):
+        """Test that a resumed conversion writes the same output."""
+        rows = [*ROWS[:5], "kaputt;nur zwei", *ROWS[5:]]
+        export = write_export(tmp_path / input_name, rows)
+        output = tmp_path / output_name
+        expected = tmp_path / f"expected{output.suffix}"
+        process_csv_file(
+            export, str(expected), False, reject_file=str(tmp_path / "expected.rej")
+        )
+
+        options = {
+            "reject_file": str(tmp_path / "out.rej"),
+            "filters": [interrupt_at(33)],
+        }
+        checkpoint = CheckpointFile(str(tmp_path / "out.ck"), every=10)
+        with pytest.raises(KeyboardInterrupt):
+            process_csv_file(
+                export, str(output), False, checkpoint=checkpoint, **options
+            )
+
+        saved = json.loads((tmp_path / "out.ck").read_text(encoding="utf-8"))
+        assert saved["checkpoint"]["rows"] == 30
+        assert saved["checkpoint"]["line"] == 31
+
+        checkpoint = CheckpointFile(str(tmp_path / "out.ck"), every=10, resume=True)
+        process_csv_file(export, str(output), False, checkpoint=checkpoint, **options)
+
+        assert output.read_bytes() == expected.read_bytes()
+        assert (tmp_path / "out.rej").read_bytes() == (
+            tmp_path / "expected.rej"
+        ).read_bytes()
+        assert not (tmp_path / "out.ck").exists()
+
+    def test_other_options(self, export, tmp_path):
+        """Test that a checkpoint is not used for other options."""
+        output = str(tmp_path / "out.csv")
+        checkpoint = CheckpointFile(str(tmp_path / "out.ck"), every=10)
+        with pytest.raises(KeyboardInterrupt):
+            process_csv_file(
+                export,
+                output,
+                False,
+                reject_file=str(tmp_path / "out.rej"),
+                filters=[interrupt_at(15)],
+                checkpoint=checkpoint,
+            )
+
+        resumed = CheckpointFile(str(tmp_path / "out.ck"), every=10, resume=True)
+        with pytest.raises(ValueError, match="another input file or other options"):
+            process_csv_file(
+                export,
+                output,
+                True,
+                reject_file=str(tmp_path / "out.rej"),
+                filters=[interrupt_at(0)],
+                checkpoint=resumed,
+            )
+
+    def test_new_conversion_removes_checkpoint(self, tmp_path):
+        """Test that starting without resume removes an old checkpoint."""
+        path = tmp_path / "out.ck"
+        path.write_text("{}", encoding="utf-8")
+
+        assert CheckpointFile(str(path)).begin({}) is None
+        assert not path.exists()
+
+    def test_resume_without_checkpoint(self, tmp_path):
+        """Test that resuming without a checkpoint starts at the beginning."""
+        assert CheckpointFile(str(tmp_path / "out.ck"), resume=True).begin({}) is None
+
+    def test_compressed_output(self, export, tmp_path):
+        """Test that checkpoints cannot be used with compressed output."""
+        checkpoint = CheckpointFile(str(tmp_path / "out.ck"))
+
+        with pytest.raises(ValueError, match="uncompressed CSV or JSON Lines"):
+            process_csv_file(
+                export, str(tmp_path / "out.csv.gz"), False, checkpoint=checkpoint
+            )
+
+    def test_truncate_shorter_file(self, tmp_path):
+        """Test that an output shorter than at the checkpoint is an error."""
+        path = tmp_path / "out.csv"
+        path.write_text("abc", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="changed after the checkpoint"):
+            truncate_file(str(path), 10)
+
+    def test_invalid_interval(self, tmp_path):
+        """Test that the checkpoint interval must be positive."""
+        with pytest.raises(ValueError, match="Invalid checkpoint interval"):
+            CheckpointFile(str(tmp_path / "out.ck"), every=0)
+
+
+class TestInputPosition:
+    """Test suite for counting the bytes of the input."""
+
+    def test_byte_order_mark(self):
+        """Test that the byte order mark is only counted at the start."""
+        position = InputPosition("utf-8-sig")
+        assert list(position.lines(io.BytesIO("\ufeffä\n".encode()))) == ["ä\n"]
+        assert (position.line, position.offset) == (1, 6)
+
+        resumed = InputPosition("utf-8-sig", line=1, offset=6)
+        list(resumed.lines(io.BytesIO("ä\n".encode())))
+        assert (resumed.line, resumed.offset, resumed.encoding) == (2, 9, "utf-8")
+
+    def test_legacy_fallback(self):
+        """Test that bytes decoded with the legacy fallback are counted once."""
+        position = InputPosition("utf-8", LEGACY_FALLBACK)
+        data = "ä\r\n".encode() + "ä\r\n".encode("cp1252")
+
+        assert list(position.lines(io.BytesIO(data))) == ["ä\r\n", "ä\r\n"]
+        assert (position.line, position.offset) == (2, len(data))
+
+    def test_utf16(self):
+        """Test that UTF-16 lines are counted by encoding them again."""
+        position = InputPosition("utf-16")
+        data = "ä\nb\n".encode("utf-16")
+
+        assert list(position.lines(io.BytesIO(data))) == ["ä\n", "b\n"]
+        assert (position.line, position.offset) == (2, len(data))
+
+
+class TestCheckpointCommand:
+    """Test suite for the fault tolerance options on the command line."""
+
+    def test_command_line(self, export, tmp_path, monkeypatch):
+        """Test that --checkpoint and --reject-file convert the export."""
+        output = tmp_path / "out.csv"
+        rejects = tmp_path / "rejects.csv"
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "elbacsv",
+                "--checkpoint",
+                "--checkpoint-rows",
+                "10",
+                "--reject-file",
+                str(rejects),
+                export,
+                str(output),
+            ],
+        )
+        main()
+
+        assert len(output.read_text(encoding="utf-8").splitlines()) == 41
+        assert len(rejects.read_text(encoding="utf-8").splitlines()) == 3
+        assert not (tmp_path / "out.csv.checkpoint.json").exists()
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--checkpoint-rows", "10", "in.csv", "out.csv"],
+            ["--resume", "-", "out.csv"],
+            ["--checkpoint", "--incremental", "in.csv", "out.csv"],
+            ["--checkpoint", "--partition", "month", "in.csv", "out.csv"],
+            ["--reject-file", "r.csv", "--batch", "in.csv"],
+        ],
+    )
+    def test_invalid_arguments(self, argv, monkeypatch):
+        """Test that invalid combinations are argument errors."""
+        monkeypatch.setattr("sys.argv", ["elbacsv", *argv])
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
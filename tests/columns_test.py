@@ -0,0 +1,185 @@
+import importlib.util
+
+import pytest
+
+from elbacsv.columns import (
+    MISSING,
+    ColumnSink,
+    amount_cents,
+    date_days,
+    format_amount,
+    load_columns,
+    timestamp_ms,
+)
+
+ROWS = [
+    (
+        "15.01.2024;Empfänger: ACME IBAN Empfänger: AT611904300234573201;"
+        "16.01.2024;-1.234,56;EUR;15.01.2024 10:00:00:250"
+    ),
+    (
+        "20.01.2024;Auftraggeber: Employer Verwendungszweck: Gehalt;"
+        "20.01.2024;2500,00;eur;20.01.2024 08:00:00:000"
+    ),
+    "01.02.2024;Empfänger: ACME;;;USD;",
+]
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+@pytest.fixture(
+    params=[
+        False,
+        pytest.param(
+            True, marks=pytest.mark.skipif(not HAS_NUMPY, reason="needs NumPy")
+        ),
+    ],
+    ids=["array", "numpy"],
+)
+def use_numpy(request):
+    """
+    Run a test with and without NumPy.
+
+    Returns:
+        bool: The use_numpy argument of ColumnSink.
+
+    """
+    return request.param
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write the rows to an export.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    path = tmp_path / "export.csv"
+    path.write_text("\n".join(ROWS) + "\n", encoding="utf-8")
+    return str(path)
+
+
+class TestConverters:
+    """Test suite for converting values to integers."""
+
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("-1.234,56", -123456),
+            ("2500,00", 250000),
+            ("0,5", 50),
+            ("1.5", 150),
+            ("0,005", 0),
+            ("", MISSING),
+            ("abc", MISSING),
+        ],
+    )
+    def test_amount_cents(self, text, expected):
+        """Test that amounts are converted to cents."""
+        assert amount_cents(text) == expected
+
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("01.01.1970", 0),
+            ("02.01.1970", 1),
+            ("1969-12-31", -1),
+            ("", MISSING),
+            ("31.02.2024", MISSING),
+        ],
+    )
+    def test_date_days(self, text, expected):
+        """Test that dates are converted to days since 1970-01-01."""
+        assert date_days(text) == expected
+
+    def test_timestamp_ms(self):
+        """Test that ELBA timestamps are converted to milliseconds."""
+        assert timestamp_ms("01.01.1970 00:00:01:250") == 1250
+        assert timestamp_ms("02.01.1970") == 86_400_000
+        assert timestamp_ms("01.01.1970 xx:00") == MISSING
+
+    def test_format_amount(self):
+        """Test that cents are formatted with a decimal comma."""
+        assert format_amount(-123456) == "-1234,56"
+        assert format_amount(5) == "0,05"
+        assert format_amount(-5) == "-0,05"
+
+
+class TestLoadColumns:
+    """Test suite for converting exports into typed columns."""
+
+    def test_columns(self, export, use_numpy):
+        """Test that every row is stored in the typed columns."""
+        columns = load_columns(export, use_numpy=use_numpy)
+
+        assert len(columns) == 3
+        assert columns.numpy is use_numpy
+        assert list(columns.integers("betrag")) == [-123456, 250000, MISSING]
+        assert list(columns.integers("valutadatum"))[:2] == [19738, 19742]
+        assert columns.integers("zeitstempel")[0] == 19737 * 86_400_000 + 36_000_250
+        assert columns.invalid == 0
+
+    def test_categoricals(self, export, use_numpy):
+        """Test that currencies and counterparties are stored as codes."""
+        columns = load_columns(export, use_numpy=use_numpy)
+
+        assert columns.waehrung.values() == ["EUR", "EUR", "USD"]
+        assert columns.gegenpartei.values() == [
+            ("ACME", "AT611904300234573201"),
+            ("Employer", ""),
+            ("ACME", ""),
+        ]
+
+    def test_numpy_types(self, export):
+        """Test that dates are datetime64 arrays and missing values NaT."""
+        numpy = pytest.importorskip("numpy")
+
+        columns = load_columns(export, use_numpy=True)
+
+        assert columns.durchfuehrungsdatum.dtype == numpy.dtype("datetime64[D]")
+        assert str(columns.durchfuehrungsdatum[0]) == "2024-01-15"
+        assert numpy.isnat(columns.zeitstempel[2])
+
+    def test_filters(self, export, use_numpy):
+        """Test that filters of process_csv_file are applied."""
+        from elbacsv.filters import currency
+
+        columns = load_columns(export, use_numpy=use_numpy, filters=[currency("USD")])
+
+        assert len(columns) == 1
+
+
+class TestColumnSink:
+    """Test suite for the sink collecting typed columns."""
+
+    def test_missing_columns_and_invalid_values(self, use_numpy):
+        """Test that absent columns are missing and invalid values counted."""
+        sink = ColumnSink(use_numpy=use_numpy)
+        with sink:
+            sink.open(["Betrag", "Durchführungsdatum"])
+            sink.write_rows([["1,00", "x"], ["", ""]])
+
+        columns = sink.columns
+        assert list(columns.integers("betrag")) == [100, MISSING]
+        assert list(columns.integers("valutadatum")) == [MISSING, MISSING]
+        assert columns.invalid == 1
+
+    def test_empty(self, use_numpy):
+        """Test that a sink without rows has empty columns."""
+        sink = ColumnSink(use_numpy=use_numpy)
+        with sink:
+            sink.open(["Betrag"])
+
+        assert len(sink.columns) == 0
+        assert sink.columns.waehrung.labels == ()
+
+    def test_failed_conversion(self):
+        """Test that no columns are built when the conversion failed."""
+        sink = ColumnSink(use_numpy=False)
+        sink.open(["Betrag"])
+        sink.write(["1,00"])
+        sink.close(RuntimeError("failed"))
+
+        assert sink.columns is None
@@ -0,0 +1,144 @@
+import bz2
+import gzip
+import lzma
+import subprocess
+import sys
+
+import pytest
+
+from elbacsv import make_sink, process_csv_file, read_records
+from elbacsv.compression import detect_compression, split_compression
+
+EXPORT = (
+    "2024-01-15,Empfänger: ACME IBAN Empfänger: AT01 Verwendungszweck: Invoice,"
+    "2024-01-16,-50.25,EUR,2024-01-15 10:00:00\n"
+    "2024-01-20,Auftraggeber: Employer Verwendungszweck: Salary,"
+    "2024-01-20,2500.00,EUR,2024-01-20 08:00:00\n"
+)
+
+CODECS = [(".gz", gzip), (".bz2", bz2), (".xz", lzma)]
+
+
+@pytest.fixture
+def expected(tmp_path):
+    """
+    Convert the uncompressed export.
+
+    Returns:
+        bytes: The content of the converted file.
+
+    """
+    input_file = tmp_path / "plain.csv"
+    output_file = tmp_path / "plain_converted.csv"
+    input_file.write_text(EXPORT, encoding="utf-8")
+    process_csv_file(str(input_file), str(output_file), False)
+    return output_file.read_bytes()
+
+
+class TestDetection:
+    """Test suite for the detection of compressed data."""
+
+    @pytest.mark.parametrize(("ext", "module"), CODECS)
+    def test_magic_bytes(self, ext, module):
+        """Test that compressed data is recognized from its first bytes."""
+        name = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}[ext]
+
+        assert detect_compression(module.compress(b"data")) == name
+
+    def test_plain_data(self):
+        """Test that CSV data is not taken for compressed data."""
+        assert detect_compression(EXPORT.encode()) is None
+        assert detect_compression(b"") is None
+
+    def test_split_compression(self):
+        """Test that only compression extensions are split off."""
+        assert split_compression("a/export.csv.GZ") == ("a/export.csv", ".GZ")
+        assert split_compression("export.csv") == ("export.csv", "")
+
+
+class TestCompressedInput:
+    """Test suite for converting compressed exports."""
+
+    @pytest.mark.parametrize("module", [gzip, bz2, lzma])
+    def test_file(self, tmp_path, expected, module):
+        """Test that compressed files are detected whatever their name."""
+        input_file = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_bytes(module.compress(EXPORT.encode()))
+
+        process_csv_file(str(input_file), str(output_file), False)
+
+        assert output_file.read_bytes() == expected
+
+    def test_stdin(self, expected):
+        """Test that compressed standard input is decompressed."""
+        result = subprocess.run(
+            [sys.executable, "-m", "elbacsv.cli", "-", "-"],
+            input=gzip.compress(EXPORT.encode()),
+            capture_output=True,
+            check=True,
+        )
+
+        assert result.stdout == expected
+
+    def test_read_records(self, tmp_path):
+        """Test that compressed bytes and binary files are decompressed."""
+        path = tmp_path / "export.csv.bz2"
+        path.write_bytes(bz2.compress(EXPORT.encode()))
+
+        with path.open("rb") as f:
+            from_file = [record.betrag for record in read_records(f)]
+
+        from_bytes = [record.betrag for record in read_records(path.read_bytes())]
+        assert from_file == from_bytes == ["-50.25", "2500.00"]
+
+
+class TestCompressedOutput:
+    """Test suite for writing compressed output files."""
+
+    @pytest.mark.parametrize(("ext", "module"), CODECS)
+    def test_csv(self, tmp_path, expected, ext, module):
+        """Test that the output is compressed according to its extension."""
+        input_file = tmp_path / "export.csv"
+        output_file = tmp_path / f"output.csv{ext}"
+        input_file.write_text(EXPORT, encoding="utf-8")
+
+        process_csv_file(str(input_file), str(output_file), False)
+
+        assert module.decompress(output_file.read_bytes()) == expected
+
+    def test_format_ignores_compression(self, tmp_path):
+        """Test that the format is inferred from the extension before it."""
+        input_file = tmp_path / "export.csv"
+        output_file = tmp_path / "output.jsonl.gz"
+        input_file.write_text(EXPORT, encoding="utf-8")
+
+        process_csv_file(str(input_file), str(output_file), False)
+
+        lines = gzip.decompress(output_file.read_bytes()).splitlines()
+        assert lines[0].startswith(b'{"Durchf')
+
+    def test_incremental_appends_stream(self, tmp_path):
+        """Test that appending adds a stream that is read as part of the file."""
+        first = EXPORT.splitlines(keepends=True)[0]
+        input_file = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv.gz"
+        index_file = str(tmp_path / "index")
+
+        input_file.write_text(first, encoding="utf-8")
+        process_csv_file(
+            str(input_file), str(output_file), False, index_file=index_file
+        )
+        input_file.write_text(EXPORT, encoding="utf-8")
+        process_csv_file(
+            str(input_file), str(output_file), False, index_file=index_file
+        )
+
+        lines = gzip.decompress(output_file.read_bytes()).decode().splitlines()
+        assert len(lines) == 3
+        assert "Employer" in lines[2]
+
+    def test_sqlite_is_not_compressed(self):
+        """Test that a compressed SQLite database is rejected."""
+        with pytest.raises(ValueError, match="cannot be compressed"):
+            make_sink("output.sqlite.gz")
@@ -0,0 +1,229 @@
+import gzip
+from contextlib import ExitStack
+
+import pytest
+
+from elbacsv import consolidate
+from elbacsv.cli import main
+from elbacsv.consolidate import RunSink, merge_runs, sort_key
+
+HEADER = ["Durchführungsdatum", "Empfänger", "Zeitstempel"]
+
+GIRO = [
+    "15.01.2024;Empfänger: ACME;15.01.2024;-1,00;EUR;15.01.2024 10:00:00:000",
+    "10.01.2024;Empfänger: Shop;10.01.2024;-2,00;EUR;10.01.2024 09:00:00:000",
+    "20.01.2024;Empfänger: Rent;20.01.2024;-3,00;EUR;20.01.2024 08:00:00:000",
+]
+
+SAVINGS = [
+    "12.01.2024;Auftraggeber: Employer;12.01.2024;4,00;EUR;12.01.2024 07:00:00:000",
+    GIRO[0],
+    "15.01.2024;Empfänger: Bakery;15.01.2024;-5,00;EUR;15.01.2024 08:00:00:000",
+]
+
+
+def write_export(path, rows):
+    """
+    Write rows to an export, compressed if the path ends in .gz.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    data = ("\n".join(rows) + "\n").encode("utf-8")
+    if str(path).endswith(".gz"):
+        data = gzip.compress(data)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """
+    Write two overlapping exports.
+
+    Returns:
+        list[str]: The paths of the exports.
+
+    """
+    return [
+        write_export(tmp_path / "giro.csv", GIRO),
+        write_export(tmp_path / "savings.csv.gz", SAVINGS),
+    ]
+
+
+def amounts(path):
+    """
+    Return the amounts of a consolidated CSV file.
+
+    Returns:
+        list[str]: The amounts in row order.
+
+    """
+    lines = path.read_text(encoding="utf-8").splitlines()
+    column = lines[0].split(";").index("Betrag")
+    return [line.split(";")[column] for line in lines[1:]]
+
+
+class TestSortKey:
+    """Test suite for the order of consolidated rows."""
+
+    def test_date_then_timestamp(self):
+        """Test that rows are ordered by date, then by timestamp."""
+        key = sort_key(HEADER)
+        rows = [
+            ["02.01.2024", "A", "02.01.2024 08:00:00:000"],
+            ["01.01.2024", "B", "01.01.2024 09:00:00:000"],
+            ["01.01.2024", "C", "01.01.2024 08:00:00:000"],
+        ]
+
+        assert [row[1] for row in sorted(rows, key=key)] == ["C", "B", "A"]
+
+    def test_missing_date_comes_first(self):
+        """Test that rows without a valid date are written first."""
+        key = sort_key(HEADER)
+
+        assert key(["", "A", ""]) < key(["01.01.1900", "B", ""])
+
+    def test_header_without_dates(self):
+        """Test that rows cannot be ordered without a date column."""
+        with pytest.raises(ValueError, match="Consolidation needs"):
+            sort_key(["Empfänger"])
+
+
+class TestRunSink:
+    """Test suite for collecting rows in sorted runs."""
+
+    def test_spilled_runs_are_merged(self, tmp_path):
+        """Test that rows spilled to several runs are merged in order."""
+        sink = RunSink(str(tmp_path), memory_limit=1)
+        days = [5, 3, 9, 1, 7]
+        sink.open(HEADER)
+        sink.write_rows([[f"{day:02d}.01.2024", str(day), ""] for day in days])
+
+        with ExitStack() as stack:
+            merged = [row[1] for row in merge_runs(sink.runs(stack))]
+
+        assert len(sink.spilled) == len(days)
+        assert merged == ["1", "3", "5", "7", "9"]
+
+    def test_different_columns(self, tmp_path):
+        """Test that all inputs must have the same columns."""
+        sink = RunSink(str(tmp_path))
+        sink.open(HEADER)
+
+        with pytest.raises(ValueError, match="same columns"):
+            sink.open(HEADER[:2])
+
+
+class TestMergeRuns:
+    """Test suite for the k-way merge."""
+
+    def test_dedupe(self):
+        """Test that exact duplicates are only removed with dedupe."""
+        key = sort_key(HEADER)
+        first = [key(["01.01.2024", "A", ""]), key(["02.01.2024", "B", ""])]
+        second = [key(["01.01.2024", "A", ""]), key(["01.01.2024", "C", ""])]
+
+        assert len(list(merge_runs([first, second]))) == 4
+        assert [row[1] for row in merge_runs([first, second], dedupe=True)] == [
+            "A",
+            "C",
+            "B",
+        ]
+
+
+class TestConsolidate:
+    """Test suite for consolidating exports."""
+
+    def test_date_order(self, exports, tmp_path):
+        """Test that the rows of all inputs are written in date order."""
+        output = tmp_path / "ledger.csv"
+
+        result = consolidate(exports, str(output))
+
+        assert amounts(output) == ["-2,00", "4,00", "-5,00", "-1,00", "-1,00", "-3,00"]
+        assert result.rows == 6
+        assert result.duplicates == 0
+        assert result.inputs == exports
+
+    def test_dedupe(self, exports, tmp_path):
+        """Test that a transaction in both exports is written once."""
+        output = tmp_path / "ledger.csv"
+
+        result = consolidate(exports, str(output), dedupe=True)
+
+        assert amounts(output) == ["-2,00", "4,00", "-5,00", "-1,00", "-3,00"]
+        assert result.duplicates == 1
+
+    def test_bounded_memory(self, exports, tmp_path):
+        """Test that spilled runs give the same output as a single run."""
+        spilled = tmp_path / "spilled.csv"
+        in_memory = tmp_path / "in_memory.csv"
+
+        result = consolidate(exports, str(spilled), memory_limit=1, temp_dir=tmp_path)
+        consolidate(exports, str(in_memory))
+
+        assert result.runs == 6
+        assert spilled.read_bytes() == in_memory.read_bytes()
+        assert not list(tmp_path.glob("elbacsv-*"))
+
+    def test_options_apply_to_all_inputs(self, exports, tmp_path):
+        """Test that the columns and filters apply to every input."""
+        from elbacsv.filters import max_amount
+
+        output = tmp_path / "ledger.csv"
+
+        consolidate(
+            exports,
+            str(output),
+            columns=["Durchführungsdatum", "Betrag"],
+            filters=[max_amount("-2")],
+        )
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert lines == [
+            "Durchführungsdatum;Betrag",
+            "10.01.2024;-2,00",
+            "15.01.2024;-5,00",
+            "20.01.2024;-3,00",
+        ]
+
+    def test_no_inputs(self, tmp_path):
+        """Test that an empty list of inputs raises a ValueError."""
+        with pytest.raises(ValueError, match="No input files"):
+            consolidate([str(tmp_path / "*.csv")], str(tmp_path / "out.csv"))
+
+
+class TestConsolidateCommand:
+    """Test suite for --consolidate on the command line."""
+
+    def test_command_line(self, exports, tmp_path, monkeypatch, capsys):
+        """Test that --consolidate writes one ordered output."""
+        output = tmp_path / "ledger.csv"
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv", "--consolidate", *exports, "--output", str(output), "--dedupe"],
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 0
+        assert len(amounts(output)) == 5
+        assert "1 duplicates removed" in capsys.readouterr().err
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--consolidate", "a.csv"],
+            ["--consolidate", "a.csv", "--output", "x", "--batch", "b.csv"],
+            ["in.csv", "out.csv", "--dedupe"],
+        ],
+    )
+    def test_invalid_arguments(self, argv, monkeypatch):
+        """Test that invalid combinations are argument errors."""
+        monkeypatch.setattr("sys.argv", ["elbacsv", *argv])
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
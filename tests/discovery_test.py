@@ -0,0 +1,176 @@
+import gzip
+
+import pytest
+
+from elbacsv.cli import main
+from elbacsv.discovery import (
+    discover_keys,
+    format_report,
+    save_report,
+    scan_texts,
+)
+from elbacsv.registry import load_keys, reset_keys
+
+ROWS = [
+    (
+        "15.01.2024;Empfänger: ACME Kundennummer: 4711 Verwendungszweck: Termin 12:30;"
+        "16.01.2024;-1,00;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "16.01.2024;Auftraggeber: X Ref. Nummer: 9 Kundennummer: 4712;"
+        "16.01.2024;1,00;EUR;16.01.2024 10:00:00:000"
+    ),
+    (
+        "17.01.2024;Empfänger: Shop Verwendungszweck: Einkauf;"
+        "17.01.2024;-5,00;EUR;17.01.2024 10:00:00:000"
+    ),
+]
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Remove the keys registered by --keys."""
+    yield
+    reset_keys()
+
+
+@pytest.fixture
+def exports(tmp_path):
+    """
+    Write the rows to a plain and a compressed export.
+
+    Returns:
+        list[str]: The paths of the exports.
+
+    """
+    text = "\n".join(ROWS) + "\n"
+    plain = tmp_path / "a.csv"
+    plain.write_text(text, encoding="utf-8")
+    compressed = tmp_path / "b.csv.gz"
+    compressed.write_bytes(gzip.compress(text.encode("utf-8")))
+    return [str(plain), str(compressed)]
+
+
+class TestScanTexts:
+    """Test suite for finding candidates in structured texts."""
+
+    def test_unknown_key(self):
+        """Test that an unknown key in a value is found with its context."""
+        counts, examples = scan_texts(["Empfänger: ACME Kundennummer: 4711"])
+
+        assert counts == {"ACME Kundennummer": 1}
+        assert examples["ACME Kundennummer"] == ["ACME Kundennummer: 4711"]
+
+    def test_known_keys_and_times_are_ignored(self):
+        """Test that known keys and colons inside words are not candidates."""
+        counts, _ = scan_texts([
+            "Empfänger: ACME Verwendungszweck: Termin 12:30 https://x.at"
+        ])
+
+        assert not counts
+
+    def test_multi_word_key(self):
+        """Test that keys of several words are found."""
+        counts, _ = scan_texts(["Verwendungszweck: Ref. Nummer: 9"])
+
+        assert counts == {"Ref. Nummer": 1}
+
+    def test_examples_are_limited(self):
+        """Test that only distinct examples up to the limit are kept."""
+        texts = [f"Empfänger: ACME Info: {i}" for i in range(5)]
+        texts.append("Empfänger: ACME Info: 0")
+
+        counts, examples = scan_texts(texts, max_examples=2)
+
+        assert counts["ACME Info"] == 6
+        assert examples["ACME Info"] == ["ACME Info: 0", "ACME Info: 1"]
+
+
+class TestDiscoverKeys:
+    """Test suite for scanning exports."""
+
+    def test_candidates_are_folded_and_sorted(self, exports):
+        """Test that prefixed candidates are counted as the shorter key."""
+        candidates = discover_keys(exports)
+
+        assert [(c.key, c.count) for c in candidates] == [
+            ("Kundennummer", 4),
+            ("X Ref. Nummer", 2),
+        ]
+
+    def test_parallel_scan(self, exports):
+        """Test that scanning in worker processes gives the same result."""
+        assert discover_keys(exports, jobs=2) == discover_keys(exports)
+
+    def test_min_count(self, exports):
+        """Test that rare candidates can be left out."""
+        candidates = discover_keys(exports, min_count=3)
+
+        assert [c.key for c in candidates] == ["Kundennummer"]
+
+    def test_report(self, exports, tmp_path):
+        """Test that a saved report can be loaded as a registry."""
+        candidates = discover_keys(exports)
+        path = tmp_path / "report.json"
+        save_report(candidates, path)
+
+        assert load_keys(path) == ("Kundennummer", "X Ref. Nummer")
+        assert "Kundennummer" in format_report(candidates)
+        assert format_report([]) == "No unknown keys found"
+
+
+class TestDiscoveryCommand:
+    """Test suite for --discover-keys and --keys on the command line."""
+
+    def test_discover_and_convert(self, exports, tmp_path, monkeypatch, capsys):
+        """Test that discovered keys are converted when loaded with --keys."""
+        keys_file = str(tmp_path / "keys.json")
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv", "--discover-keys", *exports, "--save-keys", keys_file],
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 0
+        assert "Kundennummer" in capsys.readouterr().out
+
+        output = tmp_path / "out.csv"
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "elbacsv",
+                "--keys",
+                keys_file,
+                "--has-key",
+                "Kundennummer",
+                exports[0],
+                str(output),
+            ],
+        )
+        main()
+
+        lines = output.read_text(encoding="utf-8").splitlines()
+        assert "Kundennummer" in lines[0].split(";")
+        assert len(lines) == 3
+
+    def test_discover_with_files(self, exports, monkeypatch):
+        """Test that --discover-keys cannot be combined with a conversion."""
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "in.csv", "out.csv", "--discover-keys", exports[0]]
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
+
+    def test_invalid_keys_file(self, tmp_path, monkeypatch):
+        """Test that an unreadable keys file is an argument error."""
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv", "--keys", str(tmp_path / "missing.json"), "in.csv", "out.csv"],
+        )
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
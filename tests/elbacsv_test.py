@@ -1,8 +1,20 @@
 import csv
+import io
+import json
+import subprocess
+import sys
 
 import pytest
 
-from elbacsv import parse_key_value_string, process_csv_file, strip_zwnbsp
+import elbacsv
+from elbacsv import (
+    RecordReader,
+    parse_key_value_string,
+    process_csv_file,
+    read_records,
+    strip_zwnbsp,
+    write_records,
+)
 from elbacsv.cli import main, parse_command_line_args
 from elbacsv.constants import KEYS
 
@@ -314,6 +326,389 @@ class TestProcessCsvFile:
         assert header[-2] == "Währung"
         assert header[-1] == "Zeitstempel"
 
+    def test_process_csv_record_spanning_sample(self, tmp_path):
+        """Test a quoted multi-line record that crosses the sniffing sample."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+
+        rows = [
+            [
+                "2024-01-15",
+                f"Verwendungszweck: Payment {i}",
+                "2024-01-15",
+                "1.00",
+                "EUR",
+                "2024-01-15 10:00:00",
+            ]
+            for i in range(40)
+        ]
+        rows[20][1] = "Verwendungszweck: Line one\nline two " + "x" * 1024
+        with open(input_file, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+
+        process_csv_file(str(input_file), str(output_file), False)
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            output_rows = list(csv.reader(f))
+
+        assert len(output_rows) == 41  # Header + 40 data rows
+        assert output_rows[21][1].startswith("Line one\nline two")
+        assert output_rows[40][1] == "Payment 39"
+
+    def test_process_csv_parallel_matches_serial(self, tmp_path, monkeypatch):
+        """Test that the process pool produces the same output in the same order."""
+        monkeypatch.setattr("elbacsv.core.PARALLEL_MIN_BYTES", 0)
+        monkeypatch.setattr("elbacsv.core.PARALLEL_CHUNK_ROWS", 7)
+
+        input_file = tmp_path / "input.csv"
+        serial_file = tmp_path / "serial.csv"
+        parallel_file = tmp_path / "parallel.csv"
+
+        rows = [
+            [
+                "2024-01-15",
+                f"Zahlungsreferenz: R{i} Verwendungszweck: Payment {i}",
+                "2024-01-15",
+                "1.00",
+                "EUR",
+                "2024-01-15 10:00:00",
+            ]
+            for i in range(100)
+        ]
+        rows[50][1] = "Verwendungszweck: Line one\nline two"
+        with open(input_file, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+
+        process_csv_file(str(input_file), str(serial_file), True)
+        process_csv_file(str(input_file), str(parallel_file), True, jobs=3)
+
+        assert parallel_file.read_bytes() == serial_file.read_bytes()
+
+    def test_process_csv_columns(self, tmp_path):
+        """Test that only the selected columns are written, in the given order."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(
+            "2024-01-15,Empfänger: ACME IBAN Empfänger: AT01 Mandat: M-1,"
+            "2024-01-16,-5.00,EUR,2024-01-15 10:00:00\n",
+            encoding="utf-8",
+        )
+
+        process_csv_file(
+            str(input_file),
+            str(output_file),
+            False,
+            columns=["Betrag", "Empfänger", "IBAN Empfänger"],
+        )
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+
+        assert rows == [
+            ["Betrag", "Empfänger", "IBAN Empfänger"],
+            ["-5.00", "ACME", "AT01"],
+        ]
+
+    @pytest.mark.parametrize("jobs", [1, 3])
+    def test_process_csv_columns_with_merge(self, tmp_path, monkeypatch, jobs):
+        """Test that the merged column is complete when it is selected."""
+        monkeypatch.setattr("elbacsv.core.PARALLEL_MIN_BYTES", 0)
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(
+            "2024-01-15,Zahlungsreferenz: R1 Verwendungszweck: Rent,"
+            "2024-01-15,-5.00,EUR,2024-01-15 10:00:00\n",
+            encoding="utf-8",
+        )
+
+        process_csv_file(
+            str(input_file),
+            str(output_file),
+            True,
+            jobs=jobs,
+            columns=["Durchführungsdatum", "Verwendungszweck"],
+        )
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+
+        assert rows[1] == ["2024-01-15", "R1 Rent"]
+
+    @pytest.mark.parametrize(
+        ("columns", "merge"), [(["Unknown"], False), (["Zahlungsreferenz"], True)]
+    )
+    def test_process_csv_unknown_column(self, tmp_path, columns, merge):
+        """Test that columns missing from the output are rejected."""
+        input_file = tmp_path / "input.csv"
+        input_file.write_text("2024-01-15,Mandat: 1,,,,\n", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="Unknown column"):
+            process_csv_file(
+                str(input_file), str(tmp_path / "out.csv"), merge, columns=columns
+            )
+
+
+STREAM_EXPORT = (
+    "2024-01-15,Empfänger: ACME IBAN Empfänger: AT01 Zahlungsreferenz: R1"
+    " Verwendungszweck: Invoice,2024-01-16,-50.25,EUR,2024-01-15 10:00:00\n"
+    "2024-01-20,Auftraggeber: Employer Verwendungszweck: Salary,"
+    "2024-01-20,2500.00,EUR,2024-01-20 08:00:00\n"
+)
+
+
+class TestReadRecords:
+    """Test suite for the read_records function."""
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            STREAM_EXPORT.encode(),
+            io.BytesIO(STREAM_EXPORT.encode()),
+            io.StringIO(STREAM_EXPORT),
+            STREAM_EXPORT.splitlines(),
+            STREAM_EXPORT.splitlines(keepends=True),
+            [line.encode() for line in STREAM_EXPORT.splitlines(keepends=True)],
+        ],
+        ids=["bytes", "binary", "text", "lines", "lines-ends", "byte-lines"],
+    )
+    def test_sources(self, source):
+        """Test that all kinds of sources give the same records."""
+        records = list(read_records(source))
+
+        assert [r.empfaenger for r in records] == ["ACME", ""]
+        assert records[0]["IBAN Empfänger"] == "AT01"
+        assert records[1].betrag == "2500.00"
+        assert records[1].durchfuehrungsdatum == "2024-01-20"
+
+    def test_matches_process_csv_file(self, tmp_path):
+        """Test that records hold the rows written by process_csv_file."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(STREAM_EXPORT, encoding="utf-8")
+        process_csv_file(str(input_file), str(output_file), True)
+
+        with output_file.open(newline="", encoding="utf-8") as f:
+            header, *rows = csv.reader(f)
+
+        reader = read_records(STREAM_EXPORT.encode(), merge=True)
+
+        assert list(reader.header) == header
+        assert [list(record) for record in reader] == rows
+
+    def test_reader_is_lazy(self):
+        """Test that only the sniffing sample is read ahead of the records."""
+        line = STREAM_EXPORT.splitlines(keepends=True)[0]
+        consumed = []
+
+        def lines():
+            for i in range(10000):
+                consumed.append(i)
+                yield line
+
+        reader = RecordReader(lines())
+        assert next(reader).empfaenger == "ACME"
+        assert len(consumed) < 20
+
+    def test_columns_and_filters(self):
+        """Test that columns and filters are applied."""
+        from elbacsv.filters import min_amount
+
+        reader = read_records(
+            io.StringIO(STREAM_EXPORT),
+            columns=["Betrag", "Auftraggeber"],
+            filters=[min_amount(0)],
+        )
+
+        assert reader.header == ("Betrag", "Auftraggeber")
+        assert [r.to_dict() for r in reader] == [
+            {"Betrag": "2500.00", "Auftraggeber": "Employer"}
+        ]
+
+    def test_path_is_rejected(self, tmp_path):
+        """Test that paths are not mistaken for the content of an export."""
+        with pytest.raises(TypeError, match="not a path"):
+            read_records(str(tmp_path / "input.csv"))
+
+
+class TestWriteRecords:
+    """Test suite for the write_records function."""
+
+    def test_csv_to_text_stream(self):
+        """Test writing the records of a reader to a text stream."""
+        output = io.StringIO()
+        write_records(read_records(STREAM_EXPORT.encode()), output)
+
+        header, *rows = csv.reader(io.StringIO(output.getvalue()))
+        assert header[0] == "Durchführungsdatum"
+        assert len(rows) == 2
+        assert not output.closed
+
+    def test_jsonl_to_binary_stream(self):
+        """Test that binary streams receive UTF-8 and are left open."""
+        output = io.BytesIO()
+        write_records(read_records(STREAM_EXPORT.encode()), output, "jsonl")
+
+        lines = output.getvalue().decode("utf-8").splitlines()
+        assert json.loads(lines[0])["Empfänger"] == "ACME"
+        assert not output.closed
+
+    def test_header_from_first_record(self, tmp_path):
+        """Test that plain iterables of records take the header from the records."""
+        output_file = tmp_path / "output.csv"
+        records = list(read_records(STREAM_EXPORT.encode(), columns=["Betrag"]))
+
+        write_records(iter(records), str(output_file))
+
+        assert output_file.read_text(encoding="utf-8").splitlines() == [
+            "Betrag",
+            "-50.25",
+            "2500.00",
+        ]
+
+    def test_nothing_to_write(self, tmp_path):
+        """Test that no file is created for an empty iterable without header."""
+        output_file = tmp_path / "output.csv"
+        write_records([], str(output_file))
+
+        assert not output_file.exists()
+
+
+class TestLazyImports:
+    """Test suite for the lazy loading of the package attributes."""
+
+    @staticmethod
+    def imported_modules(code):
+        """
+        Run code in a new interpreter and return the modules it imported.
+
+        Returns:
+            set[str]: Names of the modules in sys.modules after running the code.
+
+        """
+        result = subprocess.run(
+            [sys.executable, "-c", f"{code}; import sys; print(*sys.modules)"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return set(result.stdout.split())
+
+    def test_import_package_is_lazy(self):
+        """Test that importing the package does not import its submodules."""
+        modules = self.imported_modules("import elbacsv")
+
+        assert "elbacsv.core" not in modules
+        assert "elbacsv.cli" not in modules
+        assert "argparse" not in modules
+        assert "csv" not in modules
+
+    def test_cli_import_is_slim(self):
+        """Test that importing the CLI does not import the processing code."""
+        modules = self.imported_modules("import elbacsv.cli")
+
+        assert "elbacsv.core" not in modules
+        assert "csv" not in modules
+        assert "concurrent.futures" not in modules
+
+    def test_help_does_not_load_registry(self):
+        """Test that --help does not import the key registry."""
+        modules = self.imported_modules(
+            "import sys; sys.argv = ['elbacsv', '--help']\n"
+            "import elbacsv.cli\n"
+            "try:\n    elbacsv.cli.main()\nexcept SystemExit:\n    pass"
+        )
+
+        assert "elbacsv.registry" not in modules
+        assert "elbacsv.parser" not in modules
+
+    def test_attributes_are_loaded_on_access(self):
+        """Test that public attributes are available from the package."""
+        assert elbacsv.process_csv_file is process_csv_file
+        assert "process_csv_file" in dir(elbacsv)
+
+        with pytest.raises(AttributeError):
+            _ = elbacsv.does_not_exist
+
+
+class TestPipeline:
+    """Test suite for reading stdin and writing stdout with '-'."""
+
+    @staticmethod
+    def run_cli(*args, stdin=""):
+        """
+        Run the command-line tool in a new interpreter.
+
+        Returns:
+            subprocess.CompletedProcess: The finished process.
+
+        """
+        return subprocess.run(
+            [sys.executable, "-m", "elbacsv.cli", *args],
+            input=stdin.encode(),
+            capture_output=True,
+            check=False,
+        )
+
+    def test_stdin_to_stdout(self, tmp_path):
+        """Test that a pipeline gives the same output as files."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(STREAM_EXPORT, encoding="utf-8")
+        process_csv_file(str(input_file), str(output_file), True)
+
+        result = self.run_cli("--merge", "-", "-", stdin=STREAM_EXPORT)
+
+        assert result.returncode == 0
+        assert result.stdout == output_file.read_bytes()
+
+    def test_stdout_formats(self, tmp_path):
+        """Test that JSON Lines can be written to stdout, but SQLite cannot."""
+        input_file = tmp_path / "input.csv"
+        input_file.write_text(STREAM_EXPORT, encoding="utf-8")
+
+        result = self.run_cli("--format", "jsonl", str(input_file), "-")
+        lines = result.stdout.decode("utf-8").splitlines()
+        assert json.loads(lines[1])["Auftraggeber"] == "Employer"
+
+        result = self.run_cli("--format", "sqlite", str(input_file), "-")
+        assert result.returncode == 1
+        assert b"path of a database" in result.stderr
+
+    def test_incremental_to_stdout(self, tmp_path):
+        """Test that only new transactions are passed down the pipeline."""
+        index_file = str(tmp_path / "index")
+        first = STREAM_EXPORT.splitlines(keepends=True)[0]
+
+        self.run_cli("--incremental", "--index-file", index_file, "-", "-", stdin=first)
+        result = self.run_cli(
+            "--incremental", "--index-file", index_file, "-", "-", stdin=STREAM_EXPORT
+        )
+
+        rows = list(csv.reader(io.StringIO(result.stdout.decode("utf-8"))))
+        assert [row[11] for row in rows[1:]] == ["Employer"]
+
+    def test_incremental_to_stdout_needs_index(self):
+        """Test that --incremental without a file to derive the index from fails."""
+        result = self.run_cli("--incremental", "-", "-")
+
+        assert result.returncode == 2
+        assert b"requires --index-file" in result.stderr
+
+    def test_closed_pipe(self):
+        """Test that a reader leaving the pipeline early ends the tool quietly."""
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "elbacsv.cli", "-", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        proc.stdout.close()
+        row = STREAM_EXPORT.splitlines(keepends=True)[1]
+        _, stderr = proc.communicate(row.encode() * 10000)
+
+        assert proc.returncode == 1
+        assert not stderr
+
 
 class TestParseCommandLineArgs:
     """Test suite for the parse_command_line_args function."""
@@ -338,6 +733,46 @@ class TestParseCommandLineArgs:
         assert args.output_csv == "output.csv"
         assert args.merge is True
 
+    def test_jobs_argument(self, monkeypatch):
+        """Test parsing with --jobs option."""
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv.py", "input.csv", "output.csv", "--jobs", "4"]
+        )
+
+        args = parse_command_line_args()
+        assert args.jobs == 4
+
+    def test_parse_cache_size_argument(self, monkeypatch):
+        """Test that the parse cache is only used with --parse-cache-size."""
+        monkeypatch.setattr("sys.argv", ["elbacsv.py", "input.csv", "output.csv"])
+        assert parse_command_line_args().parse_cache_size == 0
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv.py", "input.csv", "output.csv", "--parse-cache-size", "4096"],
+        )
+        assert parse_command_line_args().parse_cache_size == 4096
+
+    def test_columns_argument(self, monkeypatch):
+        """Test parsing a comma-separated --columns list."""
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv.py", "in.csv", "out.csv", "--columns", "Betrag, IBAN Empfänger"],
+        )
+
+        args = parse_command_line_args()
+        assert args.columns == ["Betrag", "IBAN Empfänger"]
+
+    @pytest.mark.parametrize("value", ["0", "-1", "many"])
+    def test_invalid_jobs_argument(self, monkeypatch, value):
+        """Test that --jobs rejects values that are not positive integers."""
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv.py", "input.csv", "output.csv", "--jobs", value]
+        )
+
+        with pytest.raises(SystemExit):
+            parse_command_line_args()
+
     def test_missing_arguments(self, monkeypatch):
         """Test that missing required arguments raises SystemExit."""
         monkeypatch.setattr("sys.argv", ["elbacsv.py"])
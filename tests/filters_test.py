@@ -0,0 +1,205 @@
+import csv
+import datetime as dt
+import json
+
+import pytest
+
+from elbacsv import ConversionStats, RowFilter, filters, process_csv_file
+from elbacsv.cli import main
+
+ROWS = [
+    [
+        "01.01.2024",
+        "Empfänger: ACME Verwendungszweck: Invoice",
+        "01.01.2024",
+        "-50,00",
+        "EUR",
+        "01.01.2024 10:00:00:000",
+    ],
+    [
+        "15.01.2024",
+        "Verwendungszweck: BILLA Kartenzahlung mit Kartenfolge-Nr.: 5",
+        "15.01.2024",
+        "-12,30",
+        "EUR",
+        "15.01.2024 18:00:00:000",
+    ],
+    [
+        "01.02.2024",
+        "Auftraggeber: Employer Verwendungszweck: Salary",
+        "01.02.2024",
+        "2.500,00",
+        "EUR",
+        "01.02.2024 08:00:00:000",
+    ],
+    [
+        "10.02.2024",
+        "Empfänger: Shop Verwendungszweck: Order",
+        "10.02.2024",
+        "-99,00",
+        "USD",
+        "10.02.2024 12:00:00:000",
+    ],
+]
+
+
+def convert(tmp_path, row_filters, **options):
+    """
+    Convert ROWS with the given filters.
+
+    Returns:
+        list[list[str]]: The data rows of the output file.
+
+    """
+    input_file = tmp_path / "input.csv"
+    output_file = tmp_path / "output.csv"
+    with open(input_file, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(ROWS)
+
+    process_csv_file(
+        str(input_file), str(output_file), False, filters=row_filters, **options
+    )
+
+    with open(output_file, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+class TestFilters:
+    """Test suite for the filters created by the filters module."""
+
+    def test_date_range(self, tmp_path):
+        """Test --since and --until style filters; both bounds are inclusive."""
+        rows = convert(
+            tmp_path, [filters.since("15.01.2024"), filters.until(dt.date(2024, 2, 1))]
+        )
+
+        assert [row[0] for row in rows] == ["15.01.2024", "01.02.2024"]
+
+    def test_amount_range(self, tmp_path):
+        """Test that amounts with a decimal comma are compared numerically."""
+        rows = convert(tmp_path, [filters.min_amount("-60"), filters.max_amount(0)])
+
+        assert [row[0] for row in rows] == ["01.01.2024", "15.01.2024"]
+
+    def test_currency(self, tmp_path):
+        """Test that currencies are compared case-insensitively."""
+        rows = convert(tmp_path, [filters.currency("usd")])
+
+        assert [row[0] for row in rows] == ["10.02.2024"]
+
+    def test_has_key(self, tmp_path):
+        """Test a filter on a parsed key."""
+        rows = convert(tmp_path, [filters.has_key("Kartenzahlung mit Kartenfolge-Nr.")])
+
+        assert [row[0] for row in rows] == ["15.01.2024"]
+
+    def test_contains_with_projection(self, tmp_path):
+        """Test that filter keys are parsed even if they are not written."""
+        rows = convert(
+            tmp_path,
+            [filters.contains("Empfänger", "acme")],
+            columns=["Durchführungsdatum", "Verwendungszweck"],
+        )
+
+        assert rows == [["01.01.2024", "Invoice"]]
+
+    def test_custom_filter(self, tmp_path):
+        """Test a RowFilter with a custom predicate on the raw row."""
+        weekday = RowFilter("weekdays", lambda row: row[0] != "10.02.2024")
+
+        assert len(convert(tmp_path, [weekday])) == 3
+
+    def test_invalid_row_is_dropped(self):
+        """Test that rows whose value cannot be parsed are not kept."""
+        assert not filters.since("2024-01-01")(["n/a"])
+        assert not filters.min_amount(0)([])
+
+    def test_unknown_key(self):
+        """Test that filters on unknown keys are rejected."""
+        with pytest.raises(ValueError, match="Unknown keys"):
+            filters.has_key("Unknown")
+
+    def test_split_filters(self):
+        """Test that raw and parsed filters are separated."""
+        raw = filters.currency("EUR")
+        parsed = filters.has_key("Mandat")
+
+        assert filters.split_filters([parsed, raw]) == ((raw,), (parsed,))
+        assert filters.split_filters(None) == ((), ())
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_stats_count_dropped_rows(self, tmp_path, monkeypatch, jobs):
+        """Test that the rows dropped by each filter are counted."""
+        monkeypatch.setattr("elbacsv.core.PARALLEL_MIN_BYTES", 0)
+        stats = ConversionStats()
+
+        rows = convert(
+            tmp_path,
+            [filters.currency("EUR"), filters.has_key("Empfänger")],
+            stats=stats,
+            jobs=jobs,
+        )
+
+        assert len(rows) == 1
+        assert stats.rows == 1
+        assert stats.filtered == {"currency EUR": 1, "has Empfänger": 2}
+
+
+class TestFilterCommandLine:
+    """Test suite for the filter command-line options."""
+
+    def test_filter_options(self, tmp_path, monkeypatch, capsys):
+        """Test combined filter options and their statistics."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        with open(input_file, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(ROWS)
+
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "elbacsv.py",
+                str(input_file),
+                str(output_file),
+                "--since",
+                "2024-01-10",
+                "--max-amount",
+                "0",
+                "--currency",
+                "EUR",
+                "--contains",
+                "Verwendungszweck=billa",
+                "--stats",
+                "json",
+            ],
+        )
+        main()
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        assert [row[0] for row in rows[1:]] == ["15.01.2024"]
+
+        report = json.loads(capsys.readouterr().err)
+        assert report["filtered"] == {
+            "since 2024-01-10": 1,
+            "max amount 0": 1,
+            "currency EUR": 1,
+        }
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--since", "tomorrow"],
+            ["--min-amount", "ten"],
+            ["--has-key", "Unknown"],
+            ["--contains", "Verwendungszweck"],
+        ],
+    )
+    def test_invalid_filter_options(self, monkeypatch, argv):
+        """Test that invalid filter values are rejected."""
+        monkeypatch.setattr("sys.argv", ["elbacsv.py", "in.csv", "out.csv", *argv])
+
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
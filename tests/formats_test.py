@@ -0,0 +1,203 @@
+import csv
+import gzip
+import io
+import subprocess
+import sys
+
+import pytest
+
+from elbacsv import CheckpointFile, process_csv_file, read_records
+from elbacsv.compression import ENCODING_SAMPLE_SIZE, open_input
+from elbacsv.formats import (
+    LEGACY_FALLBACK,
+    ElbaDialect,
+    detect_dialect,
+    detect_encoding,
+    match_elba,
+)
+
+ROWS = [
+    [
+        "15.01.2024",
+        "Empfänger: ACME; Wien Verwendungszweck: Rechnung; 1; 2; 3",
+        "16.01.2024",
+        "-1.234,56",
+        "EUR",
+        "15.01.2024 10:00:00:000",
+    ],
+    [
+        "20.01.2024",
+        "Auftraggeber: Employer Verwendungszweck: Gehalt",
+        "20.01.2024",
+        "2500,00",
+        "EUR",
+        "20.01.2024 08:00:00:000",
+    ],
+]
+
+
+def late_umlaut_export():
+    """
+    Write a cp1252 export whose first non-ASCII byte is after the sample.
+
+    Returns:
+        bytes: The export.
+
+    """
+    ascii_row = export_text().splitlines()[1]
+    rows = [ascii_row] * (2 * ENCODING_SAMPLE_SIZE // len(ascii_row))
+    return "\r\n".join([*rows, export_text().splitlines()[0], ""]).encode("cp1252")
+
+
+def export_text(delimiter=";"):
+    """
+    Write ROWS like ELBA does.
+
+    Returns:
+        str: The export.
+
+    """
+    output = io.StringIO(newline="")
+    csv.writer(output, delimiter=delimiter).writerows(ROWS)
+    return output.getvalue()
+
+
+class TestDetectEncoding:
+    """Test suite for the detect_encoding function."""
+
+    @pytest.mark.parametrize(
+        ("head", "encoding"),
+        [
+            (b"\xef\xbb\xbf15.01.2024;", "utf-8-sig"),
+            (b"\xff\xfe1\x005\x00", "utf-16"),
+            ("Empfänger".encode(), "utf-8"),
+            ("Empfänger".encode("cp1252"), "cp1252"),
+            (b"", "utf-8"),
+        ],
+    )
+    def test_encodings(self, head, encoding):
+        """Test byte order marks, UTF-8 and the legacy code page."""
+        assert detect_encoding(head) == encoding
+
+    def test_cut_off_character(self):
+        """Test that a multi-byte character cut off at the end is ignored."""
+        assert detect_encoding("Empfänger".encode()[:7]) == "utf-8"
+
+    def test_sample_only(self, tmp_path, monkeypatch):
+        """Test that the input is not read twice to detect its encoding."""
+        path = tmp_path / "input.csv.gz"
+        path.write_bytes(gzip.compress(late_umlaut_export()))
+
+        def no_seek(*_args):
+            raise AssertionError("the input was read twice")
+
+        monkeypatch.setattr(gzip.GzipFile, "seek", no_seek)
+
+        with open_input(str(path)) as f:
+            assert (f.encoding, f.errors) == ("utf-8", LEGACY_FALLBACK)
+            assert "Empfänger" in f.read()
+
+
+class TestDetectDialect:
+    """Test suite for the dialect detection."""
+
+    def test_semicolons_in_description(self):
+        """Test that semicolons in a quoted description do not mislead detection."""
+        dialect, lines = detect_dialect(io.StringIO(export_text(), newline=""))
+
+        assert dialect is ElbaDialect
+        assert list(csv.reader(lines, dialect)) == ROWS
+
+    def test_other_delimiters(self):
+        """Test that re-exports with other delimiters match the ELBA layout."""
+        for delimiter in ",\t|":
+            dialect = match_elba(export_text(delimiter))
+            assert dialect.delimiter == delimiter
+            assert dialect.doublequote
+
+    def test_byte_order_mark(self):
+        """Test that a byte order mark left in the text is ignored."""
+        assert match_elba("\ufeff" + export_text()) is ElbaDialect
+
+    def test_fallback_to_sniffer(self):
+        """Test that other layouts are sniffed, restricted to the known delimiters."""
+        text = "a;b;c\n1;2;3\nwww;www;www\n"
+
+        assert match_elba(text) is None
+        dialect, lines = detect_dialect(text.splitlines())
+        assert dialect.delimiter == ";"
+        assert len(list(lines)) == 3
+
+    def test_undetermined(self):
+        """Test that an error is raised if no delimiter can be found."""
+        with pytest.raises(csv.Error, match="Could not determine"):
+            detect_dialect(["one column"] * 10)
+
+    def test_lines_are_consumed_lazily(self):
+        """Test that only the sample is read ahead."""
+        line = export_text().splitlines(keepends=True)[1]
+        lines = iter([line] * 1000)
+
+        detect_dialect(lines)
+
+        assert len(list(lines)) > 900
+
+
+class TestConversion:
+    """Test suite for converting ELBA exports in different encodings."""
+
+    @pytest.mark.parametrize(
+        ("prefix", "encoding"),
+        [(b"", "utf-8"), (b"\xef\xbb\xbf", "utf-8"), (b"", "cp1252")],
+        ids=["utf-8", "utf-8-bom", "cp1252"],
+    )
+    def test_encodings(self, tmp_path, prefix, encoding):
+        """Test that semicolon exports are converted in all encodings."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_bytes(prefix + export_text().encode(encoding))
+
+        process_csv_file(str(input_file), str(output_file), False)
+
+        with output_file.open(newline="", encoding="utf-8") as f:
+            header, *rows = csv.reader(f, delimiter=";")
+
+        assert header[0] == "Durchführungsdatum"
+        assert rows[0][0] == "15.01.2024"
+        assert rows[0][header.index("Empfänger")] == "ACME; Wien"
+        assert rows[1][header.index("Betrag")] == "2500,00"
+
+    @pytest.mark.parametrize("mode", ["mapped", "read", "gzip", "checkpoint"])
+    def test_legacy_after_sample(self, tmp_path, mode):
+        """Test a cp1252 export whose first umlaut is after the sample."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        data = late_umlaut_export()
+        input_file.write_bytes(gzip.compress(data) if mode == "gzip" else data)
+
+        options = {"use_mmap": mode == "mapped"}
+        if mode == "checkpoint":
+            options = {"checkpoint": CheckpointFile(str(tmp_path / "ck"), every=50)}
+        process_csv_file(str(input_file), str(output_file), False, **options)
+
+        with output_file.open(newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f, delimiter=";"))
+
+        assert rows[-1][rows[0].index("Empfänger")] == "ACME; Wien"
+
+    def test_legacy_stream_after_sample(self):
+        """Test that a stream falls back to cp1252 for bytes that are not UTF-8."""
+        records = list(read_records(io.BytesIO(late_umlaut_export())))
+
+        assert records[-1].empfaenger == "ACME; Wien"
+
+    def test_legacy_stdin_after_sample(self):
+        """Test that standard input falls back to cp1252 as well."""
+        result = subprocess.run(
+            [sys.executable, "-m", "elbacsv.cli", "-", "-"],
+            input=late_umlaut_export(),
+            capture_output=True,
+            check=True,
+        )
+
+        assert "ACME; Wien" in result.stdout.decode("utf-8").splitlines()[-1]
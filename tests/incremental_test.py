@@ -0,0 +1,218 @@
+import csv
+
+import pytest
+
+from elbacsv import (
+    FingerprintIndex,
+    filters,
+    process_csv_file,
+    transaction_fingerprint,
+)
+from elbacsv.cli import main
+
+JANUARY = (
+    "2024-01-15,Verwendungszweck: Rent,2024-01-15,-500.00,EUR,2024-01-15 10:00:00\n"
+)
+FEBRUARY = (
+    "2024-02-15,Verwendungszweck: Rent,2024-02-15,-500.00,EUR,2024-02-15 10:00:00\n"
+)
+MARCH = "2024-03-15,Verwendungszweck: Rent,2024-03-15,-500.00,EUR,2024-03-15 10:00:00\n"
+
+
+def read_rows(path):
+    """
+    Read all rows of a CSV file.
+
+    Returns:
+        list[list[str]]: The rows of the file.
+
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+class TestTransactionFingerprint:
+    """Test suite for the transaction_fingerprint function."""
+
+    def test_same_row_same_fingerprint(self):
+        """Test that equal rows have equal fingerprints."""
+        row = ["2024-01-15", "Mandat: 1", "2024-01-15", "1.00", "EUR", "10:00"]
+
+        assert transaction_fingerprint(row) == transaction_fingerprint(list(row))
+
+    def test_value_date_is_ignored(self):
+        """Test that the Valutadatum is not part of the fingerprint."""
+        row = ["2024-01-15", "Mandat: 1", "2024-01-15", "1.00", "EUR", "10:00"]
+        other = ["2024-01-15", "Mandat: 1", "2024-01-17", "1.00", "EUR", "10:00"]
+
+        assert transaction_fingerprint(row) == transaction_fingerprint(other)
+
+    def test_occurrence_changes_fingerprint(self):
+        """Test that repeated identical rows get different fingerprints."""
+        row = ["2024-01-15", "Mandat: 1", "2024-01-15", "1.00", "EUR", "10:00"]
+
+        assert transaction_fingerprint(row) != transaction_fingerprint(row, 1)
+
+    def test_short_row(self):
+        """Test that rows with missing columns can be fingerprinted."""
+        assert transaction_fingerprint(["2024-01-15"])
+
+
+class TestIncrementalConversion:
+    """Test suite for incremental conversion with a fingerprint index."""
+
+    def test_overlapping_exports_are_appended(self, tmp_path):
+        """Test that only new rows of an overlapping export are appended."""
+        first_export = tmp_path / "first.csv"
+        second_export = tmp_path / "second.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+
+        first_export.write_text(JANUARY + FEBRUARY, encoding="utf-8")
+        second_export.write_text(FEBRUARY + MARCH, encoding="utf-8")
+
+        process_csv_file(
+            str(first_export), str(output_file), False, index_file=str(index_file)
+        )
+        process_csv_file(
+            str(second_export), str(output_file), False, index_file=str(index_file)
+        )
+
+        rows = read_rows(output_file)
+        assert len(rows) == 4  # Header + January, February, March
+        assert rows[0][0] == "Durchführungsdatum"
+        assert [row[0] for row in rows[1:]] == [
+            "2024-01-15",
+            "2024-02-15",
+            "2024-03-15",
+        ]
+        assert len(FingerprintIndex(str(index_file))) == 3
+
+    def test_rerun_adds_nothing(self, tmp_path):
+        """Test that converting the same export twice does not duplicate rows."""
+        export = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+
+        # Two identical transactions in one export are both kept
+        export.write_text(JANUARY + JANUARY + FEBRUARY, encoding="utf-8")
+
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+        first = output_file.read_bytes()
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+
+        assert output_file.read_bytes() == first
+        assert len(read_rows(output_file)) == 4
+
+    def test_index_reset_without_output(self, tmp_path):
+        """Test that a stale index is ignored when the output file is missing."""
+        export = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+        export.write_text(JANUARY, encoding="utf-8")
+
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+        output_file.unlink()
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+
+        assert len(read_rows(output_file)) == 2
+        assert len(FingerprintIndex(str(index_file))) == 1
+
+    def test_missing_index(self, tmp_path):
+        """Test that an output file without its index is not appended to."""
+        export = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+        export.write_text(JANUARY, encoding="utf-8")
+
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+        first = output_file.read_bytes()
+        index_file.unlink()
+
+        with pytest.raises(ValueError, match="its fingerprint index"):
+            process_csv_file(
+                str(export), str(output_file), False, index_file=str(index_file)
+            )
+
+        assert output_file.read_bytes() == first
+
+    def test_failed_run_is_removed(self, tmp_path):
+        """Test that rows appended by a failed conversion are removed again."""
+        first_export = tmp_path / "first.csv"
+        second_export = tmp_path / "second.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+        first_export.write_text(JANUARY, encoding="utf-8")
+        second_export.write_text(FEBRUARY + "2024-03-15,cut short\n", encoding="utf-8")
+
+        process_csv_file(
+            str(first_export), str(output_file), False, index_file=str(index_file)
+        )
+        first = output_file.read_bytes()
+
+        with pytest.raises(ValueError, match="expected at least 6 fields"):
+            process_csv_file(
+                str(second_export), str(output_file), False, index_file=str(index_file)
+            )
+
+        assert output_file.read_bytes() == first
+        assert len(FingerprintIndex(str(index_file))) == 1
+
+    def test_filtered_rows_not_recorded(self, tmp_path):
+        """Test that rows dropped by a filter on parsed keys stay new."""
+        export = tmp_path / "export.csv"
+        output_file = tmp_path / "output.csv"
+        index_file = tmp_path / "output.idx"
+        export.write_text(
+            JANUARY + FEBRUARY.replace("Verwendungszweck", "Mandat"),
+            encoding="utf-8",
+        )
+
+        process_csv_file(
+            str(export),
+            str(output_file),
+            False,
+            filters=[filters.has_key("Mandat")],
+            index_file=str(index_file),
+        )
+
+        assert [row[0] for row in read_rows(output_file)[1:]] == ["2024-02-15"]
+        assert len(FingerprintIndex(str(index_file))) == 1
+
+        process_csv_file(
+            str(export), str(output_file), False, index_file=str(index_file)
+        )
+
+        assert [row[0] for row in read_rows(output_file)[1:]] == [
+            "2024-02-15",
+            "2024-01-15",
+        ]
+        assert len(FingerprintIndex(str(index_file))) == 2
+
+    def test_command_line(self, tmp_path, monkeypatch):
+        """Test the --incremental option with the default index file."""
+        first_export = tmp_path / "first.csv"
+        second_export = tmp_path / "second.csv"
+        output_file = tmp_path / "output.csv"
+        first_export.write_text(JANUARY, encoding="utf-8")
+        second_export.write_text(JANUARY + FEBRUARY, encoding="utf-8")
+
+        for export in (first_export, second_export):
+            monkeypatch.setattr(
+                "sys.argv",
+                ["elbacsv.py", str(export), str(output_file), "--incremental"],
+            )
+            main()
+
+        assert len(read_rows(output_file)) == 3
+        assert (tmp_path / "output.csv.fingerprints").exists()
@@ -0,0 +1,160 @@
+import csv
+import gzip
+
+import pytest
+
+from elbacsv import process_csv_file
+from elbacsv.formats import ElbaDialect
+from elbacsv.mapped import can_map, mapped_rows
+
+ROW = "{day:02d}.01.2024;Empfänger: Shop {n};{day:02d}.01.2024;-{n},00;EUR;{day:02d}.01.2024 10:00:00:000"
+
+ROWS = [ROW.format(day=n % 28 + 1, n=n) for n in range(1, 41)]
+
+
+class SemicolonDialect(csv.excel):
+    """Dialect of exports with quoted fields."""
+
+    delimiter = ";"
+
+
+def read_with_csv(path, encoding, dialect):
+    """
+    Read a file with csv.reader.
+
+    Returns:
+        list[list[str]]: The rows of the file.
+
+    """
+    with open(path, encoding=encoding, newline="") as f:
+        return list(csv.reader(f, dialect))
+
+
+@pytest.fixture(params=[5, 64, 1 << 20])
+def block_size(request, monkeypatch):
+    """
+    Set the size of the blocks the file is read in.
+
+    Returns:
+        int: The block size in bytes.
+
+    """
+    monkeypatch.setattr("elbacsv.mapped.BLOCK_SIZE", request.param)
+    return request.param
+
+
+class TestMappedRows:
+    """Test suite for reading input files through a memory map."""
+
+    @pytest.mark.usefixtures("block_size")
+    @pytest.mark.parametrize("newline", ["\n", "\r\n"])
+    @pytest.mark.parametrize("encoding", ["utf-8-sig", "cp1252"])
+    def test_unquoted(self, newline, encoding, tmp_path):
+        """Test that unquoted rows are read as with csv.reader."""
+        path = tmp_path / "export.csv"
+        text = newline.join([*ROWS[:10], "", "a;;b", *ROWS[10:]]) + newline
+        path.write_bytes(text.encode(encoding))
+
+        rows = list(mapped_rows(str(path), ElbaDialect, encoding))
+
+        assert rows == read_with_csv(path, encoding, ElbaDialect)
+        assert rows[0][0] == "02.01.2024"
+        assert len(rows) == 42
+
+    @pytest.mark.usefixtures("block_size")
+    def test_quoted(self, tmp_path):
+        """Test that quoted fields with line breaks span several blocks."""
+        path = tmp_path / "export.csv"
+        lines = [
+            'a;"b;c";d',
+            'e;"f',
+            "g",
+            'h";"i""j"',
+            "k;l",
+            '"m\r\nn";o',
+            '"p;',
+        ]
+        path.write_bytes(("\n".join(lines) * 50).encode("utf-8"))
+
+        rows = list(mapped_rows(str(path), SemicolonDialect, "utf-8"))
+
+        assert rows == read_with_csv(path, "utf-8", SemicolonDialect)
+
+    def test_no_final_line_break(self, tmp_path):
+        """Test that the last line is read without a line break."""
+        path = tmp_path / "export.csv"
+        path.write_text("a;b\nc;d", encoding="utf-8")
+
+        assert list(mapped_rows(str(path), ElbaDialect, "utf-8")) == [
+            ["a", "b"],
+            ["c", "d"],
+        ]
+
+
+class TestCanMap:
+    """Test suite for deciding whether a file is read through a memory map."""
+
+    def test_plain_file(self, tmp_path):
+        """Test that an uncompressed UTF-8 file can be mapped."""
+        path = tmp_path / "export.csv"
+        path.write_text("\n".join(ROWS), encoding="utf-8")
+
+        assert can_map(str(path), "utf-8-sig")
+
+    @pytest.mark.parametrize(
+        ("data", "encoding"),
+        [
+            (gzip.compress(b"a;b\n"), "utf-8"),
+            ("a;b\n".encode("utf-16"), "utf-16"),
+            (b"", "utf-8"),
+            (b"a;b\r" * 40_000, "utf-8"),
+        ],
+    )
+    def test_unmapped_file(self, data, encoding, tmp_path):
+        """Test that compressed, UTF-16, empty and CR-only files are not mapped."""
+        path = tmp_path / "export.csv"
+        path.write_bytes(data)
+
+        assert not can_map(str(path), encoding)
+
+    def test_stdin(self):
+        """Test that standard input is not mapped."""
+        assert not can_map("-", "utf-8")
+
+
+class TestMappedConversion:
+    """Test suite for converting files read through a memory map."""
+
+    def test_same_output(self, tmp_path):
+        """Test that the output is the same with and without the memory map."""
+        path = tmp_path / "export.csv"
+        path.write_bytes(("﻿" + "\r\n".join(ROWS) + "\r\n").encode("utf-8"))
+
+        process_csv_file(str(path), str(tmp_path / "mapped.csv"), False, use_mmap=True)
+        process_csv_file(str(path), str(tmp_path / "read.csv"), False, use_mmap=False)
+
+        assert (tmp_path / "mapped.csv").read_bytes() == (
+            tmp_path / "read.csv"
+        ).read_bytes()
+
+    def test_required_map(self, tmp_path):
+        """Test that a file that cannot be mapped is an error if required."""
+        path = tmp_path / "export.csv.gz"
+        path.write_bytes(gzip.compress("\n".join(ROWS).encode("utf-8")))
+
+        with pytest.raises(ValueError, match="cannot be read through a memory map"):
+            process_csv_file(str(path), str(tmp_path / "out.csv"), False, use_mmap=True)
+
+    def test_reject_file(self, tmp_path):
+        """Test that the memory map cannot be required with a reject file."""
+        path = tmp_path / "export.csv"
+        path.write_text("\n".join(ROWS), encoding="utf-8")
+
+        with pytest.raises(ValueError, match="checkpoints or a reject file"):
+            process_csv_file(
+                str(path),
+                str(tmp_path / "out.csv"),
+                False,
+                reject_file=str(tmp_path / "rejects.csv"),
+                use_mmap=True,
+            )
@@ -0,0 +1,228 @@
+import random
+import re
+
+import pytest
+
+from elbacsv import (
+    CachingParser,
+    KeyValueParser,
+    default_parser,
+    parse_key_value_string,
+    process_csv_file,
+)
+from elbacsv.constants import KEYS
+
+
+def reference_parse(s):
+    """
+    Reference implementation based on a plain regex alternation.
+
+    Returns:
+        dict[str, str]: Parsed key-value pairs.
+
+    """
+    result = dict.fromkeys(KEYS.keys(), "")
+    pattern = r"(" + "|".join(map(re.escape, KEYS.keys())) + r")\s*:\s*"
+    parts = re.split(pattern, s)
+
+    it = iter(parts[1:])
+    for key, value in zip(it, it, strict=False):
+        result[key.strip()] = value.strip()
+
+    return result
+
+
+class TestKeyValueParser:
+    """Test suite for the KeyValueParser class."""
+
+    def test_default_parser_is_shared(self):
+        """Test that the default parser is built only once."""
+        assert default_parser() is default_parser()
+        assert default_parser().keys == tuple(KEYS)
+
+    def test_matches_reference_on_random_input(self):
+        """Test that the parser gives the same results as the regex split."""
+        fragments = [
+            *KEYS,
+            ":",
+            " ",
+            "\t",
+            "\xa0",
+            "x",
+            "IBAN",
+            "Urspr.",
+            "12:30",
+            "Empf",
+            "änger",
+            "-Kennung",
+            "referenz",
+        ]
+        rnd = random.Random(42)
+
+        for _ in range(5000):
+            s = "".join(rnd.choice(fragments) for _ in range(rnd.randint(0, 12)))
+            assert parse_key_value_string(s) == reference_parse(s), repr(s)
+
+    def test_longest_key_wins(self):
+        """Test that overlapping keys resolve to the longest match."""
+        parser = default_parser()
+        result = parser.parse(
+            "Auftraggeberreferenz: A Auftraggeber: B Empfänger-Kennung: C"
+        )
+
+        assert result["Auftraggeberreferenz"] == "A"
+        assert result["Auftraggeber"] == "B"
+        assert result["Empfänger-Kennung"] == "C"
+        assert result["Empfänger"] == ""
+
+    def test_whitespace_before_colon(self):
+        """Test that whitespace between key and colon is accepted."""
+        result = default_parser().parse("Mandat  :  M-1 Empfänger:X")
+
+        assert result["Mandat"] == "M-1"
+        assert result["Empfänger"] == "X"
+
+    def test_iter_pairs_keeps_duplicates(self):
+        """Test that iter_pairs yields every occurrence in order."""
+        pairs = list(default_parser().iter_pairs("Mandat: 1 Mandat: 2"))
+
+        assert pairs == [("Mandat", "1"), ("Mandat", "2")]
+
+    def test_custom_keys(self):
+        """Test a parser built for a custom key set."""
+        parser = KeyValueParser(["Foo", "Foo Bar"])
+
+        assert parser.parse("Foo Bar: 1 Foo: 2") == {"Foo": "2", "Foo Bar": "1"}
+
+    @pytest.mark.parametrize("key", ["", "A:B", "Trailing "])
+    def test_invalid_keys(self, key):
+        """Test that invalid keys are rejected."""
+        with pytest.raises(ValueError, match="Invalid key"):
+            KeyValueParser([key])
+
+    def test_fields_match_full_parse(self):
+        """Test that a projected parser returns the values of the full parse."""
+        fields = ("Empfänger", "IBAN Empfänger", "Verwendungszweck")
+        parser = KeyValueParser(KEYS, fields)
+        s = (
+            "Empfänger: ACME IBAN Empfänger: AT01 BIC Empfänger: BKAUATWWXXX "
+            "Verwendungszweck: Invoice Zahlungsreferenz: RF18"
+        )
+
+        full = parse_key_value_string(s)
+        assert parser.parse(s) == {field: full[field] for field in fields}
+        assert list(parser.iter_pairs(s)) == [
+            ("Empfänger", "ACME"),
+            ("IBAN Empfänger", "AT01"),
+            ("Verwendungszweck", "Invoice"),
+        ]
+
+    def test_fields_boundaries_use_all_keys(self):
+        """Test that keys outside the fields still end the previous value."""
+        parser = default_parser(("Verwendungszweck",))
+
+        assert parser.parse("Verwendungszweck: Rent Mandat: M-1") == {
+            "Verwendungszweck": "Rent"
+        }
+        assert parser.keys == tuple(KEYS)
+        assert parser.fields == ("Verwendungszweck",)
+
+    def test_unknown_fields(self):
+        """Test that fields must be keys of the parser."""
+        with pytest.raises(ValueError, match="Unknown fields"):
+            KeyValueParser(["Foo"], ["Bar"])
+
+
+class TestCachingParser:
+    """Test suite for the CachingParser class."""
+
+    def test_same_results_as_parser(self):
+        """Test that cached results equal the results of the parser."""
+        parser = CachingParser()
+        s = "Verwendungszweck: Miete Empfänger: John Doe"
+
+        assert parser.parse(s) == default_parser().parse(s)
+        assert parser.parse(s) == default_parser().parse(s)
+        assert list(parser.iter_pairs(s)) == list(default_parser().iter_pairs(s))
+
+    def test_hits_and_misses(self):
+        """Test that hits and misses are counted."""
+        parser = CachingParser(maxsize=10)
+
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 2")
+
+        info = parser.cache_info()
+        assert info.hits == 1
+        assert info.misses == 2
+        assert info.maxsize == 10
+        assert info.currsize == 2
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the cache does not grow beyond its maximum size."""
+        parser = CachingParser(maxsize=2)
+
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 2")
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 3")  # evicts "Mandat: 2"
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 2")
+
+        assert parser.cache_info() == (2, 4, 2, 2)
+
+    def test_cache_disabled(self):
+        """Test that a cache size of 0 disables caching."""
+        parser = CachingParser(maxsize=0)
+
+        parser.parse("Mandat: 1")
+        parser.parse("Mandat: 1")
+
+        assert parser.cache_info() == (0, 2, 0, 0)
+
+    def test_cached_result_cannot_be_mutated(self):
+        """Test that modifying a returned dict does not affect the cache."""
+        parser = CachingParser()
+
+        first = parser.parse("Mandat: 1")
+        first["Mandat"] = "changed"
+
+        assert parser.parse("Mandat: 1")["Mandat"] == "1"
+
+    def test_values_are_interned(self):
+        """Test that equal values of different strings share one object."""
+        parser = CachingParser()
+
+        first = parser.parse("Empfänger: Wiener Stadtwerke GmbH Mandat: 1")
+        second = parser.parse("Empfänger: Wiener Stadtwerke GmbH Mandat: 2")
+
+        assert first["Empfänger"] is second["Empfänger"]
+
+    def test_cache_clear(self):
+        """Test that clearing the cache resets the counters."""
+        parser = CachingParser()
+        parser.parse("Mandat: 1")
+
+        parser.cache_clear()
+
+        assert parser.cache_info() == (0, 0, parser.cache_info().maxsize, 0)
+
+    @pytest.mark.parametrize("cache_size", [0, 1, 4096])
+    def test_process_csv_output_independent_of_cache(self, tmp_path, cache_size):
+        """Test that the cache size does not change the output."""
+        input_file = tmp_path / "input.csv"
+        expected_file = tmp_path / "expected.csv"
+        output_file = tmp_path / "output.csv"
+
+        input_file.write_text(
+            "2024-01-15,Mandat: M1 Verwendungszweck: Rent,2024-01-15,1.00,EUR,2024-01-15 10:00:00\n"
+            "2024-02-15,Mandat: M1 Verwendungszweck: Rent,2024-02-15,1.00,EUR,2024-02-15 10:00:00\n"
+            "2024-02-16,Zahlungsreferenz: R Verwendungszweck: X,2024-02-16,2.00,EUR,2024-02-16 10:00:00\n",
+            encoding="utf-8",
+        )
+
+        process_csv_file(str(input_file), str(expected_file), True, cache_size=0)
+        process_csv_file(str(input_file), str(output_file), True, cache_size=cache_size)
+
+        assert output_file.read_bytes() == expected_file.read_bytes()
@@ -0,0 +1,224 @@
+import gzip
+import json
+
+import pytest
+
+from elbacsv import Partitioning, PartitionSink, process_csv_file
+from elbacsv.cli import main
+from elbacsv.partition import manifest_path, partition_path
+
+ROWS = [
+    (
+        "15.01.2024;Empfänger: ACME IBAN Empfänger: AT01;15.01.2024;"
+        "-1,00;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "03.02.2024;Empfänger: Shop IBAN Empfänger: AT02;03.02.2024;"
+        "-2,00;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "20.01.2024;Empfänger: Rent IBAN Empfänger: AT01;20.01.2024;"
+        "-3,00;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "01.03.2024;Empfänger: ACME IBAN Empfänger: AT01;01.03.2024;"
+        "-4,00;EUR;15.01.2024 10:00:00:000"
+    ),
+    (";Empfänger: Shop IBAN Empfänger: AT02;;-5,00;EUR;15.01.2024 10:00:00:000"),
+]
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write the rows to an export.
+
+    Returns:
+        str: The path of the export.
+
+    """
+    path = tmp_path / "export.csv"
+    path.write_text("\n".join(ROWS) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def read_manifest(output):
+    """
+    Read the manifest of a partitioned output.
+
+    Returns:
+        dict: The manifest.
+
+    """
+    with open(manifest_path(output), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def amounts(path):
+    """
+    Return the amounts of a partition file.
+
+    Returns:
+        list[str]: The amounts in row order.
+
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    column = lines[0].split(";").index("Betrag")
+    return [line.split(";")[column] for line in lines[1:]]
+
+
+class TestPartitioning:
+    """Test suite for parsing partitionings."""
+
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("month", Partitioning("month")),
+            ("column=IBAN Empfänger", Partitioning("column", "IBAN Empfänger")),
+            ("rows=100", Partitioning("rows", 100)),
+            ("bytes=2k", Partitioning("bytes", 2048)),
+            ("bytes=10M", Partitioning("bytes", 10 * 1024**2)),
+        ],
+    )
+    def test_parse(self, text, expected):
+        """Test that valid partitionings are parsed."""
+        assert Partitioning.parse(text) == expected
+
+    @pytest.mark.parametrize(
+        "text", ["year", "month=1", "rows", "rows=0", "rows=2k", "bytes=x"]
+    )
+    def test_invalid(self, text):
+        """Test that invalid partitionings raise a ValueError."""
+        with pytest.raises(ValueError, match="Invalid partitioning"):
+            Partitioning.parse(text)
+
+    def test_paths(self):
+        """Test that the partition is added before the extensions."""
+        assert partition_path("out/ledger.csv.gz", "2024-01") == (
+            "out/ledger_2024-01.csv.gz"
+        )
+        assert manifest_path("out/ledger.csv.gz") == "out/ledger.manifest.json"
+
+
+class TestPartitionSink:
+    """Test suite for writing partitioned output."""
+
+    def test_month(self, export, tmp_path):
+        """Test that every month is written to its own file."""
+        output = str(tmp_path / "ledger.csv")
+
+        process_csv_file(export, PartitionSink(output, "month"), False)
+
+        assert amounts(partition_path(output, "2024-01")) == ["-1,00", "-3,00"]
+        assert amounts(partition_path(output, "2024-02")) == ["-2,00"]
+        assert amounts(partition_path(output, "undated")) == ["-5,00"]
+
+        manifest = read_manifest(output)
+        assert manifest["partitioning"] == "month"
+        assert manifest["partitions"][0] == {
+            "partition": "2024-01",
+            "path": "ledger_2024-01.csv",
+            "rows": 2,
+            "first_date": "2024-01-15",
+            "last_date": "2024-01-20",
+        }
+        assert manifest["partitions"][-1]["first_date"] is None
+
+    def test_open_file_limit(self, export, tmp_path):
+        """Test that files closed because of the limit are appended to."""
+        output = str(tmp_path / "ledger.csv.gz")
+        sink = PartitionSink(output, "month", max_open=1, buffer_rows=1)
+
+        process_csv_file(export, sink, False)
+
+        assert amounts(partition_path(output, "2024-01")) == ["-1,00", "-3,00"]
+        assert sum(p["rows"] for p in read_manifest(output)["partitions"]) == 5
+
+    def test_column(self, export, tmp_path):
+        """Test that rows are partitioned by the value of a column."""
+        output = str(tmp_path / "ledger.csv")
+
+        process_csv_file(export, PartitionSink(output, "column=IBAN Empfänger"), False)
+
+        assert amounts(partition_path(output, "AT01")) == ["-1,00", "-3,00", "-4,00"]
+        assert amounts(partition_path(output, "AT02")) == ["-2,00", "-5,00"]
+
+    def test_rows(self, export, tmp_path):
+        """Test that files hold at most the given number of rows."""
+        output = str(tmp_path / "ledger.csv")
+
+        process_csv_file(export, PartitionSink(output, "rows=2"), False)
+
+        names = [p["path"] for p in read_manifest(output)["partitions"]]
+        assert names == ["ledger_0001.csv", "ledger_0002.csv", "ledger_0003.csv"]
+        assert amounts(partition_path(output, "0003")) == ["-5,00"]
+
+    @pytest.mark.parametrize(
+        ("name", "limit"), [("ledger.csv", 700), ("ledger.jsonl", 1500)]
+    )
+    def test_bytes(self, name, limit, export, tmp_path):
+        """Test that a new file is started before the size limit is exceeded."""
+        output = str(tmp_path / name)
+
+        process_csv_file(export, PartitionSink(output, f"bytes={limit}"), False)
+
+        partitions = read_manifest(output)["partitions"]
+        assert [p["rows"] for p in partitions] == [2, 2, 1]
+        for partition in partitions:
+            assert (tmp_path / partition["path"]).stat().st_size <= limit
+
+    def test_row_over_limit(self, export, tmp_path):
+        """Test that a row larger than the limit gets a file of its own."""
+        output = str(tmp_path / "ledger.csv")
+
+        process_csv_file(export, PartitionSink(output, "bytes=100"), False)
+
+        assert [p["rows"] for p in read_manifest(output)["partitions"]] == [1] * 5
+
+    def test_unknown_column(self, export, tmp_path):
+        """Test that partitioning by an unknown column raises a ValueError."""
+        sink = PartitionSink(str(tmp_path / "ledger.csv"), "column=Unknown")
+
+        with pytest.raises(ValueError, match="Unknown partition column"):
+            process_csv_file(export, sink, False)
+
+    def test_stdout(self):
+        """Test that partitioned output cannot be written to stdout."""
+        with pytest.raises(ValueError, match="needs the path of a file"):
+            PartitionSink("-", "month")
+
+
+class TestPartitionCommand:
+    """Test suite for --partition on the command line."""
+
+    def test_command_line(self, export, tmp_path, monkeypatch):
+        """Test that --partition writes the partitions and the manifest."""
+        output = str(tmp_path / "ledger.jsonl")
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv", "--partition", "month", export, output]
+        )
+        main()
+
+        manifest = read_manifest(output)
+        assert [p["path"] for p in manifest["partitions"]][:2] == [
+            "ledger_2024-01.jsonl",
+            "ledger_2024-02.jsonl",
+        ]
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--partition", "year", "in.csv", "out.csv"],
+            ["--partition", "month", "in.csv", "-"],
+            ["--partition", "month", "--incremental", "in.csv", "out.csv"],
+        ],
+    )
+    def test_invalid_arguments(self, argv, monkeypatch):
+        """Test that invalid partitionings and combinations are rejected."""
+        monkeypatch.setattr("sys.argv", ["elbacsv", *argv])
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+
+        assert exc_info.value.code == 2
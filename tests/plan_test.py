@@ -0,0 +1,148 @@
+import pickle
+
+import pytest
+
+from elbacsv import Merge, TransformPlan, process_csv_file, read_records
+from elbacsv.plan import REFERENCE_MERGE
+
+ROWS = [
+    (
+        "15.01.2024;Empfänger: ACME Zahlungsreferenz: R1 Verwendungszweck: Rechnung;"
+        "16.01.2024;-1.234,56;EUR;15.01.2024 10:00:00:000"
+    ),
+    (
+        "20.01.2024;Auftraggeber: Employer Verwendungszweck: Gehalt;"
+        "20.01.2024;2500,00;EUR;20.01.2024 08:00:00:000"
+    ),
+]
+
+COUNTERPARTY = Merge("Gegenpartei", ("Empfänger", "Auftraggeber"))
+
+
+class TestTransformPlan:
+    """Test suite for building transform plans."""
+
+    def test_default_header(self):
+        """Test that the default plan writes all keys between the native columns."""
+        header = TransformPlan().header
+
+        assert header[0] == "Durchführungsdatum"
+        assert header[1:3] == ["Verwendungszweck", "Zahlungsreferenz"]
+        assert header[-4:] == ["Valutadatum", "Betrag", "Währung", "Zeitstempel"]
+
+    def test_reference_merge_drops_sources(self):
+        """Test that merged sources other than the target are not written."""
+        header = TransformPlan([REFERENCE_MERGE]).header
+
+        assert "Verwendungszweck" in header
+        assert "Zahlungsreferenz" not in header
+        assert "Auftraggeberreferenz" not in header
+
+    def test_new_target_takes_place_of_first_source(self):
+        """Test that a new merge target is written where its first source was."""
+        default = TransformPlan().header
+        header = TransformPlan([COUNTERPARTY]).header
+
+        assert header.index("Gegenpartei") == default.index("Empfänger")
+        assert "Empfänger" not in header
+        assert "Auftraggeber" not in header
+
+    def test_renames_and_drops(self):
+        """Test that renames change the header and drops remove columns."""
+        plan = TransformPlan(renames={"Betrag": "Amount"}, drops=["Zeitstempel"])
+
+        assert plan.header[-2:] == ["Amount", "Währung"]
+        assert plan.columns[-2:] == ("Betrag", "Währung")
+
+    @pytest.mark.parametrize(
+        ("options", "message"),
+        [
+            ({"merges": [Merge("X", ("Unknown",))]}, "Unknown keys"),
+            ({"merges": [Merge("Betrag", ("Empfänger",))]}, "native column"),
+            ({"drops": ["Unknown"]}, "Unknown column"),
+            (
+                {"columns": ["Zahlungsreferenz"], "merges": [REFERENCE_MERGE]},
+                "Unknown column",
+            ),
+            ({"renames": {"Unknown": "X"}}, "Unknown column"),
+            ({"renames": {"Betrag": "Währung"}}, "Duplicate column"),
+        ],
+    )
+    def test_invalid_plans(self, options, message):
+        """Test that invalid plans raise a ValueError."""
+        with pytest.raises(ValueError, match=message):
+            TransformPlan(**options)
+
+    def test_fields_of_projection(self):
+        """Test that only the written and merged keys are extracted."""
+        plan = TransformPlan([COUNTERPARTY], columns=["Gegenpartei", "Betrag"])
+
+        assert set(plan.fields()) == {"Empfänger", "Auftraggeber"}
+        assert TransformPlan([REFERENCE_MERGE]).fields() is None
+
+    def test_unused_merge_is_skipped(self):
+        """Test that a merge whose target is not written is not extracted."""
+        plan = TransformPlan([REFERENCE_MERGE], columns=["Empfänger"])
+
+        assert plan.fields() == ("Empfänger",)
+        assert plan.compile(("Empfänger",)).merge is None
+
+    def test_picklable(self):
+        """Test that plans can be sent to worker processes."""
+        plan = TransformPlan([COUNTERPARTY], renames={"Betrag": "Amount"})
+
+        assert pickle.loads(pickle.dumps(plan)).to_dict() == plan.to_dict()
+
+
+class TestCompiledPlan:
+    """Test suite for converting rows with compiled plans."""
+
+    def test_custom_merge(self):
+        """Test that a custom merge joins the non-empty values with its separator."""
+        plan = TransformPlan(
+            [Merge("Gegenpartei", ("Empfänger", "Auftraggeber"), " / ")],
+            columns=["Durchführungsdatum", "Gegenpartei", "Betrag"],
+        )
+
+        records = list(read_records(ROWS, plan=plan))
+
+        assert records[0].to_dict() == {
+            "Durchführungsdatum": "15.01.2024",
+            "Gegenpartei": "ACME",
+            "Betrag": "-1.234,56",
+        }
+        assert records[1]["Gegenpartei"] == "Employer"
+
+    def test_merges_are_applied_in_order(self):
+        """Test that a merge can use the result of an earlier merge."""
+        plan = TransformPlan(
+            [REFERENCE_MERGE, Merge("Text", ("Empfänger", "Verwendungszweck"))],
+            columns=["Text"],
+        )
+
+        records = list(read_records(ROWS, plan=plan))
+
+        assert records[0].text == "ACME R1 Rechnung"
+
+    def test_renamed_columns(self, tmp_path):
+        """Test that process_csv_file writes the renamed header."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text("\n".join(ROWS) + "\n", encoding="utf-8")
+
+        plan = TransformPlan(renames={"Betrag": "Amount"}, drops=["Zeitstempel"])
+        process_csv_file(str(input_file), str(output_file), False, plan=plan)
+
+        lines = output_file.read_text(encoding="utf-8").splitlines()
+        assert lines[0].endswith("Valutadatum;Amount;Währung")
+        assert lines[1].endswith("16.01.2024;-1.234,56;EUR")
+
+    def test_plan_with_merge_option(self, tmp_path):
+        """Test that a plan cannot be combined with the merge option."""
+        with pytest.raises(ValueError, match="combined with a plan"):
+            process_csv_file(
+                str(tmp_path / "in.csv"),
+                str(tmp_path / "out.csv"),
+                True,
+                plan=TransformPlan(),
+            )
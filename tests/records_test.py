@@ -0,0 +1,117 @@
+import pickle
+
+import pytest
+
+from elbacsv import (
+    CachingParser,
+    KeyValueParser,
+    Record,
+    default_parser,
+    parse_key_value_string,
+    parse_record,
+    record_type,
+)
+from elbacsv.constants import KEYS
+from elbacsv.records import attribute_name, column_order
+
+TEXT = (
+    "Empfänger: ACME IBAN Empfänger: AT01 Verwendungszweck: Invoice "
+    "Kartenzahlung mit Kartenfolge-Nr.: 5"
+)
+
+
+class TestRecordType:
+    """Test suite for the record types."""
+
+    @pytest.mark.parametrize(
+        ("key", "name"),
+        [
+            ("IBAN Empfänger", "iban_empfaenger"),
+            ("Urspr. Zahlungspflichtige", "urspr_zahlungspflichtige"),
+            ("Kartenzahlung mit Kartenfolge-Nr.", "kartenzahlung_mit_kartenfolge_nr"),
+            ("Empfänger-Kennung", "empfaenger_kennung"),
+        ],
+    )
+    def test_attribute_name(self, key, name):
+        """Test that keys are turned into identifiers."""
+        assert attribute_name(key) == name
+
+    def test_field_order_follows_keys(self):
+        """Test that the fields of Record are in output column order."""
+        keys = tuple(Record._make([""] * len(KEYS)).to_dict())
+
+        assert keys == column_order(KEYS)
+        assert keys[0] == "Verwendungszweck"
+
+    def test_invalid_and_duplicate_names(self):
+        """Test that unusable attribute names fall back to positional names."""
+        record = record_type(("Foo", "foo", "class", "1st"))("a", "b", "c", "d")
+
+        assert (record.foo, record.field_1, record.field_2, record.field_3) == (
+            "a",
+            "b",
+            "c",
+            "d",
+        )
+        assert record["class"] == "c"
+
+    def test_method_names_are_not_shadowed(self):
+        """Test that keys named like record methods get positional names."""
+        record = record_type(("Keys", "Get"))("a", "b")
+
+        assert record.field_0 == "a"
+        assert record.get("Get") == "b"
+
+    def test_types_are_cached(self):
+        """Test that equal keys give the same record type."""
+        assert record_type(("A", "B")) is record_type(("A", "B"))
+
+
+class TestRecord:
+    """Test suite for records returned by the parsers."""
+
+    def test_access(self):
+        """Test attribute, position and key access."""
+        record = parse_record(TEXT)
+
+        assert isinstance(record, Record)
+        assert isinstance(record, tuple)
+        assert record.iban_empfaenger == "AT01"
+        assert record["IBAN Empfänger"] == "AT01"
+        assert record[column_order(KEYS).index("IBAN Empfänger")] == "AT01"
+        assert record[:1] == ("Invoice",)
+        assert record.get("Mandat") == ""
+        assert record.get("Unknown", "-") == "-"
+
+    def test_to_dict_matches_parse(self):
+        """Test that records hold the same values as the dict result."""
+        record = parse_record(TEXT)
+
+        assert record.to_dict() == parse_key_value_string(TEXT)
+        assert dict(record) == record.to_dict()
+
+    def test_records_are_compact(self):
+        """Test that records do not carry a per-instance dict."""
+        record = parse_record(TEXT)
+
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.empfaenger = "Other"
+
+    def test_pickle(self):
+        """Test that records of projected parsers can be pickled."""
+        record = KeyValueParser(KEYS, ["Mandat", "Empfänger"]).parse_record(TEXT)
+        copy = pickle.loads(pickle.dumps(record))
+
+        assert copy == record
+        assert type(copy) is type(record)
+        assert copy.to_dict() == {"Mandat": "", "Empfänger": "ACME"}
+
+    def test_caching_parser(self):
+        """Test that the caching parser returns the same records."""
+        parser = CachingParser()
+
+        assert parser.parse_record(TEXT) == default_parser().parse_record(TEXT)
+        assert parser.parse_record(TEXT) == parser.parse_record(TEXT)
+        assert parser.parse_values(TEXT) == list(parse_record(TEXT))
+        assert parser.hits == 3
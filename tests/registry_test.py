@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from elbacsv import KEYS, parse_key_value_string, read_records
+from elbacsv.registry import (
+    load_keys,
+    register_keys,
+    registered_keys,
+    reset_keys,
+    save_keys,
+)
+
+ROW = (
+    "15.01.2024;Empfänger: ACME Kundennummer: 4711 Verwendungszweck: Rechnung;"
+    "16.01.2024;-1,00;EUR;15.01.2024 10:00:00:000"
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Remove the keys registered by a test."""
+    yield
+    reset_keys()
+
+
+class TestRegisterKeys:
+    """Test suite for registering keys at runtime."""
+
+    def test_new_key_is_parsed(self):
+        """Test that a registered key is no longer part of the previous value."""
+        assert register_keys(["Kundennummer"]) == ("Kundennummer",)
+
+        result = parse_key_value_string("Empfänger: ACME Kundennummer: 4711")
+
+        assert result["Empfänger"] == "ACME"
+        assert result["Kundennummer"] == "4711"
+
+    def test_new_key_is_last_column(self):
+        """Test that registered keys get the columns after the known ones."""
+        last = max(KEYS.values())
+        register_keys(["Kundennummer", "Ref. Nummer"])
+
+        assert KEYS["Kundennummer"] == last + 1
+        assert KEYS["Ref. Nummer"] == last + 2
+
+    def test_known_keys_are_skipped(self):
+        """Test that registering known keys has no effect."""
+        register_keys(["Kundennummer"])
+
+        assert register_keys(["Empfänger", "Kundennummer"]) == ()
+        assert registered_keys() == ("Kundennummer",)
+
+    @pytest.mark.parametrize("key", ["", "Key:", "Key ", None])
+    def test_invalid_keys(self, key):
+        """Test that keys the parser cannot recognize are rejected."""
+        with pytest.raises(ValueError, match="Invalid key"):
+            register_keys([key])
+
+    def test_reset_keys(self):
+        """Test that reset_keys restores the original keys."""
+        original = dict(KEYS)
+        register_keys(["Kundennummer"])
+
+        assert reset_keys() == ("Kundennummer",)
+        assert original == KEYS
+        assert "Kundennummer" not in parse_key_value_string("Kundennummer: 1")
+
+    def test_converted_column(self):
+        """Test that a registered key is written as its own column."""
+        register_keys(["Kundennummer"])
+
+        record = next(read_records([ROW]))
+
+        assert record["Kundennummer"] == "4711"
+        assert record["Empfänger"] == "ACME"
+
+
+class TestLoadKeys:
+    """Test suite for reading and writing key files."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that saved keys are loaded in order."""
+        path = tmp_path / "keys.json"
+        save_keys(["Kundennummer", {"key": "Ref. Nummer", "count": 3}], path)
+
+        assert load_keys(path) == ("Kundennummer", "Ref. Nummer")
+
+    @pytest.mark.parametrize(
+        "content",
+        ["not json", "[]", '{"other": []}', '{"keys": [{"count": 1}]}'],
+    )
+    def test_invalid_files(self, tmp_path, content):
+        """Test that invalid files raise a ValueError."""
+        path = tmp_path / "keys.json"
+        path.write_text(content, encoding="utf-8")
+
+        with pytest.raises(ValueError, match=r"keys\.json|Invalid key"):
+            load_keys(path)
+
+    def test_saved_file_is_json(self, tmp_path):
+        """Test that the saved file is a JSON object with a format version."""
+        path = tmp_path / "keys.json"
+        save_keys(["Kundennummer"], path)
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+
+        assert data == {"format": 1, "keys": ["Kundennummer"]}
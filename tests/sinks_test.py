@@ -0,0 +1,206 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from elbacsv import (
+    CsvSink,
+    JsonLinesSink,
+    SqliteSink,
+    convert_many,
+    make_sink,
+    process_csv_file,
+)
+from elbacsv.cli import main
+
+EXPORT = (
+    "2024-01-15,Empfänger: ACME IBAN Empfänger: AT01 Verwendungszweck: Invoice,"
+    "2024-01-16,-50.25,EUR,2024-01-15 10:00:00\n"
+    "2024-01-20,Auftraggeber: Employer Verwendungszweck: Salary,"
+    "2024-01-20,2500.00,EUR,2024-01-20 08:00:00\n"
+)
+
+
+@pytest.fixture
+def export(tmp_path):
+    """
+    Write a small ELBA export.
+
+    Returns:
+        pathlib.Path: Path of the export.
+
+    """
+    path = tmp_path / "export.csv"
+    path.write_text(EXPORT, encoding="utf-8")
+    return path
+
+
+class TestMakeSink:
+    """Test suite for the make_sink function."""
+
+    @pytest.mark.parametrize(
+        ("path", "sink_type"),
+        [
+            ("out.csv", CsvSink),
+            ("out.txt", CsvSink),
+            ("out.jsonl", JsonLinesSink),
+            ("out.ndjson", JsonLinesSink),
+            ("out.db", SqliteSink),
+            ("out.SQLITE", SqliteSink),
+        ],
+    )
+    def test_format_from_extension(self, path, sink_type):
+        """Test that the format is inferred from the file extension."""
+        assert type(make_sink(path)) is sink_type
+
+    def test_explicit_format(self):
+        """Test that an explicit format overrides the extension."""
+        assert type(make_sink("out.csv", "jsonl")) is JsonLinesSink
+
+    def test_invalid_format_and_options(self):
+        """Test that unknown formats and unsupported options are rejected."""
+        with pytest.raises(ValueError, match="Unknown output format"):
+            make_sink("out.csv", "xml")
+        with pytest.raises(ValueError, match="not supported"):
+            make_sink("out.csv", table="t")
+
+    def test_file_objects(self):
+        """Test that file objects are written as CSV unless sqlite is requested."""
+        output = io.StringIO()
+
+        with make_sink(output) as sink:
+            sink.open(["a", "b"])
+            sink.write(["1", "2"])
+
+        assert output.getvalue() == "a,b\r\n1,2\r\n"
+        with pytest.raises(ValueError, match="path of a database"):
+            make_sink(io.BytesIO(), "sqlite")
+
+
+class TestJsonLinesSink:
+    """Test suite for the JSON Lines output."""
+
+    def test_rows_are_objects(self, export, tmp_path):
+        """Test that every row is written as one JSON object."""
+        output_file = tmp_path / "output.jsonl"
+
+        process_csv_file(str(export), str(output_file), True)
+
+        records = [
+            json.loads(line)
+            for line in output_file.read_text(encoding="utf-8").splitlines()
+        ]
+        assert len(records) == 2
+        assert records[0]["Empfänger"] == "ACME"
+        assert records[0]["Betrag"] == "-50.25"
+        assert "Zahlungsreferenz" not in records[0]
+
+
+class TestSqliteSink:
+    """Test suite for the SQLite output."""
+
+    def test_typed_columns_and_indexes(self, export, tmp_path):
+        """Test that dates and amounts are typed and indexes are created."""
+        output_file = tmp_path / "output.sqlite"
+
+        process_csv_file(str(export), SqliteSink(str(output_file), indexes=True), False)
+
+        with sqlite3.connect(output_file) as connection:
+            rows = connection.execute(
+                'SELECT "Durchführungsdatum", "Betrag", "IBAN Empfänger" '
+                "FROM transactions ORDER BY 1"
+            ).fetchall()
+            total = connection.execute("SELECT SUM(Betrag) FROM transactions")
+            indexes = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            ).fetchall()
+
+            assert rows == [("2024-01-15", -50.25, "AT01"), ("2024-01-20", 2500, "")]
+            assert total.fetchone()[0] == pytest.approx(2449.75)
+            assert ("transactions_Durchführungsdatum",) in indexes
+            assert ("transactions_IBAN Empfänger",) in indexes
+
+    def test_batches_and_replace(self, export, tmp_path):
+        """Test small batches and that the table is replaced unless appending."""
+        output_file = tmp_path / "output.db"
+
+        for _ in range(2):
+            process_csv_file(
+                str(export), SqliteSink(str(output_file), batch_size=1), False
+            )
+
+        with sqlite3.connect(output_file) as connection:
+            count = connection.execute("SELECT COUNT(*) FROM transactions")
+            assert count.fetchone()[0] == 2
+
+    def test_incremental_appends(self, export, tmp_path):
+        """Test that incremental conversion appends to the existing table."""
+        output_file = tmp_path / "output.db"
+        index_file = tmp_path / "output.idx"
+        other = tmp_path / "other.csv"
+        other.write_text(
+            "2024-02-01,Verwendungszweck: Rent,2024-02-01,-500.00,EUR,"
+            "2024-02-01 10:00:00\n",
+            encoding="utf-8",
+        )
+
+        for path in (export, other, export):
+            process_csv_file(
+                str(path), str(output_file), False, index_file=str(index_file)
+            )
+
+        with sqlite3.connect(output_file) as connection:
+            count = connection.execute("SELECT COUNT(*) FROM transactions")
+            assert count.fetchone()[0] == 3
+
+    def test_rollback_on_error(self, tmp_path):
+        """Test that a failed conversion leaves the existing table unchanged."""
+        output_file = tmp_path / "output.db"
+        sink = SqliteSink(str(output_file))
+
+        with sink:
+            sink.open(["Betrag"])
+            sink.write(["1,00"])
+
+        sink.open(["Betrag"])
+        sink.write(["2,00"])
+        sink.close(RuntimeError("conversion failed"))
+
+        with sqlite3.connect(output_file) as connection:
+            assert connection.execute("SELECT Betrag FROM transactions").fetchall() == [
+                (1,)
+            ]
+
+
+class TestSinkCommandLine:
+    """Test suite for the output format command-line options."""
+
+    def test_format_option(self, export, tmp_path, monkeypatch):
+        """Test --format with --table for a file without extension."""
+        output_file = tmp_path / "ledger"
+        monkeypatch.setattr(
+            "sys.argv",
+            [
+                "elbacsv.py",
+                str(export),
+                str(output_file),
+                "--format",
+                "sqlite",
+                "--table",
+                "january",
+            ],
+        )
+
+        main()
+
+        with sqlite3.connect(output_file) as connection:
+            count = connection.execute("SELECT COUNT(*) FROM january")
+            assert count.fetchone()[0] == 2
+
+    def test_batch_format(self, export, tmp_path):
+        """Test that batch output files get the extension of the format."""
+        results = convert_many([str(export)], output_format="jsonl")
+
+        assert results[0].ok
+        assert results[0].output_csv == str(tmp_path / "export_converted.jsonl")
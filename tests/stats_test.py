@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+from elbacsv import ConversionStats, process_csv_file
+from elbacsv.cli import main
+from elbacsv.stats import STAGES
+
+INPUT_DATA = (
+    "2024-01-15,Zahlungsreferenz: REF1 Verwendungszweck: Payment 1,2024-01-15,100.00,EUR,2024-01-15 10:00:00\n"
+    "2024-01-16,Verwendungszweck: Payment 2 Empfänger: John Doe,2024-01-16,200.00,EUR,2024-01-16 11:00:00\n"
+)
+
+
+class TestConversionStats:
+    """Test suite for the ConversionStats class."""
+
+    def test_process_csv_collects_stats(self, tmp_path):
+        """Test that process_csv_file fills in the statistics."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(INPUT_DATA, encoding="utf-8")
+
+        stats = ConversionStats()
+        process_csv_file(
+            str(input_file), str(output_file), True, stats=stats, cache_size=16
+        )
+
+        assert stats.rows == 2
+        assert stats.total_seconds > 0
+        assert stats.rows_per_sec > 0
+        assert set(stats.stage_seconds) == set(STAGES)
+        assert stats.key_counts["Verwendungszweck"] == 2
+        assert stats.key_counts["Zahlungsreferenz"] == 1
+        assert stats.key_counts["Empfänger"] == 1
+        assert stats.cache_hits + stats.cache_misses == 2
+
+    def test_output_identical_with_stats(self, tmp_path):
+        """Test that instrumentation does not change the output."""
+        input_file = tmp_path / "input.csv"
+        plain_file = tmp_path / "plain.csv"
+        stats_file = tmp_path / "stats.csv"
+        input_file.write_text(INPUT_DATA, encoding="utf-8")
+
+        process_csv_file(str(input_file), str(plain_file), True)
+        process_csv_file(
+            str(input_file), str(stats_file), True, stats=ConversionStats()
+        )
+
+        assert stats_file.read_bytes() == plain_file.read_bytes()
+
+    def test_selected_keys(self, tmp_path):
+        """Test that the report says when only selected keys are counted."""
+        input_file = tmp_path / "input.csv"
+        input_file.write_text(INPUT_DATA, encoding="utf-8")
+
+        stats = ConversionStats()
+        process_csv_file(
+            str(input_file),
+            str(tmp_path / "output.csv"),
+            False,
+            columns=["Betrag", "Empfänger"],
+            stats=stats,
+        )
+
+        assert stats.key_counts == {"Empfänger": 1}
+        assert stats.counted_keys == ("Empfänger",)
+        assert stats.to_dict()["counted_keys"] == ["Empfänger"]
+        assert "Keys found (selected keys only):" in stats.format_text()
+        assert stats.stage_seconds["build"] > 0
+
+    def test_update(self):
+        """Test combining the statistics of two instances."""
+        first = ConversionStats()
+        first.rows = 2
+        first.add("parse", 1.0)
+        first.key_counts["Mandat"] = 1
+
+        second = ConversionStats()
+        second.rows = 3
+        second.add("parse", 0.5)
+        second.key_counts["Mandat"] = 2
+
+        first.update(second)
+
+        assert first.rows == 5
+        assert first.stage_seconds["parse"] == pytest.approx(1.5)
+        assert first.key_counts["Mandat"] == 3
+
+    def test_format_text(self):
+        """Test the human-readable report."""
+        stats = ConversionStats()
+        stats.rows = 10
+        stats.key_counts["Mandat"] = 4
+
+        report = stats.format_text()
+
+        assert "Rows:          10" in report
+        assert "Mandat" in report
+
+
+class TestStatsCommandLine:
+    """Test suite for the --stats command-line option."""
+
+    def test_stats_json(self, tmp_path, monkeypatch, capsys):
+        """Test that --stats json prints a JSON report to stderr."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(INPUT_DATA, encoding="utf-8")
+
+        monkeypatch.setattr(
+            "sys.argv",
+            ["elbacsv.py", str(input_file), str(output_file), "--stats", "json"],
+        )
+
+        main()
+
+        report = json.loads(capsys.readouterr().err)
+        assert report["rows"] == 2
+        assert report["key_counts"]["Verwendungszweck"] == 2
+
+    def test_stats_text(self, tmp_path, monkeypatch, capsys):
+        """Test that --stats prints a text report to stderr."""
+        input_file = tmp_path / "input.csv"
+        output_file = tmp_path / "output.csv"
+        input_file.write_text(INPUT_DATA, encoding="utf-8")
+
+        monkeypatch.setattr(
+            "sys.argv", ["elbacsv.py", str(input_file), str(output_file), "--stats"]
+        )
+
+        main()
+
+        assert "Throughput:" in capsys.readouterr().err
@@ -0,0 +1,47 @@
+import datetime as dt
+from decimal import Decimal
+
+import pytest
+
+from elbacsv.values import parse_amount, parse_date
+
+
+class TestParseDate:
+    """Test suite for the parse_date function."""
+
+    @pytest.mark.parametrize(
+        "value",
+        ["15.01.2024", "2024-01-15", " 15.01.2024 ", "15.01.2024 10:00:00:000"],
+    )
+    def test_valid_dates(self, value):
+        """Test ELBA and ISO dates, with surrounding text."""
+        assert parse_date(value) == dt.date(2024, 1, 15)
+
+    @pytest.mark.parametrize("value", ["", "31.02.2024", "yesterday", "15/01/2024"])
+    def test_invalid_dates(self, value):
+        """Test that invalid dates raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid date"):
+            parse_date(value)
+
+
+class TestParseAmount:
+    """Test suite for the parse_amount function."""
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("-2356,26", "-2356.26"),
+            ("1.234,56", "1234.56"),
+            ("-500.00", "-500.00"),
+            (" 7 ", "7"),
+        ],
+    )
+    def test_valid_amounts(self, value, expected):
+        """Test amounts with a decimal comma and with a decimal point."""
+        assert parse_amount(value) == Decimal(expected)
+
+    @pytest.mark.parametrize("value", ["", "abc", "NaN", "1,2,3"])
+    def test_invalid_amounts(self, value):
+        """Test that invalid amounts raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid amount"):
+            parse_amount(value)